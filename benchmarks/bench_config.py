@@ -0,0 +1,44 @@
+"""Profile the configuration work done while serving requests.
+
+Run from the repository root with ``python -m benchmarks.bench_config``.
+"""
+
+import cProfile
+import pstats
+
+from benchmarks.common import setup_app
+
+REQUESTS = 500
+
+
+def main():
+    """Profile a number of registration page requests and report the configuration share of the time."""
+    app = setup_app()
+    client = app.test_client()
+    # warm up, the first request compiles the configuration
+    client.get("/register")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(REQUESTS):
+        client.get("/register")
+    profiler.disable()
+
+    stats = pstats.Stats(profiler)
+    total = stats.total_tt
+    loads = 0
+    config_time = 0.0
+    for (filename, _, function), (_, calls, tottime, _, _) in stats.stats.items():
+        if filename.endswith("configuration/website.py"):
+            config_time += tottime
+            if function in ("_load", "_unmarshall"):
+                loads += calls
+
+    print(f"requests:                     {REQUESTS}")
+    print(f"total time:                   {total:.3f}s ({1000 * total / REQUESTS:.2f}ms per request)")
+    print(f"configuration file loads:     {loads}")
+    print(f"time in configuration module: {config_time:.3f}s ({100 * config_time / total:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Time the validation of the item images of a large study.
+
+Run from the repository root with ``python -m benchmarks.bench_image_validation``.
+"""
+
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from comparison_interface.configuration import images
+from comparison_interface.configuration.images import ImageValidator
+
+IMAGES = 10000
+
+
+def link_images(folder, count=IMAGES):
+    """Fill a folder with links to the test images.
+
+    Args:
+        folder (string): Folder the images are added to
+        count (int): Number of images
+
+    Returns:
+        list: Image names
+    """
+    names = []
+    for i in range(count):
+        name = f"image_{i}.png"
+        os.link(os.path.join(images.IMAGES_FOLDER, f"item_{i % 12 + 1}.png"), os.path.join(folder, name))
+        names.append(name)
+    return names
+
+
+def main():
+    """Report the time taken to check every image and to validate the unchanged images again."""
+    folder = tempfile.mkdtemp(prefix="ci-bench-")
+    names = link_images(folder)
+    images.IMAGES_FOLDER = folder
+    validator = ImageValidator(Flask(__name__, instance_path=tempfile.mkdtemp(prefix="ci-bench-")))
+
+    start = time.perf_counter()
+    errors = validator.validate(names)
+    elapsed = time.perf_counter() - start
+    print(f"images:               {len(names)} ({os.cpu_count()} CPUs)")
+    print(f"first validation:     {elapsed:.2f}s ({len(errors)} errors)")
+
+    start = time.perf_counter()
+    validator.validate(names)
+    print(f"unchanged validation: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare judgement throughput and latency of the group commit judgement writer and the judgement journal.
+
+Run from the repository root with ``python -m benchmarks.bench_judgement_writer``.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import register_user, setup_app
+
+JUDGES = 16
+JUDGEMENTS = 100
+# Group commit intervals in milliseconds, 0 writes each comparison from the rank page
+INTERVALS = (0, 1, 5, 20)
+
+
+def judge(client, latencies):
+    """Post a number of judgements for a registered user and record how long each one takes."""
+    for _ in range(JUDGEMENTS):
+        start = time.perf_counter()
+        response = client.post(
+            "/rank",
+            data={'state': 'confirmed', 'item_1_id': '1', 'item_2_id': '2', 'selected_item_id': '1'},
+        )
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 302
+
+
+def time_judgements(interval, journal=False):
+    """Time concurrent judges posting judgements.
+
+    Args:
+        interval (int): Group commit interval in milliseconds
+        journal (bool, optional): Append the judgements to the judgement journal. Defaults to False.
+
+    Returns:
+        tuple: Judgements per second, median and 95th percentile latency in seconds
+    """
+    app = setup_app(JUDGEMENT_WRITER_INTERVAL=interval, JUDGEMENT_JOURNAL=journal, JUDGEMENT_JOURNAL_INGEST_INTERVAL=0)
+    clients = [app.test_client() for _ in range(JUDGES)]
+    for client in clients:
+        register_user(client)
+
+    latencies = []
+    threads = [threading.Thread(target=judge, args=(client, latencies)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if journal:
+        app.judgement_journal.clear()
+    return JUDGES * JUDGEMENTS / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    """Report the judgement throughput and latency for each group commit interval and for the journal."""
+    runs = [(f"{interval}ms batches" if interval else "direct writes", interval, False) for interval in INTERVALS]
+    runs.append(("journal", 0, True))
+    for name, interval, journal in runs:
+        throughput, median, p95 = time_judgements(interval, journal)
+        print(
+            f"{name:14}: {throughput:8.1f} judgements per second, "
+            f"latency {1000 * median:6.1f}ms median {1000 * p95:6.1f}ms 95th percentile"
+        )
+
+
+if __name__ == "__main__":
+    main()
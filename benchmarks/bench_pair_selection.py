@@ -0,0 +1,68 @@
+"""Time the selection of the item pairs shown on the rank page.
+
+Run from the repository root with ``python -m benchmarks.bench_pair_selection``.
+"""
+
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import CUSTOM_WEIGHT_CONFIGURATION, register_user, setup_app
+from comparison_interface.db.connection import db
+from comparison_interface.db.models import UserItem
+from comparison_interface.views.rank import Rank
+
+DRAWS = 20000
+
+
+def time_draws(app, select, draws=DRAWS):
+    """Time a number of pair selections and count the database statements they run.
+
+    Args:
+        app (Flask): Application the selection is run for
+        select (callable): Function returning a pair of items
+        draws (int): Number of pairs to select
+
+    Returns:
+        tuple: Seconds per selection and number of database statements per selection
+    """
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    select()  # warm up, the first selection loads the cached data
+    event.listen(db.engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for _ in range(draws):
+        select()
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, "before_cursor_execute", count)
+    return elapsed / draws, len(statements) / draws
+
+
+def main():
+    """Report the cost of selecting pairs for each weight configuration."""
+    app = setup_app()
+    with app.test_request_context():
+        session = {'user_id': 1, 'group_ids': ['1', '2'], 'weight_conf': 'equal'}
+        ranker = Rank(app, session)
+        per_draw, queries = time_draws(app, ranker._get_random_items)
+        print(f"equal weights, no item preference: {1e6 * per_draw:8.1f}us per pair, {queries:.1f} queries per pair")
+
+        register_user(app.test_client())
+        db.session.add_all(UserItem(user_id=1, item_id=item_id, known=True) for item_id in range(1, 10))
+        db.session.commit()
+        per_draw, queries = time_draws(app, ranker._get_preferred_items)
+        print(f"equal weights, item preference:    {1e6 * per_draw:8.1f}us per pair, {queries:.1f} queries per pair")
+
+    app = setup_app(CUSTOM_WEIGHT_CONFIGURATION)
+    with app.test_request_context():
+        session = {'user_id': 1, 'group_ids': ['2'], 'weight_conf': 'custom'}
+        ranker = Rank(app, session)
+        per_draw, queries = time_draws(app, ranker._get_custom_items)
+        print(f"custom weights:                    {1e6 * per_draw:8.1f}us per pair, {queries:.1f} queries per pair")
+
+
+if __name__ == "__main__":
+    main()
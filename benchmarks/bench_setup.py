@@ -0,0 +1,82 @@
+"""Time the setup command for a study with one large group of fully weighted items.
+
+Run from the repository root with ``python -m benchmarks.bench_setup``.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import comparison_interface
+from comparison_interface import create_app
+from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.connection import db
+from comparison_interface.db.models import CustomItemPair, ItemGroup
+from comparison_interface.db.setup import Setup as DBSetup
+
+ITEMS = 1000
+BASE_CONFIGURATION = os.path.join(
+    os.path.dirname(__file__), "..", "tests_python", "test_configurations", "config-custom-item-weights.json"
+)
+
+
+def write_configuration(folder, items=ITEMS):
+    """Write a configuration with a single group in which every pair of items has a weight.
+
+    The items share the test images, the configuration is not validated so the images are not read.
+
+    Args:
+        folder (string): Folder the configuration file is written to
+        items (int): Number of items in the group
+
+    Returns:
+        string: Path of the configuration file
+    """
+    with open(BASE_CONFIGURATION, encoding='utf-8') as f:
+        conf = json.load(f)
+    names = [f"item_{i}" for i in range(items)]
+    conf["comparisonConfiguration"]["groups"] = [
+        {
+            "name": "large_group",
+            "displayName": "Large group",
+            "items": [
+                {"name": name, "displayName": name, "imageName": f"item_{i % 12 + 1}.png"}
+                for i, name in enumerate(names)
+            ],
+            "weight": [
+                {"item_1": names[i], "item_2": names[j], "weight": 1 + (i * j) % 7}
+                for i in range(items)
+                for j in range(i + 1, items)
+            ],
+        }
+    ]
+    path = os.path.join(folder, "config-large.json")
+    with open(path, mode='w', encoding='utf-8') as f:
+        json.dump(conf, f)
+    return path
+
+
+def main():
+    """Report the time taken to set up the database of a large study."""
+    folder = tempfile.mkdtemp(prefix="ci-bench-")
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(folder, 'setup.db')}"})
+    # The configuration location is relative to the package folder
+    package_folder = os.path.dirname(comparison_interface.__file__)
+    WS.set_configuration_location(app, os.path.relpath(write_configuration(folder), package_folder))
+    WS.get_configuration(app)  # load the configuration before timing the setup
+
+    start = time.perf_counter()
+    DBSetup(app).exec()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        pairs = db.session.scalar(db.select(db.func.count(CustomItemPair.custom_item_pair_id)))
+        items = db.session.scalar(db.select(db.func.count(ItemGroup.item_group_id)))
+    print(f"items:      {items}")
+    print(f"item pairs: {pairs}")
+    print(f"setup time: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
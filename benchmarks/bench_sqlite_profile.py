@@ -0,0 +1,60 @@
+"""Compare the judgement throughput of several judges with the default SQLite settings and the production profile.
+
+Run from the repository root with ``python -m benchmarks.bench_sqlite_profile``.
+"""
+
+import threading
+import time
+
+from benchmarks.common import register_user, setup_app
+from comparison_interface.db.connection import PRODUCTION_SQLITE_PRAGMAS
+
+JUDGES = 8
+JUDGEMENTS = 200
+
+
+def judge(client, errors):
+    """Post a number of judgements for a registered user."""
+    for _ in range(JUDGEMENTS):
+        response = client.post(
+            "/rank",
+            data={'state': 'confirmed', 'item_1_id': '1', 'item_2_id': '2', 'selected_item_id': '1'},
+        )
+        if response.status_code != 302:
+            errors.append(response.status_code)
+
+
+def time_judgements(pragmas):
+    """Time concurrent judges posting judgements.
+
+    Args:
+        pragmas (dict): SQLite pragmas applied to every database connection
+
+    Returns:
+        tuple: Judgements per second and number of failed judgements
+    """
+    app = setup_app(SQLITE_PRAGMAS=pragmas)
+    clients = [app.test_client() for _ in range(JUDGES)]
+    for client in clients:
+        register_user(client)
+
+    errors = []
+    threads = [threading.Thread(target=judge, args=(client, errors)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return JUDGES * JUDGEMENTS / elapsed, len(errors)
+
+
+def main():
+    """Report the judgement throughput of each SQLite profile."""
+    for name, pragmas in (('default', {}), ('production', PRODUCTION_SQLITE_PRAGMAS)):
+        throughput, errors = time_judgements(pragmas)
+        print(f"{name:10} settings: {throughput:8.1f} judgements per second, {errors} failed judgements")
+
+
+if __name__ == "__main__":
+    main()
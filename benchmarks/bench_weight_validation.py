@@ -0,0 +1,101 @@
+"""Time the validation of groups in which every pair of items has a custom weight.
+
+The weights are validated as part of the configuration and when they are loaded from a weight file.
+
+Run from the repository root with ``python -m benchmarks.bench_weight_validation``.
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from comparison_interface.configuration.schema import Group
+from comparison_interface.configuration.weight_file import load_weight_file
+
+SIZES = (100, 500, 1000)
+
+
+def build_group(items):
+    """Build the configuration of a group in which every pair of items has a weight.
+
+    Args:
+        items (int): Number of items in the group
+
+    Returns:
+        dict: Group configuration
+    """
+    names = [f"item_{i}" for i in range(items)]
+    pairs = [(names[i], names[j]) for i in range(items) for j in range(i + 1, items)]
+    return {
+        "name": "large_group",
+        "displayName": "Large group",
+        "items": [
+            {"name": name, "displayName": name, "imageName": f"item_{i % 12 + 1}.png"} for i, name in enumerate(names)
+        ],
+        "weight": [{"item_1": item_1, "item_2": item_2, "weight": 1 / len(pairs)} for item_1, item_2 in pairs],
+    }
+
+
+def main():
+    """Report the time taken to validate groups of increasing size."""
+    print(f"{'items':>6} {'weights':>8} {'validation':>11} {'per weight':>11} {'pair checks':>12}")
+    for items in SIZES:
+        group = build_group(items)
+        start = time.perf_counter()
+        loaded = Group().load(group)
+        elapsed = time.perf_counter() - start
+
+        # The unknown name, duplicate and completeness checks on their own, the rest is the field validation
+        start = time.perf_counter()
+        Group()._post_load_validation(loaded)
+        pair_checks = time.perf_counter() - start
+
+        weights = len(group["weight"])
+        print(f"{items:>6} {weights:>8} {elapsed:>10.2f}s {1e6 * elapsed / weights:>9.2f}us {pair_checks:>11.3f}s")
+
+
+def write_weight_files(folder, group):
+    """Write the weights of a group as a weight matrix and as a CSV file.
+
+    Args:
+        folder (string): Folder the files are written to
+        group (dict): Group configuration
+
+    Returns:
+        list: Paths of the weight files
+    """
+    names = [i["name"] for i in group["items"]]
+    index = {name: position for position, name in enumerate(names)}
+    matrix = np.zeros((len(names), len(names)))
+    for w in group["weight"]:
+        matrix[index[w["item_1"]], index[w["item_2"]]] = w["weight"]
+    npy = os.path.join(folder, "weights.npy")
+    np.save(npy, matrix)
+    csv = os.path.join(folder, "weights.csv")
+    with open(csv, mode="w", encoding="utf-8") as f:
+        f.write("item_1,item_2,weight\n")
+        f.writelines(f"{w['item_1']},{w['item_2']},{w['weight']}\n" for w in group["weight"])
+    return [npy, csv]
+
+
+def main_weight_files():
+    """Report the time taken to load and validate weight files of increasing size."""
+    folder = tempfile.mkdtemp(prefix="ci-bench-")
+    print(f"{'items':>6} {'weights':>8} {'.npy':>8} {'.csv':>8}")
+    for items in SIZES:
+        group = build_group(items)
+        names = [i["name"] for i in group["items"]]
+        times = []
+        for path in write_weight_files(folder, group):
+            start = time.perf_counter()
+            load_weight_file(path, names)
+            times.append(time.perf_counter() - start)
+        print(f"{items:>6} {len(group['weight']):>8} {times[0]:>7.3f}s {times[1]:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
+    print()
+    main_weight_files()
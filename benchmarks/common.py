@@ -0,0 +1,46 @@
+"""Helpers shared by the benchmark scripts."""
+
+import os
+import tempfile
+
+from comparison_interface import create_app
+from comparison_interface.configuration.validation import Validation as ConfigValidation
+from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.setup import Setup as DBSetup
+
+EQUAL_WEIGHT_CONFIGURATION = "../tests_python/test_configurations/config-equal-item-weights.json"
+CUSTOM_WEIGHT_CONFIGURATION = "../tests_python/test_configurations/config-custom-item-weights.json"
+
+
+def setup_app(conf=EQUAL_WEIGHT_CONFIGURATION, **settings):
+    """Create a Flask application with a freshly set up database in a temporary directory.
+
+    Args:
+        conf (string): Website configuration location, relative to the comparison_interface package
+        settings: Additional Flask settings
+
+    Returns:
+        Flask: The configured application
+    """
+    database = os.path.join(tempfile.mkdtemp(prefix="ci-bench-"), "benchmark.db")
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database}", **settings})
+    WS.set_configuration_location(app, conf)
+    ConfigValidation(app).validate()
+    DBSetup(app).exec()
+    return app
+
+
+def register_user(client, group_ids=(1,)):
+    """Register a test user through the registration page."""
+    client.post(
+        "/register",
+        data={
+            'name': 'Benchmark',
+            'country': 'England',
+            'allergies': 'Yes',
+            'age': '30',
+            'email': 'benchmark@test',
+            'accepted_ethics_agreement': '1',
+            'group_ids': list(group_ids),
+        },
+    )
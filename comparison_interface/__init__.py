@@ -2,21 +2,29 @@
 
 import json
 import os
-from datetime import datetime, timedelta, timezone
+import zlib
+from datetime import timedelta
+from functools import lru_cache
 
-from flask import Flask, current_app, render_template, session
+from flask import Flask, current_app, g, render_template, request, session
 from numpy.random import default_rng
 from whitenoise import WhiteNoise
 
 import comparison_interface.routes as routes
 from comparison_interface.configuration.flask import Settings as FlaskSettings
 from comparison_interface.configuration.website import Settings as WS
-from comparison_interface.db.connection import db
-from comparison_interface.db.models import WebsiteControl
+from comparison_interface.db.catalog import KnownItems
+from comparison_interface.db.connection import configure_sqlite, db
+from comparison_interface.db.journal import JudgementJournal
+from comparison_interface.db.writer import JudgementWriter, threads_enabled
+from comparison_interface.integrity import IntegrityWatcher
 from comparison_interface.views.request import Request
 
 from . import cli as commands
 
+STATIC_ROOT = os.path.join(os.path.dirname(__file__), "static")
+ASSETS_PREFIX = "assets/"
+
 
 def create_app(test_config=None):
     """Start Flask website application.
@@ -34,19 +42,33 @@ def create_app(test_config=None):
     except KeyError:
         language = 'en'
 
-    language_filepath = os.path.join(os.path.dirname(__file__), "languages", f"{language}.json")
-    if not os.path.exists(language_filepath):
-        raise RuntimeError("The required file for the language requested in the flask configuration is not available.")
+    # Load the default language and any other language that should be available without reading files later on
+    try:
+        languages = app.config["LANGUAGES"]
+    except KeyError:
+        languages = []
+    app.language = language
+    app.language_configs = {}
+    for lang in [language] + [lang for lang in languages if lang != language]:
+        language_filepath = os.path.join(os.path.dirname(__file__), "languages", f"{lang}.json")
+        if not os.path.exists(language_filepath):
+            raise RuntimeError(
+                "The required file for the language requested in the flask configuration is not available."
+            )
 
-    with open(
-        language_filepath,
-        mode='r',
-        encoding='utf-8',
-    ) as config_file:
-        app.language_config = json.load(config_file)
+        with open(
+            language_filepath,
+            mode='r',
+            encoding='utf-8',
+        ) as config_file:
+            app.language_configs[lang] = json.load(config_file)
+    app.language_config = app.language_configs[language]
+    # Page text built by the views for the current configuration version, by page, configuration digest and language
+    app.page_text = {}
 
     # Register the database
     db.init_app(app)
+    configure_sqlite(app)
 
     # Register the custom Flask commands
     app.register_blueprint(commands.blueprint)
@@ -63,18 +85,67 @@ def create_app(test_config=None):
     # Register function executed before any request
     app.before_request(_before_request)
 
+    # Monitor the application state between requests
+    try:
+        integrity_check_interval = app.config["INTEGRITY_CHECK_INTERVAL"]
+    except KeyError:
+        integrity_check_interval = 5
+    app.integrity_watcher = IntegrityWatcher(app, integrity_check_interval, on_new_generation=_refresh_item_images)
+    # Items and groups loaded on first use (see ItemCatalog.get)
+    app.item_catalog = None
+    # User table reflected on first use (see UserTable.get)
+    app.user_table = None
+    try:
+        known_items_cache_size = app.config["KNOWN_ITEMS_CACHE_SIZE"]
+    except KeyError:
+        known_items_cache_size = 10000
+    app.known_items = KnownItems(known_items_cache_size)
+    try:
+        judgement_writer_interval = app.config["JUDGEMENT_WRITER_INTERVAL"]
+    except KeyError:
+        judgement_writer_interval = 0
+    if judgement_writer_interval > 0 and not threads_enabled():
+        app.logger.warning(
+            "JUDGEMENT_WRITER_INTERVAL is ignored because the server doesn't run background threads, each comparison "
+            "is saved on its own. Set the uWSGI enable-threads option to write the comparisons in batches."
+        )
+        judgement_writer_interval = 0
+    # New comparisons are written by the rank page itself unless a group commit interval is set
+    app.judgement_writer = JudgementWriter(app, judgement_writer_interval) if judgement_writer_interval > 0 else None
+    # Judgements appended to a journal and written to the database later on, see JudgementJournal
+    try:
+        judgement_journal = app.config["JUDGEMENT_JOURNAL"]
+    except KeyError:
+        judgement_journal = False
+    try:
+        journal_ingest_interval = app.config["JUDGEMENT_JOURNAL_INGEST_INTERVAL"]
+    except KeyError:
+        journal_ingest_interval = 10
+    if judgement_journal and journal_ingest_interval > 0 and not threads_enabled():
+        app.logger.warning(
+            "The judgement journal is only ingested by the ingest-journal and export commands because the server "
+            "doesn't run background threads. Set the uWSGI enable-threads option to ingest it in the background."
+        )
+        journal_ingest_interval = 0
+    app.judgement_journal = JudgementJournal(app, journal_ingest_interval) if judgement_journal else None
+
     # Register page errors
     app.register_error_handler(404, _page_not_found)
     app.register_error_handler(500, _page_unexpected_condition)
 
-    # Add the management for static libraries
+    # Add the management for static libraries. Static files and item images are served by WhiteNoise before the
+    # request reaches Flask, so they don't run the before request hooks. The URLs built with asset_url carry a
+    # version string which allows the files to be cached as immutable by the browser.
     WHITENOISE_MAX_AGE = 31536000 if not app.config["DEBUG"] else 0
-    app.wsgi_app = WhiteNoise(
+    app.whitenoise = app.wsgi_app = WhiteNoise(
         app.wsgi_app,
-        root=os.path.join(os.path.dirname(__file__), "static"),
-        prefix="assets/",
+        root=STATIC_ROOT,
+        prefix=ASSETS_PREFIX,
         max_age=WHITENOISE_MAX_AGE,
+        autorefresh=app.config["DEBUG"],
+        immutable_file_test=(lambda path, url: not app.config["DEBUG"]),
     )
+    app.add_template_global(_asset_url, 'asset_url')
 
     # seed the random number generator per process if we are in a uwsgi environment
     try:
@@ -94,8 +165,11 @@ def create_app(test_config=None):
 
 def _before_request():
     """Run functions before every request."""
+    # The application context, holding flask.g, can outlive a request when it was pushed before the request
+    g.pop('user_context', None)
     _validate_app_integrity()
     _configure_user_session()
+    _select_language()
 
 
 def _configure_user_session():
@@ -106,39 +180,70 @@ def _configure_user_session():
     session.modified = True
 
 
+def _select_language():
+    """Keep the language requested with the language query parameter in the user's session.
+
+    Only the languages loaded when the application was created (see the LANGUAGES setting) can be selected.
+    """
+    language = request.args.get(WS.LANGUAGE_PARAMETER)
+    if language is not None and language in current_app.language_configs:
+        session[WS.SESSION_LANGUAGE] = language
+
+
 def _validate_app_integrity():
     """Stop the server execution if the configuration file was modified after the application setup was executed.
 
     The configuration file is used by the website during runtime. Modification of this file can cause
     unexpected results so changes are monitored and a RuntimeError will be raised if a change is detected.
+    The check is run by the integrity watcher at most once per check interval, in between the cached state is used.
     """
-    app = current_app
-    modification_date = None
-    with app.app_context():
-        try:
-            # Get the application control variables
-            w = WebsiteControl()
-            conf = w.get_conf()
-
-            WS.set_configuration_location(app, conf.configuration_file)
-            setup_exec_date = conf.setup_exec_date.replace(tzinfo=timezone.utc)
-
-            # Get the last modification date of the configuration file (UTC)
-            modification_date = os.path.getmtime(WS.get_configuration_location(app))
-            modification_date = datetime.fromtimestamp(modification_date, tz=timezone.utc)
-        except Exception as e:
-            app.logger.critical(str(e))
-            raise RuntimeError("Application not yet initialised. Please read the README.md file for instructions.")
-
-        # Stop the server execution if the configuration file was modified after the setup of the application.
-        if modification_date is None or modification_date > setup_exec_date:
-            app.logger.critical(
-                "The configuration file cannot be modified after the website has been initialised "
-                "with the setup command. The file was modified on: %s UTC. Setup executed on : %s UTC. "
-                "Please execute >Flask setup< again if you want to re-initialise the database."
-                % (modification_date.strftime("%m/%d/%Y, %H:%M:%S"), setup_exec_date.strftime("%m/%d/%Y, %H:%M:%S"))
-            )
-            raise RuntimeError("Application unhealthy state. Please contact the website administrator.")
+    current_app.integrity_watcher.validate()
+
+
+def _refresh_item_images(app):
+    """Serve the item images added after the application was started (see the sync command).
+
+    Args:
+        app (Flask app): Website main application
+    """
+    _asset_version.cache_clear()
+    images = os.path.join(STATIC_ROOT, "images")
+    # In autorefresh mode WhiteNoise looks for the files on every request
+    if not app.whitenoise.autorefresh and os.path.isdir(images):
+        app.whitenoise.add_files(images, prefix=f"{ASSETS_PREFIX}images/")
+
+
+def _asset_url(filename):
+    """Get the URL of a static file served outside of the Flask request pipeline.
+
+    Args:
+        filename (string): Path of the file relative to the static folder
+
+    Returns:
+        string: URL of the file including a version string
+    """
+    url = f"{request.script_root}/{ASSETS_PREFIX}{filename}"
+    version = _asset_version(filename)
+    if version is None:
+        return url
+    return f"{url}?v={version}"
+
+
+@lru_cache(maxsize=None)
+def _asset_version(filename):
+    """Get a version string for a static file based on its modification time and size.
+
+    Args:
+        filename (string): Path of the file relative to the static folder
+
+    Returns:
+        string: Version of the file or None if the file doesn't exist
+    """
+    try:
+        stat = os.stat(os.path.join(STATIC_ROOT, filename))
+    except OSError:
+        return None
+    return format(zlib.crc32(f"{stat.st_mtime_ns}-{stat.st_size}".encode()), 'x')
 
 
 def _page_not_found(e):
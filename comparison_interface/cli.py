@@ -9,7 +9,10 @@ from sqlalchemy.exc import OperationalError
 
 from comparison_interface.configuration.validation import Validation as ConfigValidation
 from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.counters import JudgementCounters
 from comparison_interface.db.export import Exporter
+from comparison_interface.db.journal import JudgementJournal
+from comparison_interface.db.migration import Migration
 from comparison_interface.db.models import WebsiteControl
 from comparison_interface.db.setup import Setup as DBSetup
 
@@ -34,7 +37,7 @@ def setup(conf):
     ConfigValidation(app).check_config_path(conf)
     app.logger.info("Setting website configuration")
     WS.set_configuration_location(app, conf)
-    ConfigValidation(app).validate()
+    fingerprint = ConfigValidation(app).validate()
 
     # 2. Configure database
     with app.app_context():
@@ -46,7 +49,7 @@ def setup(conf):
         except OperationalError:
             # 2.2 If not, configure the website database.
             app.logger.info("Configuring website database")
-            s = DBSetup(app)
+            s = DBSetup(app, fingerprint)
             s.exec()
         except Exception as e:
             # 2.3 Report the error in any other case.
@@ -75,11 +78,11 @@ def reset(conf):
         ConfigValidation(app).check_config_path(conf)
         app.logger.info("Setting website configuration")
         WS.set_configuration_location(app, conf)
-        ConfigValidation(app).validate()
+        fingerprint = ConfigValidation(app).validate()
 
         # 2. Configure database
         app.logger.info("Resetting website database")
-        s = DBSetup(app)
+        s = DBSetup(app, fingerprint)
         s.exec()
 
     else:
@@ -87,6 +90,110 @@ def reset(conf):
         return
 
 
+@blueprint.cli.command("sync")
+@click.argument("conf", type=click.Path(file_okay=True, dir_okay=True))
+@with_appcontext
+def sync(conf):
+    """Add the groups, items and custom item pairs of the website configuration missing from the database.
+
+    Unlike reset, the data in the database is kept. The running website loads the new items on its next integrity check.
+
+    Args:
+        conf (string): Website configuration location (either the path to a JSON file or a dir path to a dir containing
+                       one JSON file and one CSV file.)
+    """
+    # 1. Validate the website configuration
+    app = current_app
+    ConfigValidation(app).check_config_path(conf)
+    app.logger.info("Setting website configuration")
+    WS.set_configuration_location(app, conf)
+    fingerprint = ConfigValidation(app).validate()
+
+    # 2. Add the new configuration to the database
+    with app.app_context():
+        try:
+            added = DBSetup(app, fingerprint).sync()
+        except OperationalError:
+            app.logger.critical('Application not yet initialised.')
+            exit()
+        except RuntimeError as e:
+            app.logger.critical(e)
+            exit()
+        app.logger.info(
+            "Database synchronised, added {groups} groups, {items} items, {item_groups} item group relationships "
+            "and {custom_item_pairs} custom item pairs.".format(**added)
+        )
+
+
+@blueprint.cli.command("migrate")
+@with_appcontext
+def migrate():
+    """Add the tables and indexes used by this version of the website to an existing database.
+
+    Unlike reset, the data in the database is kept. Tables and indexes that already exist are left unchanged.
+    """
+    app = current_app
+    with app.app_context():
+        try:
+            # Only migrate a database created by the setup command
+            WebsiteControl().get_conf()
+        except OperationalError:
+            app.logger.critical('Application not yet initialised.')
+            exit()
+
+        created = Migration(app).exec()
+        if len(created) == 0:
+            app.logger.info("The database is already up to date.")
+        else:
+            app.logger.info("Database migrated, created: {}".format(", ".join(created)))
+
+        # Counters added by the migration start at 0
+        if 'user.compared_count' in created or 'user.skipped_count' in created:
+            users = JudgementCounters.repair()
+            app.logger.info(f"Judgement counters rebuilt for {users} users.")
+
+
+@blueprint.cli.command("repair-counters")
+@with_appcontext
+def repair_counters():
+    """Rebuild the number of comparisons made and skipped by each user from the comparison table.
+
+    The counters are kept up to date by the website, this command is only needed if comparisons were added or changed
+    directly in the database.
+    """
+    app = current_app
+    with app.app_context():
+        try:
+            users = JudgementCounters.repair()
+        except OperationalError:
+            app.logger.critical('Application not yet initialised.')
+            exit()
+        app.logger.info(f"Judgement counters rebuilt for {users} users.")
+
+
+@blueprint.cli.command("ingest-journal")
+@click.option(
+    "--all",
+    "include_open",
+    is_flag=True,
+    help="Also ingest the segments still open for writing. Only use it when the website is not running.",
+)
+@with_appcontext
+def ingest_journal(include_open):
+    """Write the judgements waiting in the judgement journal to the comparison table.
+
+    Segments that were already ingested are skipped, so the command can be run any number of times.
+    """
+    app = current_app
+    with app.app_context():
+        try:
+            segments, records = JudgementJournal(app).ingest(include_open)
+        except OperationalError:
+            app.logger.critical('Application not yet initialised.')
+            exit()
+        app.logger.info(f"Ingested {records} judgements from {segments} journal segments.")
+
+
 @blueprint.cli.command("export")
 @click.option("--format", default="csv", show_default=True, help="The file format required (csv or tsv)")
 @with_appcontext
@@ -112,12 +219,29 @@ def export(format):
             # Set the application configuration
             app.logger.info("Setting website configuration")
             WS.set_configuration_location(app, conf.configuration_file)
-            ConfigValidation(app).validate()
+            # The export only reads the database, the full validation is skipped if the configuration is unchanged
+            validation = ConfigValidation(app)
+            if conf.validation_fingerprint is not None and validation.fingerprint() == conf.validation_fingerprint:
+                validation.validate(ConfigValidation.STRUCTURAL)
+            else:
+                validation.validate()
             location = WS.get_export_location(app)
             if not os.path.exists(location):
                 os.makedirs(location)
                 app.logger.info('Creating folder for data export.')
 
+            # Only the judgements written to the comparison table are exported
+            journal = JudgementJournal(app)
+            segments, records = journal.ingest()
+            if records > 0:
+                app.logger.info(f"Ingested {records} judgements from {segments} journal segments.")
+            waiting = journal.waiting_records()
+            if waiting > 0:
+                app.logger.warning(
+                    f"{waiting} judgements are still in open journal segments and are not exported. Stop the website "
+                    "and run >Flask ingest-journal --all< before exporting to include them."
+                )
+
         except OperationalError:
             app.logger.critical('Application not yet initialised.')
             exit()
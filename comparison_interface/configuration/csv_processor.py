@@ -1,35 +1,86 @@
-from csv import DictReader
+import csv
+import os
 
 
 class CsvProcessor:
     """A special validation class to validate a csv file used to upload images."""
 
+    # Parsed configurations by absolute file path. Each entry holds the file fingerprint (size and modification time)
+    # it was parsed from, so a changed file is parsed again. Shared by every request of this worker.
+    _cache = {}
+
     def create_config_from_csv(self, file):
-        """Expand and restructure the data."""
-        with open(file, mode='r') as csv_input:
-            by_group = {}
-            image_data = DictReader(csv_input)
-            image_data.fieldnames = [x.lower() for x in image_data.fieldnames]
-            for entry in image_data:
-                if "item name" not in entry:
-                    entry["item name"] = entry["item display name"].lower().replace(" ", "_")
-                if "group display name" not in entry:
-                    entry["group display name"] = "default"
-                if "group name" not in entry:
-                    entry["group name"] = entry["group display name"].lower().replace(" ", "_")
-                if entry["group name"] not in by_group:
-                    by_group[entry["group name"]] = {
-                        "name": entry["group name"],
-                        "displayName": entry["group display name"],
+        """Expand and restructure the data.
+
+        The parsed configuration is cached per worker until the file changes. The returned data is shared between
+        callers and must not be modified.
+        """
+        path = os.path.abspath(file)
+        stat = os.stat(path)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        config = self._parse(path)
+        self._cache[path] = (fingerprint, config)
+        return config
+
+    @classmethod
+    def invalidate(cls, file=None):
+        """Remove a parsed csv file from the cache.
+
+        Args:
+            file (string, optional): Path of the csv file to remove. Defaults to None which clears the whole cache.
+        """
+        if file is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(os.path.abspath(file), None)
+
+    def _parse(self, file):
+        """Build the groups and items in a single pass over the csv rows."""
+        by_group = {}
+        with open(file, mode='r', newline='') as csv_input:
+            reader = csv.reader(csv_input)
+            header = next(reader, None) or []
+            columns = {name.lower(): index for index, name in enumerate(header)}
+            item_display_name_col = columns["item display name"]
+            image_col = columns["image"]
+            item_name_col = columns.get("item name")
+            group_display_name_col = columns.get("group display name")
+            group_name_col = columns.get("group name")
+
+            for row in reader:
+                if not row:
+                    continue
+                length = len(row)
+                item_display_name = row[item_display_name_col] if item_display_name_col < length else None
+                if item_name_col is None:
+                    item_name = item_display_name.lower().replace(" ", "_")
+                else:
+                    item_name = row[item_name_col] if item_name_col < length else None
+                if group_display_name_col is None:
+                    group_display_name = "default"
+                else:
+                    group_display_name = row[group_display_name_col] if group_display_name_col < length else None
+                if group_name_col is None:
+                    group_name = group_display_name.lower().replace(" ", "_")
+                else:
+                    group_name = row[group_name_col] if group_name_col < length else None
+
+                group = by_group.get(group_name)
+                if group is None:
+                    group = by_group[group_name] = {
+                        "name": group_name,
+                        "displayName": group_display_name,
                         "items": [],
                     }
-                item = {
-                    "name": entry["item name"],
-                    "displayName": entry["item display name"],
-                    "imageName": entry["image"],
-                }
-                by_group[entry["group name"]]["items"].append(item)
-            groups = []
-            for entry in by_group:
-                groups.append(by_group[entry])
-        return {"groups": groups, "weightConfiguration": "equal"}
+                group["items"].append(
+                    {
+                        "name": item_name,
+                        "displayName": item_display_name,
+                        "imageName": row[image_col] if image_col < length else None,
+                    }
+                )
+        return {"groups": list(by_group.values()), "weightConfiguration": "equal"}
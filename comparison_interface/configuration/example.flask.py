@@ -1,3 +1,6 @@
+from comparison_interface.db.connection import PRODUCTION_SQLITE_PRAGMAS
+
+
 class Settings(object):
     """Flask configuration."""
 
@@ -8,3 +11,11 @@ class Settings(object):
     API_ACCESS = False
     API_KEY_FILE = '.apikey'
     LANGUAGE = 'en'
+    LANGUAGES = []  # Additional languages loaded when the application starts
+    KNOWN_ITEMS_CACHE_SIZE = 10000  # Number of users whose known items are kept in memory by each worker
+    SQLITE_PRAGMAS = PRODUCTION_SQLITE_PRAGMAS  # Applied to every database connection, {} keeps the SQLite defaults
+    JUDGEMENT_WRITER_INTERVAL = 0  # Milliseconds new comparisons are batched for before being written, 0 disables it
+    JUDGEMENT_JOURNAL = False  # Append the judgements to a journal instead of writing them to the database
+    JUDGEMENT_JOURNAL_INGEST_INTERVAL = 10  # Seconds between journal ingestions by each worker, 0 for the command only
+    INTEGRITY_CHECK_INTERVAL = 5  # Seconds between checks of the website configuration file and setup state
+    IMAGE_VALIDATION_WORKERS = None  # Processes checking the item images, None for one per CPU
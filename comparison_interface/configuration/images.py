@@ -0,0 +1,127 @@
+"""Validation of the item images used by the website configuration."""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+IMAGES_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "static", "images")
+
+# Allowed Items Image size
+MIN_WIDTH = 300
+MIN_HEIGHT = 300
+
+
+def check_image(path):
+    """Check that an image is not damaged and is large enough.
+
+    The file structure is verified (checksums and truncation) without decoding the pixels, which takes about 40 times
+    longer for the images used by the website.
+
+    Args:
+        path (string): Location of the image
+
+    Returns:
+        string: Description of the problem or None if the image is valid
+    """
+    try:
+        with Image.open(path) as im:
+            width, height = im.size
+            im.verify()
+    except Exception as e:
+        return str(e)
+    if width < MIN_WIDTH or height < MIN_HEIGHT:
+        return f"All item images must be at least {MIN_HEIGHT}x{MIN_WIDTH}px"
+    return None
+
+
+class ImageValidator:
+    """Check the item images in a process pool, remembering the result for each image file.
+
+    The results are kept in a manifest in the instance folder, keyed by the image path, size and modification time.
+    Only the images that are new or changed since they were last checked are opened.
+    """
+
+    MANIFEST = "image-manifest.json"
+    # Images are checked in the validating process when there are fewer than this to open
+    POOL_THRESHOLD = 64
+
+    def __init__(self, app) -> None:
+        """Initialise the validator.
+
+        Args:
+            app (Flask app): Website main application
+        """
+        self.app = app
+        self.manifest_location = os.path.join(app.instance_path, self.MANIFEST)
+        try:
+            self.workers = app.config["IMAGE_VALIDATION_WORKERS"]
+        except KeyError:
+            self.workers = None
+
+    def validate(self, image_names):
+        """Check the images of the items.
+
+        Args:
+            image_names (iterable): Image names, relative to the images folder
+
+        Returns:
+            dict: Description of the problem by image name, empty if all the images are valid
+        """
+        manifest = self._read_manifest()
+        errors = {}
+        pending = {}
+        for name in sorted(set(image_names)):
+            path = os.path.realpath(os.path.join(IMAGES_FOLDER, name))
+            try:
+                stat = os.stat(path)
+            except OSError:
+                errors[name] = f"Image {name} not found on static/images/ folder."
+                continue
+            key = [stat.st_size, stat.st_mtime_ns]
+            entry = manifest.get(path)
+            if entry is not None and entry["key"] == key:
+                if entry["error"] is not None:
+                    errors[name] = entry["error"]
+                continue
+            pending[name] = (path, key)
+
+        if len(pending) > 0:
+            self.app.logger.info(f"Checking {len(pending)} item images.")
+            paths = [path for path, _ in pending.values()]
+            if len(paths) < self.POOL_THRESHOLD or self.workers == 1:
+                results = [check_image(path) for path in paths]
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(check_image, paths, chunksize=32))
+            for (name, (path, key)), error in zip(pending.items(), results):
+                manifest[path] = {"key": key, "error": error}
+                if error is not None:
+                    errors[name] = error
+            self._write_manifest(manifest)
+        return errors
+
+    def _read_manifest(self):
+        """Read the results of the previous checks.
+
+        Returns:
+            dict: Size, modification time and check result by image path
+        """
+        try:
+            with open(self.manifest_location, mode="r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # The results are only valid for the size limits they were checked against
+        if manifest.get("minimum_size") != [MIN_WIDTH, MIN_HEIGHT]:
+            return {}
+        return manifest.get("images", {})
+
+    def _write_manifest(self, images):
+        """Save the results of the checks, replacing the previous manifest."""
+        os.makedirs(os.path.dirname(self.manifest_location), exist_ok=True)
+        temporary = f"{self.manifest_location}.{os.getpid()}.tmp"
+        with open(temporary, mode="w", encoding="utf-8") as f:
+            json.dump({"minimum_size": [MIN_WIDTH, MIN_HEIGHT], "images": images}, f)
+        os.replace(temporary, self.manifest_location)
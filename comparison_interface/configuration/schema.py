@@ -1,12 +1,11 @@
-import itertools
-import os
 import re
 
+import numpy as np
 from marshmallow import Schema, ValidationError, fields, post_load, validate, validates
-from PIL import Image
 
 from ..db.models import WebsiteControl
 from .website import Settings as WS
+from .weight_file import check_pairs
 
 
 class Item(Schema):
@@ -15,12 +14,9 @@ class Item(Schema):
     id = fields.Int(required=False)
     name = fields.Str(required=True, validate=[validate.Length(min=1, max=200)])
     displayName = fields.Str(required=True, validate=[validate.Length(min=1, max=200)])
+    # The images are checked together once the whole configuration is loaded, see ImageValidator
     imageName = fields.Str(required=True, validate=[validate.Length(min=1, max=500)])
 
-    # Allowed Items Image size
-    MIN_WIDTH = 300
-    MIN_HEIGHT = 300
-
     @validates('name')
     def _validate_name(self, name, data_key):
         match = re.match(r'^[a-zA-Z0-9_-]+$', name)
@@ -32,20 +28,6 @@ class Item(Schema):
                 "above or remove any special characters from the 'item display name' column."
             )
 
-    @validates('imageName')
-    def _validate_image_path(self, image_name, data_key):
-        path = os.path.abspath(os.path.dirname(__file__)) + "/../static/images/" + image_name
-        if not os.path.exists(path):
-            raise ValidationError(f"Image {image_name} not found on static/images/ folder.")
-
-        try:
-            im = Image.open(path)
-            h, w = im.size
-            if h < self.MIN_HEIGHT or w < self.MIN_WIDTH:
-                raise ValidationError(f"All item images must be at least {self.MIN_HEIGHT}x{self.MIN_WIDTH}px")
-        except Exception as e:
-            raise ValidationError(str(e))
-
 
 class Weight(Schema):
     """The schema for a Weight."""
@@ -71,10 +53,11 @@ class Group(Schema):
     displayName = fields.Str(required=True, validate=[validate.Length(min=1, max=200)])
     items = fields.List(fields.Nested(Item()), required=True, validate=[validate.Length(min=1, max=1000)])
     weight = fields.List(fields.Nested(Weight()), required=False, validate=[validate.Length(min=1, max=499500)])
+    weightFile = fields.Str(required=False, validate=[validate.Length(min=1, max=500)])
 
     @validates('items')
     def _validate_unique_names(self, items, data_key):
-        names = []
+        names = set()
         for f in items:
             if "name" not in f:
                 continue
@@ -84,7 +67,7 @@ class Group(Schema):
                     "All items in the same group must have an unique name. Repeated name {}".format(f['name'])
                 )
             else:
-                names.append(f['name'])
+                names.add(f['name'])
 
     @validates('items')
     def _validate_consistent_ids(self, items, data_key):
@@ -107,29 +90,25 @@ class Group(Schema):
 
     @post_load
     def _post_load_validation(self, data, **kwargs):
+        if 'weight' in data and 'weightFile' in data:
+            raise ValidationError("The custom weights of a group can either be defined in weight or in weightFile.")
+        # The weights of a weight file are validated when the file is loaded, see load_weight_file
         if 'weight' not in data:
             return data
 
         # Validate item pairs name when defined
-        items = data['items']
+        items_name = [i['name'] for i in data['items']]
+        index = {name: position for position, name in enumerate(items_name)}
         weights = data['weight']
-        items_name = [i['name'] for i in items]
-        pairs = []
         for w in weights:
-            if w['item_1'] not in items_name:
+            if w['item_1'] not in index:
                 raise ValidationError(f"{w['item_1']} not defined as item name.")
-            if w['item_2'] not in items_name:
+            if w['item_2'] not in index:
                 raise ValidationError(f"{w['item_2']} not defined as item name.")
 
-            # The order of the pair is important to validate the combinations
-            pairs.append((w['item_1'], w['item_2']))
-            pairs.append((w['item_2'], w['item_1']))
-
-        # Validate that a weight was custom defined for all item pairs
-        possible_pair_combinations = list(itertools.combinations(items_name, 2))
-        for pair in possible_pair_combinations:
-            if pair not in pairs:
-                raise ValidationError(f"Custom weight for item pair {pair} needs to be defined.")
+        first = np.fromiter((index[w['item_1']] for w in weights), dtype=np.int64, count=len(weights))
+        second = np.fromiter((index[w['item_2']] for w in weights), dtype=np.int64, count=len(weights))
+        check_pairs(items_name, first, second)
         return data
 
     @validates('name')
@@ -168,7 +147,7 @@ class ComparisonConfiguration(Schema):
                 )
             weight_conf = data['weightConfiguration']
             groups = data['groups']
-            item_weight_conf = sum([1 if "weight" in g else 0 for g in groups])
+            item_weight_conf = sum([1 if "weight" in g or "weightFile" in g else 0 for g in groups])
 
             if item_weight_conf != 0 and weight_conf == WebsiteControl.EQUAL_WEIGHT:
                 raise ValidationError(
@@ -205,6 +184,8 @@ class WebsiteTextConfiguration(Schema):
     itemSelectionQuestionLabel = fields.Str(required=False, validate=[validate.Length(min=1, max=500)])
     itemSelectionYesButtonLabel = fields.Str(required=False, validate=[validate.Length(min=1, max=50)])
     itemSelectionNoButtonLabel = fields.Str(required=False, validate=[validate.Length(min=1, max=50)])
+    itemSelectionGridInstructionLabel = fields.Str(required=False, validate=[validate.Length(min=1, max=500)])
+    itemSelectionGridContinueButtonLabel = fields.Str(required=False, validate=[validate.Length(min=1, max=50)])
     itemSelectedIndicatorLabel = fields.Str(required=True, validate=[validate.Length(min=1, max=50)])
     rankItemTiedSelectionIndicatorLabel = fields.Str(required=True, validate=[validate.Length(min=1, max=50)])
     rankItemSkippedIndicatorLabel = fields.Str(required=True, validate=[validate.Length(min=1, max=50)])
@@ -322,6 +303,7 @@ class BehaviourConfiguration(Schema):
     allowTies = fields.Boolean(required=True)
     allowSkip = fields.Boolean(required=True)
     allowBack = fields.Boolean(required=True)
+    itemPreferencePageSize = fields.Integer(required=False, validate=[validate.Range(min=1, max=100)])
     userInstructionHtml = fields.Str(required=False, validate=[validate.Length(min=1, max=100)])
     userEthicsAgreementHtml = fields.Str(required=False, validate=[validate.Length(min=1, max=100)])
     sitePoliciesHtml = fields.Str(required=False, validate=[validate.Length(min=1, max=100)])
@@ -1,41 +1,82 @@
+import hashlib
 import os
 from csv import DictReader
 
 from marshmallow import ValidationError
 
 from .csv_processor import CsvProcessor
+from .images import ImageValidator
 from .schema import ComparisonConfiguration as CompSchema
 from .schema import Configuration as ConfigSchema
 from .website import Settings as WS
+from .weight_file import load_weight_file
 
 
 class Validation:
     """A Validator for the config file."""
 
+    # Validation levels
+    STRUCTURAL = "structural"  # The configuration file can be read and has all of its sections
+    FULL = "full"  # Every value of the configuration, the csv file, the weight files and the item images
+    # Changed when the validation rules change, so configurations validated by a previous version are checked again
+    FINGERPRINT_VERSION = 1
+
     def __init__(self, app) -> None:
         """Initialise the Validation with the Flask app."""
         self.__app = app
 
-    def validate(self) -> list:
-        """Validate the configuration file or directory."""
-        conf = WS.get_configuration(self.__app)
+    def validate(self, level=FULL):
+        """Validate the configuration file or directory.
+
+        The structural validation is enough for commands that only read a study that has been set up, when the
+        configuration files haven't changed since they were fully validated (see fingerprint).
+
+        Args:
+            level (string, optional): Validation level, STRUCTURAL or FULL. Defaults to FULL.
+
+        Returns:
+            string: Fingerprint of the validated configuration files
+        """
+        if level == self.STRUCTURAL:
+            self._validate_structure()
+            return self.fingerprint()
+
+        # always validate what is on disk now, not a csv file parsed earlier by this process
+        CsvProcessor.invalidate()
+        # validate against a copy, the loaded configuration is shared by the whole worker and must not be modified
+        conf = dict(WS.get_configuration(self.__app, True))
         # now add the keys from the language file if they are not in the project file so we can validate the full set
         # all the keys have to be in at least one of them for the validation to pass
         if "websiteTextConfiguration" in self.__app.language_config:
             if "websiteTextConfiguration" in conf:
-                for key in self.__app.language_config["websiteTextConfiguration"]:
-                    if key not in conf["websiteTextConfiguration"]:
-                        conf["websiteTextConfiguration"][key] = self.__app.language_config["websiteTextConfiguration"][
-                            key
-                        ]
+                conf["websiteTextConfiguration"] = {
+                    **self.__app.language_config["websiteTextConfiguration"],
+                    **conf["websiteTextConfiguration"],
+                }
         schema = ConfigSchema()
         try:
             schema.load(conf)
         except ValidationError as err:
             self.__app.logger.critical(err)
             exit()
-        # now we have validated, reload the config so that we just have the project
-        conf = WS.get_configuration(self.__app, True)
+        # the other languages that can be selected need the same labels
+        project_text = set(WS.get_configuration(self.__app).get("websiteTextConfiguration", {}))
+        for language, language_config in self.__app.language_configs.items():
+            missing = set(conf.get("websiteTextConfiguration", {})) - project_text
+            missing -= set(language_config.get("websiteTextConfiguration", {}))
+            if len(missing) > 0:
+                self.__app.logger.critical(f"Labels {', '.join(sorted(missing))} missing from language {language}.")
+                exit()
+        conf = WS.get_configuration(self.__app)
+        groups = conf["comparisonConfiguration"].get("groups", [])
+        # the custom weights kept in a file are validated while they are loaded
+        for g in groups:
+            if WS.GROUP_ITEMS_WEIGHT_FILE in g:
+                try:
+                    load_weight_file(WS.get_weight_file_location(g, self.__app), [i["name"] for i in g["items"]])
+                except ValidationError as err:
+                    self.__app.logger.critical(f"Group {g['name']}: {err}")
+                    exit()
         # now if we reference a csv file validate that
         if "csvFile" in conf["comparisonConfiguration"]:
             config_location = WS.get_configuration_location(self.__app)
@@ -52,6 +93,50 @@ class Validation:
             except ValidationError as err:
                 self.__app.logger.critical(err)
                 exit()
+            groups = config["groups"]
+
+        # finally check the images of all the items
+        errors = ImageValidator(self.__app).validate(i["imageName"] for g in groups for i in g["items"])
+        if len(errors) > 0:
+            self.__app.logger.critical(errors)
+            exit()
+        return self.fingerprint()
+
+    def fingerprint(self):
+        """Identify the content of the configuration files.
+
+        The fingerprint covers the configuration file, the csv file and the weight files it refers to, the language
+        merged into the configuration text and the version of the validation rules.
+
+        Returns:
+            string: Hexadecimal SHA-256 digest, or None if a file can't be read
+        """
+        snapshot = WS.get_snapshot(self.__app)
+        digest = hashlib.sha256(f"{self.FINGERPRINT_VERSION}:{self.__app.language}:{snapshot.digest}".encode())
+        comparison = snapshot.data.get("comparisonConfiguration", {})
+        files = []
+        if "csvFile" in comparison:
+            files.append(os.path.join(WS.get_configuration_location(self.__app), comparison["csvFile"]))
+        for g in comparison.get("groups", []):
+            if WS.GROUP_ITEMS_WEIGHT_FILE in g:
+                files.append(WS.get_weight_file_location(g, self.__app))
+        try:
+            for path in files:
+                digest.update(os.path.basename(path).encode())
+                with open(path, mode="rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def _validate_structure(self):
+        """Check that the configuration file can be read and has all of its sections."""
+        conf = WS.get_configuration(self.__app, True)
+        missing = [name for name, field in ConfigSchema().fields.items() if field.required and name not in conf]
+        if len(missing) > 0:
+            self.__app.logger.critical(f"The configuration file is missing the sections {', '.join(missing)}.")
+            exit()
 
     def check_config_path(self, path):
         """Check that the path provided meets the requirements.
@@ -1,17 +1,73 @@
+import hashlib
 import json
 import os
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+from flask import has_request_context, session
 
 from .csv_processor import CsvProcessor
 
 
+@dataclass(frozen=True)
+class ConfigurationSnapshot:
+    """An immutable, compiled view of the website configuration file.
+
+    The snapshot is built once per worker and only rebuilt when the file fingerprint (modification time and size)
+    changes and the content hash no longer matches. The hot sections are exposed as read only mappings so that the
+    accessors in Settings are plain dictionary lookups.
+    """
+
+    location: str
+    path: str
+    fingerprint: tuple
+    digest: str
+    data: dict
+    text: MappingProxyType
+    behaviour: MappingProxyType
+    render: MappingProxyType
+
+    @classmethod
+    def compile(cls, location, path, fingerprint, digest, data):
+        """Compile the parsed JSON configuration into a snapshot.
+
+        Args:
+            location (string): Configuration location as set in the Flask application
+            path (string): Resolved path to the JSON configuration file
+            fingerprint (tuple): Modification time (ns) and size of the file when it was read
+            digest (string): SHA-1 of the file contents
+            data (dict): Parsed JSON configuration
+
+        Returns:
+            ConfigurationSnapshot: The compiled snapshot
+        """
+        behaviour = dict(data.get(Settings.CONFIGURATION_BEHAVIOUR, {}))
+        render = {k: v == "true" or v == "True" or v == "1" or v is True for k, v in behaviour.items()}
+        return cls(
+            location=location,
+            path=path,
+            fingerprint=fingerprint,
+            digest=digest,
+            data=data,
+            text=MappingProxyType(dict(data.get(Settings.CONFIGURATION_WEBSITE_TEXT, {}))),
+            behaviour=MappingProxyType(behaviour),
+            render=MappingProxyType(render),
+        )
+
+
 class Settings:
     """The configuration settings for this instance of the website."""
 
-    # Json configuration object
+    # Compiled configuration snapshot (ConfigurationSnapshot) shared by every request of this worker
     configuration = None
+    # Merged text catalogs of the current configuration digest by language
+    _catalogs = {}
 
     # Configuration file key values
     CONFIGURATION_LOCATION = "CONFIG_LOC"
+    # Query parameter selecting the website language and the session key where the choice is kept
+    LANGUAGE_PARAMETER = "lang"
+    SESSION_LANGUAGE = "language"
     # Website configuration sections
     CONFIGURATION_BEHAVIOUR = "behaviourConfiguration"
     CONFIGURATION_COMPARISON = "comparisonConfiguration"
@@ -30,6 +86,7 @@ class Settings:
     BEHAVIOUR_ALLOW_TIES = "allowTies"
     BEHAVIOUR_ALLOW_SKIP = "allowSkip"
     BEHAVIOUR_ALLOW_BACK = "allowBack"
+    BEHAVIOUR_ITEM_PREFERENCE_PAGE_SIZE = "itemPreferencePageSize"
     BEHAVIOUR_USER_INSTRUCTION_HTML = "userInstructionHtml"
     BEHAVIOUR_ETHICS_AGREEMENT_HTML = "userEthicsAgreementHtml"
     BEHAVIOUR_SITE_POLICIES_HTML = "sitePoliciesHtml"
@@ -40,6 +97,7 @@ class Settings:
     GROUP_DISPLAY_NAME = "displayName"
     GROUP_ITEMS = "items"
     GROUP_ITEMS_WEIGHT = "weight"
+    GROUP_ITEMS_WEIGHT_FILE = "weightFile"
     # Items related configuration keys
     ITEM_ID = "id"
     ITEM_NAME = "name"
@@ -78,6 +136,8 @@ class Settings:
     ITEM_SELECTION_QUESTION_LABEL = "itemSelectionQuestionLabel"
     ITEM_SELECTION_YES_BUTTON_LABEL = "itemSelectionYesButtonLabel"
     ITEM_SELECTION_NO_BUTTON_LABEL = "itemSelectionNoButtonLabel"
+    ITEM_SELECTION_GRID_INSTRUCTION_LABEL = "itemSelectionGridInstructionLabel"
+    ITEM_SELECTION_GRID_CONTINUE_BUTTON_LABEL = "itemSelectionGridContinueButtonLabel"
     RANK_ITEM_SELECTED_INDICATOR_LABEL = "itemSelectedIndicatorLabel"
     RANK_ITEM_TIED_SELECTION_INDICATOR_LABEL = "rankItemTiedSelectionIndicatorLabel"
     RANK_ITEM_SKIPPED_SELECTION_INDICATOR_LABEL = "rankItemSkippedIndicatorLabel"
@@ -121,6 +181,9 @@ class Settings:
             app (Flask app): Website main application
             loc (string): Path for the configuration file
         """
+        if app.config.get(cls.CONFIGURATION_LOCATION) == loc and cls.configuration is not None:
+            # Same location, keep the compiled snapshot. Changes to the file are picked up by refresh.
+            return
         app.config[cls.CONFIGURATION_LOCATION] = loc
         cls.configuration = None  # make sure we clear the settings from the previous location
 
@@ -142,6 +205,24 @@ class Settings:
         location = os.path.abspath(os.path.dirname(__file__)) + "/../" + location
         return location
 
+    @classmethod
+    def get_weight_file_location(cls, group, app):
+        """Get the location of the file holding the custom weights of a group.
+
+        The file is in the same folder as the website configuration file.
+
+        Args:
+            group (dict): Group configuration
+            app (Flask app): Flask application
+
+        Returns:
+            string: Path to the weight file
+        """
+        location = cls.get_configuration_location(app)
+        if not os.path.isdir(location):
+            location = os.path.dirname(location)
+        return os.path.join(location, group[cls.GROUP_ITEMS_WEIGHT_FILE])
+
     @classmethod
     def configuration_has_key(cls, label, app):
         """Check if the requested label is in either the website text or behaviour sections of the configuration file.
@@ -153,12 +234,8 @@ class Settings:
         Returns:
             boolean: True if the label exists, False it if does not
         """
-        conf = cls.get_configuration(app)
-        if label in conf[cls.CONFIGURATION_WEBSITE_TEXT]:
-            return True
-        if label in conf[cls.CONFIGURATION_BEHAVIOUR]:
-            return True
-        return False
+        snapshot = cls.get_snapshot(app)
+        return label in snapshot.text or label in snapshot.behaviour
 
     @classmethod
     def get_configuration(cls, app, force_reload=False):
@@ -170,15 +247,53 @@ class Settings:
         Returns:
             json: website configuration object
         """
-        if cls.CONFIGURATION_LOCATION not in app.config:
-            app.logger.critical("Configuration location not set in the application yet")
-            exit()
+        if force_reload:
+            return cls._load(app).data
+        return cls.get_snapshot(app).data
 
-        if cls.configuration is None or force_reload:
-            app.logger.info("Loading website configuration")
-            cls.configuration = cls._unmarshall(app)
+    @classmethod
+    def get_snapshot(cls, app):
+        """Get the compiled configuration snapshot, loading it the first time it is requested.
 
-        return cls.configuration
+        Args:
+            app (Flask app): Flask application
+
+        Returns:
+            ConfigurationSnapshot: Compiled website configuration
+        """
+        snapshot = cls.configuration
+        if snapshot is not None and snapshot.location == app.config.get(cls.CONFIGURATION_LOCATION):
+            return snapshot
+        return cls._load(app)
+
+    @classmethod
+    def refresh(cls, app):
+        """Rebuild the configuration snapshot if the configuration file has changed on disk.
+
+        Only the file metadata is checked while the fingerprint matches. When it differs the content hash decides
+        whether the snapshot has to be compiled again.
+
+        Args:
+            app (Flask app): Flask application
+
+        Returns:
+            ConfigurationSnapshot: The current configuration snapshot
+        """
+        snapshot = cls.get_snapshot(app)
+        try:
+            fingerprint = cls._fingerprint(snapshot.path)
+        except OSError:
+            # Let the integrity check report the missing file
+            return snapshot
+        if fingerprint == snapshot.fingerprint:
+            return snapshot
+
+        with open(snapshot.path, 'rb') as config_file:
+            content = config_file.read()
+        if hashlib.sha1(content).hexdigest() == snapshot.digest:
+            cls.configuration = replace(snapshot, fingerprint=fingerprint)
+            return cls.configuration
+        return cls._load(app)
 
     @classmethod
     def get_text(cls, label, app):
@@ -191,18 +306,61 @@ class Settings:
         Returns:
             string: Text configuration for the specified label
         """
-        conf = cls.get_configuration(app)
-
-        # first try the project configuration
-        if label in conf[cls.CONFIGURATION_WEBSITE_TEXT]:
-            return conf[cls.CONFIGURATION_WEBSITE_TEXT][label]
-        # now try the language configuration
-        if label in app.language_config[cls.CONFIGURATION_WEBSITE_TEXT]:
-            return app.language_config[cls.CONFIGURATION_WEBSITE_TEXT][label]
+        catalog = cls.get_catalog(app)
+        if label in catalog:
+            return catalog[label]
         # raise an error
         app.logger.critical(f"Label {label} wasn't found in the project configuration or the language configuration.")
         exit()
 
+    @classmethod
+    def get_language(cls, app):
+        """Get the language of the website text shown for the current request.
+
+        Args:
+            app (Flask app): Flask application
+
+        Returns:
+            string: The language chosen by the user (see LANGUAGE_PARAMETER) if it was loaded when the application was
+            created, the application language otherwise or outside of a request
+        """
+        if has_request_context():
+            language = session.get(cls.SESSION_LANGUAGE)
+            if language in app.language_configs:
+                return language
+        return app.language
+
+    @classmethod
+    def get_catalog(cls, app, language=None):
+        """Get all of the website text for a language.
+
+        The project configuration text takes priority over the language configuration text. The catalog is built once
+        per configuration version and language, the catalogs of the previous versions are discarded.
+
+        Args:
+            app (Flask app): Flask application
+            language (string, optional): Language code. Defaults to None which uses the language of the current
+                                         request (see get_language).
+
+        Returns:
+            MappingProxyType: Read only mapping of label to text
+        """
+        snapshot = cls.get_snapshot(app)
+        if language is None:
+            language = cls.get_language(app)
+        key = (snapshot.digest, language)
+        catalog = cls._catalogs.get(key)
+        if catalog is None:
+            if language not in app.language_configs:
+                app.logger.critical(f"Language {language} was not loaded when the application was created.")
+                exit()
+            language_text = app.language_configs[language].get(cls.CONFIGURATION_WEBSITE_TEXT, {})
+            catalog = MappingProxyType({**language_text, **snapshot.text})
+            catalogs = {k: v for k, v in cls._catalogs.items() if k[0] == snapshot.digest}
+            catalogs[key] = catalog
+            cls._catalogs = catalogs
+        return catalog
+
     @classmethod
     def get_optional_text(cls, label, app):
         """Get the text to render for a specific label of the website or None if not supplied.
@@ -214,11 +372,7 @@ class Settings:
         Returns:
             string: Text configuration for the specified label or None is not supplied in config
         """
-        conf = cls.get_configuration(app)
-        if label not in conf[cls.CONFIGURATION_WEBSITE_TEXT]:
-            return None
-
-        return conf[cls.CONFIGURATION_WEBSITE_TEXT][label]
+        return cls.get_snapshot(app).text.get(label)
 
     @classmethod
     def get_comparison_conf(cls, key, app):
@@ -276,12 +430,12 @@ class Settings:
         Returns:
             string: Configuration value related to the key
         """
-        conf = cls.get_configuration(app)
-        if key not in conf[cls.CONFIGURATION_BEHAVIOUR]:
+        behaviour = cls.get_snapshot(app).behaviour
+        if key not in behaviour:
             app.logger.critical(f"Label {key} wasn't found in the behaviour configuration.")
             exit()
 
-        return conf[cls.CONFIGURATION_BEHAVIOUR][key]
+        return behaviour[key]
 
     @classmethod
     def get_export_location(cls, app):
@@ -307,28 +461,80 @@ class Settings:
         Returns:
             boolean: True when the section should be rendered, False if not.
         """
-        render = cls.get_behaviour_conf(section, app)
-        return render == "true" or render == "True" or render == "1" or render is True
+        render = cls.get_snapshot(app).render
+        if section not in render:
+            app.logger.critical(f"Label {section} wasn't found in the behaviour configuration.")
+            exit()
+
+        return render[section]
 
     @classmethod
-    def _unmarshall(cls, app):
-        """Load the configuration file into a JSON object.
+    def _load(cls, app):
+        """Read and compile the configuration file, replacing the current snapshot.
 
         Args:
             app (Flask app): Flask application
 
         Returns:
-            JSON: Website configuration object
+            ConfigurationSnapshot: The new configuration snapshot
+        """
+        if cls.CONFIGURATION_LOCATION not in app.config:
+            app.logger.critical("Configuration location not set in the application yet")
+            exit()
+
+        app.logger.info("Loading website configuration")
+        location = cls._get_configuration_file(app)
+        content, config_data = cls._unmarshall(app, location)
+        cls.configuration = ConfigurationSnapshot.compile(
+            app.config[cls.CONFIGURATION_LOCATION],
+            location,
+            cls._fingerprint(location),
+            hashlib.sha1(content).hexdigest(),
+            config_data,
+        )
+        return cls.configuration
+
+    @staticmethod
+    def _fingerprint(path):
+        """Get the modification time (ns) and size of a file."""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def _get_configuration_file(cls, app):
+        """Get the path to the JSON configuration file, resolving configuration directories.
+
+        Args:
+            app (Flask app): Flask application
+
+        Returns:
+            string: Path to the JSON configuration file
         """
         location = cls.get_configuration_location(app)
         if os.path.isdir(location):
             for file in os.listdir(location):
                 if file.lower()[-5:] == ".json":
                     location = os.path.join(location, file)
+        return location
+
+    @classmethod
+    def _unmarshall(cls, app, location):
+        """Load the configuration file into a JSON object.
+
+        Args:
+            app (Flask app): Flask application
+            location (string): Path to the JSON configuration file
+
+        Returns:
+            bytes: Raw file content
+            JSON: Website configuration object
+        """
+        content = None
         config_data = None
         try:
-            with open(location, 'r') as config_file:
-                config_data = json.load(config_file)
+            with open(location, 'rb') as config_file:
+                content = config_file.read()
+            config_data = json.loads(content)
         except IOError:
             app.logger.critical("Website configuration file %s not found" % (location))
             exit()
@@ -338,4 +544,4 @@ class Settings:
         except Exception as e:
             app.logger.critical(e)
             exit()
-        return config_data
+        return content, config_data
@@ -0,0 +1,166 @@
+"""Custom item pair weights of a group kept in a file next to the website configuration."""
+
+import csv
+import os
+
+import numpy as np
+from marshmallow import ValidationError
+
+# Columns of a weight file in CSV format, the same keys as the weights defined in the configuration
+CSV_COLUMNS = ("item_1", "item_2", "weight")
+
+
+def load_weight_file(path, items_name):
+    """Load and validate the custom item pair weights of a group.
+
+    Three formats are accepted:
+    - .npy: a square matrix of weights with a row and a column for each item of the group, in the configured order.
+    - .npz: a `names` array of item names together with either a square `matrix` of weights, with a row and a column
+      for each name, or the `item_1`, `item_2` and `weight` arrays of each pair, the items given as positions in
+      `names`.
+    - .csv: one row per pair with the item_1, item_2 and weight columns, the items given by name.
+    Only the upper triangle of a weight matrix is read, the weight of the pair of items i and j (i < j) is the value in
+    row i and column j.
+
+    Args:
+        path (string): Location of the weight file
+        items_name (list): Names of the group items, in the configured order
+
+    Raises:
+        ValidationError: The file can't be read or doesn't define a valid weight for each pair of items exactly once
+
+    Returns:
+        tuple: Positions in items_name of the first and second item of each pair, and the weight of each pair
+    """
+    name = os.path.basename(path)
+    if not os.path.isfile(path):
+        raise ValidationError(f"Weight file {name} not found.")
+    index = {item_name: position for position, item_name in enumerate(items_name)}
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".npy":
+            first, second, weights = _read_matrix(np.load(path, allow_pickle=False), len(items_name), name)
+        elif extension == ".npz":
+            first, second, weights = _read_npz(path, index, name)
+        elif extension == ".csv":
+            first, second, weights = _read_csv(path, index, name)
+        else:
+            raise ValidationError(f"Weight file {name} must be a .npy, .npz or .csv file.")
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Weight file {name} can't be read. {e}")
+
+    check_weights(weights)
+    check_pairs(items_name, first, second)
+    return first, second, weights
+
+
+def check_weights(weights):
+    """Check that the custom weights are valid.
+
+    Args:
+        weights (numpy.ndarray): Weight of each pair
+
+    Raises:
+        ValidationError: A weight is out of range or the weights don't add up to 1
+    """
+    if not np.all((weights >= 0) & (weights <= 1)):
+        raise ValidationError("Custom weights for item's pairs must be between 0 and 1.")
+    w = float(weights.sum())
+    if w < 0.98 or w > 1.02:
+        raise ValidationError(f"Custom weights for item's pairs must sum close to 1. Actual weight sum {w}.")
+
+
+def check_pairs(items_name, first, second):
+    """Check that each pair of items has exactly one custom weight.
+
+    The order of the items in a pair doesn't matter, each pair is identified by its lower and higher item position.
+
+    Args:
+        items_name (list): Names of the group items
+        first (numpy.ndarray): Position of the first item of each pair
+        second (numpy.ndarray): Position of the second item of each pair
+
+    Raises:
+        ValidationError: A pair is weighted more than once or a pair has no weight
+    """
+    low = np.minimum(first, second)
+    high = np.maximum(first, second)
+
+    # Validate that each item pair is only weighted once
+    keys = low * len(items_name) + high
+    order = np.argsort(keys, kind='stable')
+    repeated = order[1:][keys[order[1:]] == keys[order[:-1]]]
+    if len(repeated) > 0:
+        k = int(repeated.min())
+        pair = (items_name[first[k]], items_name[second[k]])
+        raise ValidationError(f"Custom weight for item pair {pair} defined more than once.")
+
+    # Validate that a weight was custom defined for all item pairs
+    defined = np.zeros((len(items_name), len(items_name)), dtype=bool)
+    defined[low, high] = True
+    missing = np.argwhere(np.triu(~defined, k=1))
+    if len(missing) > 0:
+        i, j = missing[0]
+        raise ValidationError(f"Custom weight for item pair {(items_name[i], items_name[j])} needs to be defined.")
+
+
+def _read_matrix(matrix, size, name):
+    """Read the pairs of the upper triangle of a square weight matrix."""
+    if matrix.ndim != 2 or matrix.shape != (size, size):
+        raise ValidationError(f"The weight matrix of {name} must have {size} rows and {size} columns.")
+    first, second = np.triu_indices(size, k=1)
+    return first, second, matrix[first, second].astype(np.float64)
+
+
+def _read_npz(path, index, name):
+    """Read the weights of an .npz file, returning the pairs as positions of the group items."""
+    with np.load(path, allow_pickle=False) as data:
+        if "names" not in data.files:
+            raise ValidationError(f"Weight file {name} must contain the names of the items.")
+        names = [str(n) for n in data["names"]]
+        unknown = [n for n in names if n not in index]
+        if len(unknown) > 0:
+            raise ValidationError(f"{unknown[0]} not defined as item name.")
+        positions = np.array([index[n] for n in names], dtype=np.int64)
+
+        if "matrix" in data.files:
+            first, second, weights = _read_matrix(data["matrix"], len(names), name)
+        elif all(key in data.files for key in CSV_COLUMNS):
+            first, second = data["item_1"], data["item_2"]
+            weights = data["weight"].astype(np.float64)
+            if not (
+                np.issubdtype(first.dtype, np.integer)
+                and np.issubdtype(second.dtype, np.integer)
+                and first.shape == second.shape == weights.shape
+                and first.ndim == 1
+            ):
+                raise ValidationError(f"The item_1, item_2 and weight arrays of {name} must be lists of equal length.")
+            if len(first) > 0 and (min(first.min(), second.min()) < 0 or max(first.max(), second.max()) >= len(names)):
+                raise ValidationError(f"The items of {name} must be positions in the names array.")
+        else:
+            raise ValidationError(f"Weight file {name} must contain either a matrix or the item_1, item_2 and weight.")
+    return positions[first], positions[second], weights
+
+
+def _read_csv(path, index, name):
+    """Read the weights of a CSV file, returning the pairs as positions of the group items."""
+    first, second, weights = [], [], []
+    with open(path, mode="r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if any(column not in header for column in CSV_COLUMNS):
+            raise ValidationError(f"Weight file {name} must have the columns {', '.join(CSV_COLUMNS)}.")
+        columns = [header.index(column) for column in CSV_COLUMNS]
+        for row in reader:
+            if len(row) == 0:
+                continue
+            if len(row) <= max(columns):
+                raise ValidationError(f"Row {reader.line_num} of {name} must have an item_1, item_2 and weight.")
+            item_1, item_2, weight = (row[c].strip() for c in columns)
+            for item_name in (item_1, item_2):
+                if item_name not in index:
+                    raise ValidationError(f"{item_name} not defined as item name.")
+            first.append(index[item_1])
+            second.append(index[item_2])
+            weights.append(float(weight))
+    return np.array(first, dtype=np.int64), np.array(second, dtype=np.int64), np.array(weights, dtype=np.float64)
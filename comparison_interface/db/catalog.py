@@ -0,0 +1,267 @@
+"""Read only copy of the items being compared and their groups."""
+
+import threading
+
+import numpy as np
+from cachetools import LRUCache
+
+from ..sampling import AliasTable
+from .connection import db
+from .models import CustomItemPair, Item, ItemGroup, UserItem
+from .weights import WeightStore
+
+
+class ItemCatalog:
+    """Keep the items and the group membership in memory.
+
+    Items and groups don't change after the setup command has been executed, so each worker loads them once and
+    answers item lookups and random item selections without querying the database. The catalog is loaded again when
+    the application generation (see IntegrityWatcher.generation) changes.
+
+    The item objects are detached from the database session and must not be modified.
+    """
+
+    def __init__(self, generation, items, group_items, weight_store=None) -> None:
+        """Initialise the catalog.
+
+        Args:
+            generation (tuple): Application generation the catalog was loaded for
+            items (dict): Detached items by item id
+            group_items (dict): Sorted array of item ids by group id
+            weight_store (WeightStore, optional): Files holding the custom item pairs. Defaults to None.
+        """
+        self.generation = generation
+        self._items = items
+        self._group_items = group_items
+        self._weight_store = weight_store
+        # Union of the group item ids by set of group ids
+        self._unions = {}
+        # Custom weighted item pairs (first item ids, second item ids, alias table) by set of group ids
+        self._custom_pairs = {}
+
+    @classmethod
+    def get(cls, app):
+        """Get the item catalog of the application, loading it if required.
+
+        Args:
+            app (Flask app): Website main application
+
+        Returns:
+            ItemCatalog: The item catalog of the current application generation
+        """
+        generation = app.integrity_watcher.generation
+        catalog = app.item_catalog
+        if catalog is None or catalog.generation != generation:
+            catalog = app.item_catalog = cls.load(generation, WeightStore(app))
+        return catalog
+
+    @classmethod
+    def load(cls, generation=None, weight_store=None):
+        """Load the catalog from the database.
+
+        Args:
+            generation (tuple, optional): Application generation the catalog is loaded for. Defaults to None.
+            weight_store (WeightStore, optional): Files holding the custom item pairs. Defaults to None.
+
+        Returns:
+            ItemCatalog: The loaded catalog
+        """
+        items = {}
+        for item in db.session.scalars(db.select(Item)).all():
+            db.session.expunge(item)
+            items[item.item_id] = item
+
+        rows = db.session.execute(
+            db.select(ItemGroup.group_id, ItemGroup.item_id).order_by(ItemGroup.group_id, ItemGroup.item_id)
+        ).all()
+        memberships = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        group_ids, starts = np.unique(memberships[:, 0], return_index=True)
+        group_items = {
+            int(group_id): np.ascontiguousarray(item_ids)
+            for group_id, item_ids in zip(group_ids, np.split(memberships[:, 1], starts[1:]))
+        }
+        return cls(generation, items, group_items, weight_store)
+
+    def get_item(self, item_id):
+        """Get an item by id.
+
+        Args:
+            item_id (int): Item id
+
+        Returns:
+            Item: Model Item | None
+        """
+        return self._items.get(int(item_id))
+
+    def get_group_items(self, group_ids):
+        """Get the ids of the items belonging to any of the groups.
+
+        Args:
+            group_ids (list): Group ids
+
+        Returns:
+            numpy.ndarray: Sorted unique item ids. The array is shared and must not be modified.
+        """
+        key = frozenset(int(group_id) for group_id in group_ids)
+        item_ids = self._unions.get(key)
+        if item_ids is None:
+            arrays = [self._group_items[group_id] for group_id in key if group_id in self._group_items]
+            if len(arrays) == 1:
+                item_ids = arrays[0]
+            else:
+                item_ids = np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.int64)
+            item_ids.flags.writeable = False
+            self._unions[key] = item_ids
+        return item_ids
+
+    def draw_pair(self, rng, group_ids):
+        """Select two different items at random, with equal probability, from the groups.
+
+        Args:
+            rng (numpy.random.Generator): Random number generator
+            group_ids (list): Group ids
+
+        Returns:
+            Item: Model Item | None
+            Item: Model Item | None
+        """
+        return self.draw_pair_from(rng, self.get_group_items(group_ids))
+
+    def draw_pair_from(self, rng, item_ids):
+        """Select two different items at random, with equal probability, from a list of item ids.
+
+        Args:
+            rng (numpy.random.Generator): Random number generator
+            item_ids (numpy.ndarray): Unique item ids
+
+        Returns:
+            Item: Model Item | None
+            Item: Model Item | None
+        """
+        size = len(item_ids)
+        if size < 2:
+            return None, None
+
+        # Draw the second position from the remaining positions so the two items are always different
+        first = int(rng.integers(size))
+        second = int(rng.integers(size - 1))
+        if second >= first:
+            second += 1
+        return self._items[int(item_ids[first])], self._items[int(item_ids[second])]
+
+    def get_custom_pairs(self, group_ids):
+        """Get the custom weighted item pairs of the groups, loading them on first use.
+
+        The pairs are memory mapped from the weight store written by the setup command. The database is used when the
+        files of this generation are not available.
+
+        Args:
+            group_ids (list): Group ids
+
+        Returns:
+            tuple: Array of first item ids, array of second item ids and the alias table of the pair weights, or None
+            if the groups don't have custom weighted pairs
+        """
+        key = frozenset(int(group_id) for group_id in group_ids)
+        if key not in self._custom_pairs:
+            self._custom_pairs[key] = self._load_stored_pairs(key) or self._load_database_pairs(key)
+        return self._custom_pairs[key]
+
+    def _load_stored_pairs(self, group_ids):
+        """Memory map the custom item pairs of the groups from the weight store.
+
+        Returns:
+            tuple: Pairs as returned by get_custom_pairs or None if a group file is not available
+        """
+        if self._weight_store is None or len(group_ids) == 0:
+            return None
+        stored = [self._weight_store.read(self.generation, group_id) for group_id in sorted(group_ids)]
+        if any(pairs is None for pairs in stored):
+            return None
+        if len(stored) == 1:
+            pairs = stored[0]
+            return pairs['item_1_id'], pairs['item_2_id'], AliasTable.from_arrays(pairs['prob'], pairs['alias'])
+
+        # The stored alias tables are built per group, several groups need a table of their combined weights
+        pairs = np.concatenate(stored)
+        return pairs['item_1_id'], pairs['item_2_id'], AliasTable(pairs['weight'])
+
+    def _load_database_pairs(self, group_ids):
+        """Load the custom item pairs of the groups from the database.
+
+        Returns:
+            tuple: Pairs as returned by get_custom_pairs or None if the groups don't have custom weighted pairs
+        """
+        rows = db.session.execute(
+            db.select(CustomItemPair.item_1_id, CustomItemPair.item_2_id, CustomItemPair.weight)
+            .where(CustomItemPair.group_id.in_(group_ids))
+            .order_by(CustomItemPair.custom_item_pair_id)
+        ).all()
+        if len(rows) == 0:
+            return None
+        item_1_ids, item_2_ids, weights = zip(*rows)
+        return np.array(item_1_ids, dtype=np.int64), np.array(item_2_ids, dtype=np.int64), AliasTable(weights)
+
+    def draw_custom_pair(self, rng, group_ids):
+        """Select an item pair at random respecting the custom pair weights of the groups.
+
+        Args:
+            rng (numpy.random.Generator): Random number generator
+            group_ids (list): Group ids
+
+        Returns:
+            Item: Model Item | None
+            Item: Model Item | None
+        """
+        pairs = self.get_custom_pairs(group_ids)
+        if pairs is None:
+            return None, None
+        item_1_ids, item_2_ids, table = pairs
+        pair = table.draw(rng)
+        return self._items[int(item_1_ids[pair])], self._items[int(item_2_ids[pair])]
+
+
+class KnownItems:
+    """Keep the ids of the items known by each user in memory.
+
+    A user's known items only change while the user states the item preferences. Each change increases a version
+    number kept in the user's session, so a cached entry is only used for the version it was loaded for and all the
+    workers see the change. The user ids are reused after the database is set up again, so the entries are also kept
+    per application generation. The least recently used entries are removed when the cache is full.
+    """
+
+    def __init__(self, maxsize) -> None:
+        """Initialise the cache.
+
+        Args:
+            maxsize (int): Maximum number of cached users
+        """
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version, generation):
+        """Get the ids of the items known by a user, loading them on first use.
+
+        Args:
+            user_id (int): User id
+            version (int): Version of the user's item preferences
+            generation (tuple): Application generation (see IntegrityWatcher.generation)
+
+        Returns:
+            numpy.ndarray: Sorted unique item ids. The array is shared and must not be modified.
+        """
+        key = (int(user_id), version, generation)
+        with self._lock:
+            item_ids = self._cache.get(key)
+        if item_ids is None:
+            rows = db.session.scalars(
+                db.select(UserItem.item_id)
+                .where(UserItem.user_id == user_id, UserItem.known == 1)
+                .distinct()
+                .order_by(UserItem.item_id)
+            ).all()
+            item_ids = np.array(rows, dtype=np.int32)
+            item_ids.flags.writeable = False
+            with self._lock:
+                self._cache[key] = item_ids
+        return item_ids
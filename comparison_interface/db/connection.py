@@ -1,7 +1,50 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
 
+# Recommended SQLite settings when several server processes write to the same database (see docs/installation.md)
+PRODUCTION_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+def configure_sqlite(app):
+    """Apply the SQLite pragmas listed in the SQLITE_PRAGMAS setting to every new database connection.
+
+    Args:
+        app (Flask app): Website main application, the database must be registered already
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+    # Pragma names and values can't be passed as parameters so only known names and plain values are accepted
+    statements = []
+    for name, value in pragmas.items():
+        if name not in PRODUCTION_SQLITE_PRAGMAS:
+            raise RuntimeError(f"The SQLite pragma {name} is not supported.")
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise RuntimeError(f"The value of the SQLite pragma {name} is not valid.")
+        statements.append(f"PRAGMA {name} = {value}")
+
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    for engine in engines:
+        event.listen(engine, 'connect', _apply_pragmas)
+
 
 def persist(conn, obj):
     """Make an object persistent in the database.
@@ -0,0 +1,95 @@
+"""Number of comparisons made and skipped by each user."""
+
+from .connection import db
+from .models import Comparison, User
+
+
+class JudgementCounters:
+    """Maintain the compared and skipped comparison counters stored on each user.
+
+    The counters are updated in the same transaction as the comparison they count, so the rank page can display them
+    without counting the user's comparisons.
+    """
+
+    # Counter changed by a comparison in each state
+    COMPARED_STATES = (Comparison.SELECTED, Comparison.TIED)
+    SKIPPED_STATES = (Comparison.SKIPPED,)
+
+    @classmethod
+    def update(cls, user_id, previous_state, state):
+        """Update the user's counters for a new or rejudged comparison.
+
+        The change is added to the current database transaction, the caller commits it together with the comparison.
+
+        Args:
+            user_id (int): User id
+            previous_state (string): State of the comparison before the change, None for a new comparison
+            state (string): State of the comparison after the change
+        """
+        compared, skipped = cls.changes(previous_state, state)
+        if compared == 0 and skipped == 0:
+            return
+        db.session.execute(
+            db.update(User)
+            .where(User.user_id == user_id)
+            .values(compared_count=User.compared_count + compared, skipped_count=User.skipped_count + skipped)
+        )
+
+    @classmethod
+    def changes(cls, previous_state, state):
+        """Get the change of each counter for a new or rejudged comparison.
+
+        Args:
+            previous_state (string): State of the comparison before the change, None for a new comparison
+            state (string): State of the comparison after the change
+
+        Returns:
+            compared: Change of the number of comparisons made
+            skipped: Change of the number of comparisons skipped
+        """
+        compared = cls._count(state, cls.COMPARED_STATES) - cls._count(previous_state, cls.COMPARED_STATES)
+        skipped = cls._count(state, cls.SKIPPED_STATES) - cls._count(previous_state, cls.SKIPPED_STATES)
+        return compared, skipped
+
+    @classmethod
+    def repair(cls):
+        """Rebuild the counters of every user from the comparison table.
+
+        Returns:
+            int: Number of users updated
+        """
+        users = cls.recount()
+        db.session.commit()
+        return users
+
+    @classmethod
+    def recount(cls, user_ids=None):
+        """Count the comparisons of the users again.
+
+        The change is added to the current database transaction, the caller commits it.
+
+        Args:
+            user_ids (list, optional): Ids of the users to count the comparisons of. Defaults to None, all users.
+
+        Returns:
+            int: Number of users updated
+        """
+
+        def count(states):
+            return (
+                db.select(db.func.count(Comparison.comparison_id))
+                .where(Comparison.user_id == User.user_id, Comparison.state.in_(states))
+                .scalar_subquery()
+            )
+
+        query = db.update(User).values(
+            compared_count=count(cls.COMPARED_STATES), skipped_count=count(cls.SKIPPED_STATES)
+        )
+        if user_ids is not None:
+            query = query.where(User.user_id.in_(user_ids))
+        return db.session.execute(query).rowcount
+
+    @staticmethod
+    def _count(state, states):
+        """Get 1 if the state is counted by a counter, 0 if not."""
+        return 1 if state in states else 0
@@ -0,0 +1,517 @@
+"""Append only journal of the judgements made on the rank page."""
+
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .connection import db
+from .counters import JudgementCounters
+from .models import Comparison, JournalSegment, JournalState
+
+# Comparison id, user id, item ids, selected item id (0 for none), state, created and updated time in nanoseconds
+RECORD = struct.Struct('<qiiiiBqq')
+CHECKSUM = struct.Struct('<I')
+RECORD_SIZE = RECORD.size + CHECKSUM.size
+STATES = (Comparison.SELECTED, Comparison.TIED, Comparison.SKIPPED)
+
+
+def _to_datetime(nanoseconds):
+    """Convert a time in nanoseconds since the epoch to the local time stored in the database."""
+    return datetime.fromtimestamp(nanoseconds // 10**9) + timedelta(microseconds=nanoseconds % 10**9 // 1000)
+
+
+def _to_nanoseconds(date):
+    """Convert a time read from the database to nanoseconds since the epoch."""
+    return int(date.replace(microsecond=0).timestamp()) * 10**9 + date.microsecond * 1000
+
+
+@dataclass(frozen=True)
+class JournalRecord:
+    """State of a comparison written to the journal.
+
+    A new record is written every time a comparison is made or rejudged, the record with the latest updated time holds
+    the current state of the comparison.
+    """
+
+    comparison_id: int
+    user_id: int
+    item_1_id: int
+    item_2_id: int
+    selected_item_id: Optional[int]
+    state: str
+    created: int  # Nanoseconds since the epoch
+    updated: int  # Nanoseconds since the epoch
+
+    @classmethod
+    def from_comparison(cls, comparison):
+        """Get the record of a comparison stored in the database."""
+        return cls(
+            comparison.comparison_id,
+            comparison.user_id,
+            comparison.item_1_id,
+            comparison.item_2_id,
+            comparison.selected_item_id,
+            comparison.state,
+            _to_nanoseconds(comparison.created),
+            _to_nanoseconds(comparison.updated),
+        )
+
+    def pack(self):
+        """Encode the record followed by its checksum."""
+        data = RECORD.pack(
+            self.comparison_id,
+            self.user_id,
+            self.item_1_id,
+            self.item_2_id,
+            self.selected_item_id or 0,
+            STATES.index(self.state),
+            self.created,
+            self.updated,
+        )
+        return data + CHECKSUM.pack(zlib.crc32(data))
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        """Decode a record.
+
+        Returns:
+            JournalRecord: The record or None if the checksum doesn't match
+        """
+        (checksum,) = CHECKSUM.unpack_from(data, offset + RECORD.size)
+        if zlib.crc32(data[offset : offset + RECORD.size]) != checksum:
+            return None
+        comparison_id, user_id, item_1_id, item_2_id, selected_item_id, state, created, updated = RECORD.unpack_from(
+            data, offset
+        )
+        if state >= len(STATES):
+            return None
+        return cls(
+            comparison_id, user_id, item_1_id, item_2_id, selected_item_id or None, STATES[state], created, updated
+        )
+
+    def values(self):
+        """Get the comparison table values of the record."""
+        return {
+            'comparison_id': self.comparison_id,
+            'user_id': self.user_id,
+            'item_1_id': self.item_1_id,
+            'item_2_id': self.item_2_id,
+            'selected_item_id': self.selected_item_id,
+            'state': self.state,
+            'created': _to_datetime(self.created),
+            'updated': _to_datetime(self.updated),
+        }
+
+
+@dataclass
+class _TailSegment:
+    """Part of a segment read by a process waiting for the segment to be ingested."""
+
+    path: str
+    offset: int = 0
+    records: list = field(default_factory=list)
+
+
+def read_segment(path, offset=0):
+    """Read the records of a segment file.
+
+    Args:
+        path (string): Segment file path
+        offset (int, optional): Position of the first record to read. Defaults to 0.
+
+    Returns:
+        list: The records up to the end of the file or up to the first invalid record
+        int: Position after the last record read
+        bool: True if the file was read completely, False if an invalid or incomplete record was found
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    records = []
+    position = 0
+    while position + RECORD_SIZE <= len(data):
+        record = JournalRecord.unpack(data, position)
+        if record is None:
+            break
+        records.append(record)
+        position += RECORD_SIZE
+    return records, offset + position, position == len(data)
+
+
+class JudgementJournal:
+    """Write the judgements to segment files that are later written to the comparison table.
+
+    Appending a small checksummed record to a file costs much less than a database transaction, so the rank page can
+    accept judgements at a higher rate. Each server process appends to its own segment file and starts a new one every
+    few seconds. Segments that are no longer written to are ingested: their records are written to the comparison table
+    in one transaction, recorded in the journal_segment table and the files are deleted. Ingestion can be run any number
+    of times for the same segment, a comparison always ends in the state of its latest record.
+
+    Comparison ids are reserved from the database in blocks so each process can give ids to new comparisons straight
+    away. Until a segment is ingested, the judgement counters and the rejudging of comparisons read the records of the
+    journal files that are still waiting.
+    """
+
+    FOLDER = 'journal'
+    # A segment is closed after this number of seconds or bytes
+    SEGMENT_SECONDS = 5
+    SEGMENT_SIZE = 4 * 1024 * 1024
+    # Number of comparison ids reserved at once by each process
+    ID_BLOCK_SIZE = 1000
+    OPEN = '.open'
+    CLOSED = '.segment'
+    CORRUPT = '.corrupt'
+    # Maximum number of seconds between two listings of the journal folder when reading the waiting records, the
+    # folder is also listed as soon as its modification time changes
+    TAIL_SCAN_INTERVAL = 1
+
+    def __init__(self, app, ingest_interval=0) -> None:
+        """Initialise the journal.
+
+        Args:
+            app (Flask app): Website main application
+            ingest_interval (int, optional): Seconds between ingestions run by a background thread of each process.
+                Defaults to 0, the segments are only ingested by the ingest-journal command.
+        """
+        self.app = app
+        self.location = os.path.join(app.instance_path, self.FOLDER)
+        self._ingest_interval = ingest_interval
+        self._lock = threading.Lock()
+        # Server workers can be forked after the app is created, the segment and ids of a process are never shared
+        self._pid = None
+        self._fd = None
+        self._segment = None
+        self._segment_start = 0
+        self._segment_size = 0
+        self._next_id = 0
+        self._end_id = 0
+        # Records of the segments waiting to be ingested, read incrementally
+        self._tail_lock = threading.Lock()
+        self._tail = {}
+        self._pending = {}
+        self._scanned_at = None
+        self._scanned_mtime = None
+
+    def clear(self):
+        """Remove the journal files."""
+        if os.path.exists(self.location):
+            shutil.rmtree(self.location)
+
+    def new_comparison_id(self):
+        """Get the id of a new comparison.
+
+        Returns:
+            int: Comparison id not used by any other comparison
+        """
+        with self._lock:
+            self._check_process()
+            if self._next_id >= self._end_id:
+                self._reserve_ids()
+            comparison_id = self._next_id
+            self._next_id += 1
+            return comparison_id
+
+    def append(self, record):
+        """Append a record to the segment of this process.
+
+        Args:
+            record (JournalRecord): The new state of a comparison
+        """
+        with self._lock:
+            self._check_process()
+            now = time.time_ns()
+            if (
+                self._fd is None
+                or self._segment_size >= self.SEGMENT_SIZE
+                or now - self._segment_start > self.SEGMENT_SECONDS * 10**9
+            ):
+                self._rotate(now)
+            os.write(self._fd, record.pack())
+            self._segment_size += RECORD_SIZE
+
+    def find(self, user_id, comparison_id):
+        """Get the current state of a user's comparison, either from the journal or from the database.
+
+        Args:
+            user_id (int): User id
+            comparison_id (int): Comparison id
+
+        Returns:
+            JournalRecord: The comparison state or None if the user doesn't have this comparison
+        """
+        record = self.pending(user_id).get(int(comparison_id))
+        comparison = db.session.scalars(
+            db.select(Comparison).where(Comparison.comparison_id == comparison_id, Comparison.user_id == user_id)
+        ).first()
+        if comparison is not None:
+            stored = JournalRecord.from_comparison(comparison)
+            if record is None or stored.updated >= record.updated:
+                return stored
+        return record
+
+    def counter_changes(self, user_id):
+        """Get the change of the user's judgement counters made by the records waiting to be ingested.
+
+        Args:
+            user_id (int): User id
+
+        Returns:
+            compared: Change of the number of comparisons made
+            skipped: Change of the number of comparisons skipped
+        """
+        pending = self.pending(user_id)
+        if len(pending) == 0:
+            return 0, 0
+        stored = {
+            row.comparison_id: row
+            for row in db.session.execute(
+                db.select(Comparison.comparison_id, Comparison.state, Comparison.updated).where(
+                    Comparison.comparison_id.in_(pending)
+                )
+            )
+        }
+        compared = 0
+        skipped = 0
+        for comparison_id, record in pending.items():
+            row = stored.get(comparison_id)
+            if row is not None and _to_nanoseconds(row.updated) >= record.updated:
+                # Already ingested, the file is deleted after the transaction
+                continue
+            changes = JudgementCounters.changes(row.state if row is not None else None, record.state)
+            compared += changes[0]
+            skipped += changes[1]
+        return compared, skipped
+
+    def pending(self, user_id):
+        """Get the latest record of each comparison of a user found in the segments waiting to be ingested.
+
+        Args:
+            user_id (int): User id
+
+        Returns:
+            dict: Journal records by comparison id
+        """
+        with self._tail_lock:
+            self._refresh_tail()
+            return dict(self._pending.get(int(user_id), {}))
+
+    def ingest(self, include_open=False):
+        """Write the closed segments to the comparison table.
+
+        Args:
+            include_open (bool, optional): Also ingest the segments that are still written to. Only safe when the
+                server isn't running. Defaults to False.
+
+        Returns:
+            int: Number of segments ingested
+            int: Number of records ingested
+        """
+        segments = self._list_segments()
+        now = time.time_ns()
+        paths = {}
+        for name, path in segments.items():
+            # A segment isn't written to once it was closed or after twice its maximum age
+            stale = now - self._segment_time(name) > 2 * self.SEGMENT_SECONDS * 10**9
+            if path.endswith(self.CLOSED) or include_open or stale:
+                paths[name] = path
+        if len(paths) == 0:
+            return 0, 0
+
+        ingested = set(db.session.scalars(db.select(JournalSegment.name).where(JournalSegment.name.in_(paths))))
+        records = []
+        counts = {}
+        corrupt = []
+        for name, path in sorted(paths.items()):
+            if name in ingested:
+                continue
+            segment_records, _, complete = read_segment(path)
+            if not complete:
+                self.app.logger.error(
+                    f"The journal segment {path} holds an invalid record, it was kept as {name}{self.CORRUPT}."
+                )
+                corrupt.append(name)
+            records += segment_records
+            counts[name] = len(segment_records)
+
+        if len(records) > 0:
+            query = sqlite_insert(Comparison)
+            new = query.excluded
+            # The records of a comparison can be ingested in any order, the latest one sets the state
+            newer = new.updated > Comparison.updated
+            query = query.on_conflict_do_update(
+                index_elements=[Comparison.comparison_id],
+                set_={
+                    'state': db.case((newer, new.state), else_=Comparison.state),
+                    'selected_item_id': db.case((newer, new.selected_item_id), else_=Comparison.selected_item_id),
+                    'created': db.func.min(Comparison.created, new.created),
+                    'updated': db.func.max(Comparison.updated, new.updated),
+                },
+            )
+            db.session.execute(query, [record.values() for record in records])
+            JudgementCounters.recount({record.user_id for record in records})
+        if len(counts) > 0:
+            db.session.execute(
+                sqlite_insert(JournalSegment).on_conflict_do_nothing(),
+                [{'name': name, 'record_count': count} for name, count in counts.items()],
+            )
+        db.session.commit()
+
+        for name, path in paths.items():
+            try:
+                if name in corrupt:
+                    os.replace(path, os.path.join(self.location, name + self.CORRUPT))
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Ingested by another process
+                pass
+        return len(counts), len(records)
+
+    def waiting_records(self):
+        """Count the records of the segments that haven't been ingested yet.
+
+        Returns:
+            int: Number of records
+        """
+        count = 0
+        for path in self._list_segments().values():
+            try:
+                count += os.path.getsize(path) // RECORD_SIZE
+            except FileNotFoundError:
+                # Ingested in the meantime
+                pass
+        return count
+
+    def _check_process(self):
+        """Reset the segment and the comparison ids inherited from a parent process."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._fd = None
+        self._segment = None
+        self._next_id = self._end_id = 0
+        if self._ingest_interval > 0:
+            threading.Thread(target=self._run_ingester, name='journal-ingester', daemon=True).start()
+
+    def _reserve_ids(self):
+        """Reserve a block of comparison ids, starting after any id used by the comparison table."""
+        db.session.execute(
+            sqlite_insert(JournalState).values(journal_state_id=1, next_comparison_id=1).on_conflict_do_nothing()
+        )
+        first_free = db.select(db.func.coalesce(db.func.max(Comparison.comparison_id), 0) + 1).scalar_subquery()
+        end = db.session.execute(
+            db.update(JournalState)
+            .where(JournalState.journal_state_id == 1)
+            .values(next_comparison_id=db.func.max(JournalState.next_comparison_id, first_free) + self.ID_BLOCK_SIZE)
+            .returning(JournalState.next_comparison_id)
+        ).scalar_one()
+        db.session.commit()
+        self._next_id = end - self.ID_BLOCK_SIZE
+        self._end_id = end
+
+    def _rotate(self, now):
+        """Close the current segment and start a new one."""
+        if self._fd is not None:
+            os.close(self._fd)
+            try:
+                os.replace(self._segment + self.OPEN, self._segment + self.CLOSED)
+            except FileNotFoundError:
+                # Already ingested as a stale segment
+                pass
+        os.makedirs(self.location, exist_ok=True)
+        self._segment = os.path.join(self.location, f"{now}-{self._pid}")
+        self._fd = os.open(self._segment + self.OPEN, os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_EXCL, 0o644)
+        self._segment_start = now
+        self._segment_size = 0
+
+    def _list_segments(self):
+        """Get the path of each segment waiting to be ingested by segment name."""
+        if not os.path.exists(self.location):
+            return {}
+        segments = {}
+        for file in os.listdir(self.location):
+            name, extension = os.path.splitext(file)
+            if extension in (self.OPEN, self.CLOSED):
+                segments[name] = os.path.join(self.location, file)
+        return segments
+
+    @staticmethod
+    def _segment_time(name):
+        """Get the time a segment was started from its name."""
+        return int(name.split('-')[0])
+
+    def _refresh_tail(self):
+        """Merge the records appended to the segments since the last call and forget the ingested segments.
+
+        Only the new part of each segment is read. The journal folder is listed again when its modification time has
+        changed, which happens when a segment is started, closed or ingested, or after TAIL_SCAN_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        try:
+            mtime = os.stat(self.location).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if (
+            self._scanned_at is None
+            or mtime != self._scanned_mtime
+            or now - self._scanned_at >= self.TAIL_SCAN_INTERVAL
+        ):
+            self._scanned_at = now
+            self._scanned_mtime = mtime
+            self._scan_segments()
+
+        for segment in self._tail.values():
+            try:
+                if os.path.getsize(segment.path) <= segment.offset:
+                    continue
+                records, segment.offset, _ = read_segment(segment.path, segment.offset)
+            except FileNotFoundError:
+                # Closed or ingested in the meantime, the folder is listed again on the next call
+                self._scanned_at = None
+                continue
+            segment.records.extend(records)
+            for record in records:
+                user_records = self._pending.setdefault(record.user_id, {})
+                latest = user_records.get(record.comparison_id)
+                if latest is None or record.updated >= latest.updated:
+                    user_records[record.comparison_id] = record
+
+    def _scan_segments(self):
+        """Start reading the new segments and forget the records of the segments that were ingested."""
+        segments = self._list_segments()
+        for name in list(self._tail):
+            if name not in segments:
+                # Once ingested the comparison table holds the latest state of the segment's comparisons
+                for record in self._tail.pop(name).records:
+                    user_records = self._pending.get(record.user_id)
+                    if user_records is not None and user_records.get(record.comparison_id) is record:
+                        del user_records[record.comparison_id]
+                        if len(user_records) == 0:
+                            del self._pending[record.user_id]
+        for name, path in segments.items():
+            if name in self._tail:
+                # The segment may have been closed since the last listing
+                self._tail[name].path = path
+            else:
+                self._tail[name] = _TailSegment(path)
+
+    def _run_ingester(self):
+        """Ingest the closed segments at regular intervals."""
+        while True:
+            time.sleep(self._ingest_interval)
+            with self.app.app_context():
+                try:
+                    self.ingest()
+                except Exception as e:
+                    self.app.logger.error(f"The judgement journal couldn't be ingested: {e}")
+                finally:
+                    db.session.remove()
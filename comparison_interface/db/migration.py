@@ -0,0 +1,70 @@
+"""Bring the database of a running website up to date with the models."""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from .connection import db
+
+
+class Migration:
+    """Add the tables, columns and indexes declared by the models that are missing from an existing database.
+
+    The migration never drops or modifies existing tables, so the data collected by the website is kept. It can be run
+    any number of times.
+    """
+
+    def __init__(self, app) -> None:
+        """Initialise the Migration with the Flask app."""
+        self.app = app
+
+    def exec(self):
+        """Migrate the website database.
+
+        Returns:
+            list: Names of the tables, columns and indexes that were created
+        """
+        with self.app.app_context():
+            created = self._create_tables()
+            created += self._add_columns()
+            created += self._create_indexes()
+        return created
+
+    def _create_tables(self):
+        """Create the tables that don't exist yet, including their indexes."""
+        existing = set(inspect(db.engine).get_table_names())
+        missing = [table for table in db.metadata.sorted_tables if table.name not in existing]
+        db.metadata.create_all(db.engine, tables=missing)
+        for table in missing:
+            self.app.logger.info(f"Created table {table.name}.")
+        return [table.name for table in missing]
+
+    def _add_columns(self):
+        """Add the columns of the existing tables that don't exist yet.
+
+        New columns must be nullable or have a server default so they can be added to tables holding data.
+        """
+        inspector = inspect(db.engine)
+        created = []
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    definition = CreateColumn(column).compile(dialect=db.engine.dialect)
+                    db.session.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {definition}'))
+                    self.app.logger.info(f"Added column {column.name} to table {table.name}.")
+                    created.append(f"{table.name}.{column.name}")
+        db.session.commit()
+        return created
+
+    def _create_indexes(self):
+        """Create the indexes of the existing tables that don't exist yet."""
+        inspector = inspect(db.engine)
+        created = []
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(db.engine)
+                    self.app.logger.info(f"Created index {index.name} on table {table.name}.")
+                    created.append(index.name)
+        return created
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy.schema import UniqueConstraint
+import numpy as np
+from sqlalchemy.schema import Index, UniqueConstraint
 
 from .connection import db
 
@@ -74,7 +75,11 @@ class ItemGroup(db.Model, BaseModel):
     group_id = db.Column(db.Integer, db.ForeignKey('group.group_id'), nullable=False)
     created_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
 
-    __table_args__ = (UniqueConstraint('item_id', 'group_id', name='_item_group_uidx'),)
+    __table_args__ = (
+        UniqueConstraint('item_id', 'group_id', name='_item_group_uidx'),
+        # Items of a group
+        Index('_item_group_group_id_item_id_idx', 'group_id', 'item_id'),
+    )
 
 
 class User(db.Model, BaseModel):
@@ -90,6 +95,9 @@ class User(db.Model, BaseModel):
     # Other user files are added automatically by using the Website configuration file
     created_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
     completed_cycles = db.Column(db.Integer, server_default='0')
+    # Comparisons made (selected or tied) and skipped, see JudgementCounters
+    compared_count = db.Column(db.Integer, nullable=False, server_default='0')
+    skipped_count = db.Column(db.Integer, nullable=False, server_default='0')
 
 
 class UserGroup(db.Model, BaseModel):
@@ -106,7 +114,11 @@ class UserGroup(db.Model, BaseModel):
     user_id = db.Column(db.Integer, db.ForeignKey('user.user_id'), nullable=False)
     created_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
 
-    __table_args__ = (UniqueConstraint('group_id', 'user_id', name='_user_group_uidx'),)
+    __table_args__ = (
+        UniqueConstraint('group_id', 'user_id', name='_user_group_uidx'),
+        # Groups of a user
+        Index('_user_group_user_id_group_id_idx', 'user_id', 'group_id'),
+    )
 
 
 class Comparison(db.Model, BaseModel):
@@ -131,6 +143,11 @@ class Comparison(db.Model, BaseModel):
     created = db.Column(db.DateTime(timezone=True), default=datetime.now)
     updated = db.Column(db.DateTime(timezone=True), default=datetime.now)
 
+    __table_args__ = (
+        # Comparisons of a user, counted by state
+        Index('_comparison_user_id_state_idx', 'user_id', 'state'),
+    )
+
 
 class CustomItemPair(db.Model, BaseModel):
     """Holds a pair of items with custom weight configurations.
@@ -168,7 +185,86 @@ class UserItem(db.Model, BaseModel):
     known = db.Column(db.Boolean, nullable=False)  # 0 for unknow. 1 for know.
     date = db.Column(db.DateTime(timezone=True), default=datetime.now)
 
-    __table_args__ = (UniqueConstraint('user_id', 'item_id', name='_user_item_uidx'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'item_id', name='_user_item_uidx'),
+        # Known (or unknown) items of a user
+        Index('_user_item_user_id_known_item_id_idx', 'user_id', 'known', 'item_id'),
+    )
+
+
+class UserItemQueue(db.Model, BaseModel):
+    """Order in which the items are shown to the user to state the item preferences.
+
+    The item ids are stored as a random permutation of 32 bit integers together with the position of the next item to
+    show, so the next item is found with a single primary key lookup.
+
+    Args:
+        db (SQLAlchemy): SQLAlchemy connection object
+    """
+
+    __tablename__ = 'user_item_queue'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id'), primary_key=True)
+    item_ids = db.Column(db.LargeBinary, nullable=False)  # Little endian int32 item ids
+    position = db.Column(db.Integer, nullable=False, default=0)
+    created_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
+
+    def get_item_ids(self):
+        """Get the queued item ids.
+
+        Returns:
+            numpy.ndarray: Item ids in the order they are shown
+        """
+        return np.frombuffer(self.item_ids, dtype='<i4')
+
+    def next_item_ids(self, count):
+        """Get the ids of the next items to show.
+
+        Args:
+            count (int): Maximum number of items
+
+        Returns:
+            numpy.ndarray: Up to count item ids, empty if all the items have been shown
+        """
+        return self.get_item_ids()[self.position : self.position + count]
+
+    def current_item_id(self):
+        """Get the id of the next item to show.
+
+        Returns:
+            int: Item id or None if all the items have been shown
+        """
+        item_ids = self.get_item_ids()
+        if self.position >= len(item_ids):
+            return None
+        return int(item_ids[self.position])
+
+
+class JournalSegment(db.Model, BaseModel):
+    """Judgement journal segment already written to the comparison table (see JudgementJournal).
+
+    Args:
+        db (SQLAlchemy): SQLAlchemy connection object
+    """
+
+    __tablename__ = 'journal_segment'
+
+    name = db.Column(db.String(100), primary_key=True)
+    record_count = db.Column(db.Integer, nullable=False)
+    ingested_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
+
+
+class JournalState(db.Model, BaseModel):
+    """Next comparison id available to the server processes writing comparisons to the judgement journal.
+
+    Args:
+        db (SQLAlchemy): SQLAlchemy connection object
+    """
+
+    __tablename__ = 'journal_state'
+
+    journal_state_id = db.Column(db.Integer, primary_key=True)
+    next_comparison_id = db.Column(db.Integer, nullable=False)
 
 
 class WebsiteControl(db.Model, BaseModel):
@@ -188,6 +284,8 @@ class WebsiteControl(db.Model, BaseModel):
     weight_configuration = db.Column(db.String(20), nullable=False)
     configuration_file = db.Column(db.String(500), nullable=False)
     setup_exec_date = db.Column(db.DateTime(timezone=True), default=datetime.now)
+    # Fingerprint of the configuration files when they were fully validated, see Validation.fingerprint
+    validation_fingerprint = db.Column(db.String(64), nullable=True)
 
     def get_conf(self):
         """Get the website control configuration.
@@ -197,11 +295,13 @@ class WebsiteControl(db.Model, BaseModel):
         """
         return self.query.order_by(WebsiteControl.website_control_id.desc()).first()
 
-    def equal_weight_configuration(self):
-        """Determine if the system is running with an equal weight configuration.
+    def generation(self):
+        """Identify the setup this control record belongs to.
+
+        Data loaded from the database that doesn't change between setups can be cached as long as the generation
+        stays the same.
 
         Returns:
-            boolean: True if the configuration is for equal weighted items, False if not
+            tuple: Website control id and setup execution date
         """
-        c = self.get_conf()
-        return c.weight_configuration == self.EQUAL_WEIGHT
+        return self.website_control_id, self.setup_exec_date
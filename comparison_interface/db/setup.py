@@ -1,20 +1,34 @@
 """Setup the website database."""
 
 import os
+from collections import defaultdict
+from datetime import datetime
+from itertools import repeat
 
-from sqlalchemy import text
+import numpy as np
+from sqlalchemy import inspect, text
 
 from ..configuration.website import Settings as WS
-from .connection import db, persist
-from .models import CustomItemPair, Group, Item, ItemGroup, WebsiteControl
+from ..configuration.weight_file import load_weight_file
+from .connection import db
+from .journal import JudgementJournal
+from .models import CustomItemPair, Group, Item, ItemGroup, User, UserGroup, UserItem, UserItemQueue, WebsiteControl
+from .weights import WeightStore
 
 
 class Setup:
     """Set up functions to create the application from the configuration."""
 
-    def __init__(self, app) -> None:
-        """Initialise the Setup with the Flask app."""
+    def __init__(self, app, validation_fingerprint=None) -> None:
+        """Initialise the Setup with the Flask app.
+
+        Args:
+            app (Flask): Flask application.
+            validation_fingerprint (string, optional): Fingerprint of the validated configuration (see
+                                                       Validation.fingerprint). Defaults to None.
+        """
         self.app = app
+        self.validation_fingerprint = validation_fingerprint
 
     def exec(self):
         """Initialise the website database.
@@ -32,125 +46,439 @@ class Setup:
                 for file in os.listdir(export_location):
                     os.remove(os.path.join(export_location, file))
 
+            # Judgements journaled for a previous setup don't belong to the new database
+            JudgementJournal(self.app).clear()
+
             # The session needs be committed after the creation of the groups.
-            self._setup_group(db)
-            self._setup_website_control_history(db)
+            pairs = self._setup_group(db)
+            website_control = self._setup_website_control_history(db)
             db.session.commit()
 
+            # Write the custom item pairs to the binary files used by the website workers
+            self._setup_weight_store(website_control, pairs)
+
             # The setup of the user configuration doesn't use SQLAlchemy ORM. The transaction
             # needs to be committed before inserting the user fields values. The user
             # columns values are dynamically defined so a different process needs to be followed.
             self._setup_user(db)
 
+    def sync(self):
+        """Add the groups, items and custom item pairs of the website configuration missing from the database.
+
+        Unlike exec, the data in the database is kept. Groups are matched by name, items by name, display name and
+        image, and custom item pairs by group and items. Groups, items and pairs removed from the configuration stay
+        in the database, the weight of a pair already saved is not changed. The items added to a group are appended to
+        the item preference queues of the group's users. The new rows and a new website control
+        record are saved in one transaction, the running workers load the new application generation on their next
+        integrity check.
+
+        Raises:
+            RuntimeError: The configuration can't be applied without resetting the database.
+
+        Returns:
+            dict: Number of groups, items, item group relationships and custom item pairs added
+        """
+        with self.app.app_context():
+            previous = WebsiteControl().get_conf()
+            if previous is None:
+                raise RuntimeError("Application not yet initialised.")
+            weight_conf = WS.get_comparison_conf(WS.GROUP_WEIGHT_CONFIGURATION, self.app)
+            if weight_conf != previous.weight_configuration:
+                raise RuntimeError(
+                    "The weight configuration can't be changed without resetting the database "
+                    f"(from {previous.weight_configuration} to {weight_conf})."
+                )
+            self._check_user_fields(db)
+
+            groups = WS.get_comparison_conf(WS.GROUPS, self.app)
+            saved_groups = dict(db.session.execute(db.select(Group.name, Group.group_id)).all())
+            new_groups = [g for g in groups if g[WS.GROUP_NAME] not in saved_groups]
+            if len(new_groups) > 0:
+                new_group_ids = db.session.scalars(
+                    db.insert(Group).returning(Group.group_id, sort_by_parameter_order=True),
+                    [{'name': g[WS.GROUP_NAME], 'display_name': g[WS.GROUP_DISPLAY_NAME]} for g in new_groups],
+                ).all()
+                saved_groups.update(zip([g[WS.GROUP_NAME] for g in new_groups], new_group_ids))
+            self.app.logger.info(f"Saved {len(new_groups)} groups.")
+            group_ids = [saved_groups[g[WS.GROUP_NAME]] for g in groups]
+
+            saved_items = {
+                (name, display_name, image_path): item_id
+                for item_id, name, display_name, image_path in db.session.execute(
+                    db.select(Item.item_id, Item.name, Item.display_name, Item.image_path)
+                ).all()
+            }
+            item_count = len(saved_items)
+            group_items = self._setup_item(db, groups, saved_items)
+            saved_item_groups = set(db.session.execute(db.select(ItemGroup.item_id, ItemGroup.group_id)).all())
+            item_group_count = len(saved_item_groups)
+            self._setup_item_group(db, groups, group_ids, group_items, saved_item_groups)
+            self._sync_item_queues(db, saved_item_groups)
+
+            pair_count = 0
+            changed_group_ids = set()
+            if weight_conf == WebsiteControl.CUSTOM_WEIGHT:
+                for group_id, item_ids, g in zip(group_ids, group_items, groups):
+                    added = self._sync_custom_item_pair(db, item_ids, group_id, g)
+                    if added > 0:
+                        pair_count += added
+                        changed_group_ids.add(group_id)
+
+            self._check_foreign_keys(db)
+            website_control = self._setup_website_control_history(db)
+            db.session.commit()
+
+            self._sync_weight_store(db, previous, website_control, set(group_ids), changed_group_ids)
+            return {
+                'groups': len(new_groups),
+                'items': db.session.scalar(db.select(db.func.count()).select_from(Item)) - item_count,
+                'item_groups': db.session.scalar(db.select(db.func.count()).select_from(ItemGroup)) - item_group_count,
+                'custom_item_pairs': pair_count,
+            }
+
+    def _check_user_fields(self, db):
+        """Check that the user fields of the website configuration exist in the user table.
+
+        The user fields are columns of the user table, which can only be created by the setup command.
+
+        Args:
+            db (SQLAlchemy): Database connection
+
+        Raises:
+            RuntimeError: A configured user field is not a column of the user table
+        """
+        columns = {c['name'] for c in inspect(db.session.connection()).get_columns(User.__tablename__)}
+        missing = [f[WS.USER_FIELD_NAME] for f in WS.get_user_conf(self.app) if f[WS.USER_FIELD_NAME] not in columns]
+        if len(missing) > 0:
+            raise RuntimeError(f"The user fields {', '.join(missing)} can't be added without resetting the database.")
+
+    def _sync_custom_item_pair(self, db, item_ids, group_id, g):
+        """Save the custom item pairs of a group missing from the database.
+
+        Args:
+            db (SQLAlchemy): Database connection
+            item_ids (dict): Ids of the group items by item name
+            group_id (int): Id of the group stored in the database.
+            g (json): Group configuration being saved.
+
+        Returns:
+            int: Number of pairs added
+        """
+        saved = dict(
+            (tuple(row[:2]), row[2])
+            for row in db.session.execute(
+                db.select(CustomItemPair.item_1_id, CustomItemPair.item_2_id, CustomItemPair.weight).where(
+                    CustomItemPair.group_id == group_id
+                )
+            ).all()
+        )
+        names = {item_id: name for name, item_id in item_ids.items()}
+        item_1_ids, item_2_ids, weights = [], [], []
+        for item_1_id, item_2_id, weight in zip(*self._get_custom_weights(item_ids, g)):
+            key = (item_1_id, item_2_id)
+            if key not in saved:
+                saved[key] = weight
+                item_1_ids.append(item_1_id)
+                item_2_ids.append(item_2_id)
+                weights.append(weight)
+            elif saved[key] != weight:
+                self.app.logger.warning(
+                    f"Keeping the saved weight {saved[key]} of the pair {names[item_1_id]}, {names[item_2_id]} "
+                    f"of group {g[WS.GROUP_NAME]}."
+                )
+        self._insert_custom_item_pairs(db, group_id, g, item_1_ids, item_2_ids, weights)
+        return len(weights)
+
+    def _sync_item_queues(self, db, saved_item_groups):
+        """Append the items added to the groups to the item preference queues of the groups' users.
+
+        A user's queue is created with the items of the user's groups on the first item preference page, so the users
+        who already have a queue are only asked about the new items once they are appended. The new items of each
+        queue are appended in random order, leaving out the items the user has already answered or has queued.
+
+        Args:
+            db (SQLAlchemy): Database connection
+            saved_item_groups (set): Item id and group id of the relationships saved before the synchronisation
+        """
+        new_group_items = defaultdict(set)
+        for item_id, group_id in db.session.execute(db.select(ItemGroup.item_id, ItemGroup.group_id)).all():
+            if (item_id, group_id) not in saved_item_groups:
+                new_group_items[group_id].add(item_id)
+        if len(new_group_items) == 0:
+            return
+
+        user_items = defaultdict(set)
+        for user_id, group_id in db.session.execute(
+            db.select(UserGroup.user_id, UserGroup.group_id)
+            .join(UserItemQueue, UserItemQueue.user_id == UserGroup.user_id)
+            .where(UserGroup.group_id.in_(new_group_items))
+        ).all():
+            user_items[user_id].update(new_group_items[group_id])
+        if len(user_items) == 0:
+            return
+
+        answered = defaultdict(set)
+        for user_id, item_id in db.session.execute(
+            db.select(UserItem.user_id, UserItem.item_id).where(
+                UserItem.user_id.in_(user_items), UserItem.item_id.in_(set().union(*new_group_items.values()))
+            )
+        ).all():
+            answered[user_id].add(item_id)
+
+        queue_count = 0
+        for queue in db.session.scalars(db.select(UserItemQueue).where(UserItemQueue.user_id.in_(user_items))).all():
+            queued = queue.get_item_ids()
+            item_ids = sorted(user_items[queue.user_id] - answered[queue.user_id] - set(queued.tolist()))
+            if len(item_ids) == 0:
+                continue
+            new_item_ids = self.app.rng.permutation(np.array(item_ids, dtype='<i4'))
+            queue.item_ids = np.concatenate([queued, new_item_ids]).astype('<i4').tobytes()
+            queue_count += 1
+        self.app.logger.info(f"Added the new items to {queue_count} user item queues.")
+
+    def _sync_weight_store(self, db, previous, website_control, group_ids, changed_group_ids):
+        """Save the custom item pairs of each group to the weight store of the new application generation.
+
+        The files of the groups without new pairs are copied from the previous generation, the other groups are
+        written from the database. The files of older generations are removed.
+
+        Args:
+            db (SQLAlchemy): Database connection
+            previous (WebsiteControl): Control record of the previous generation
+            website_control (WebsiteControl): Control record of this synchronisation
+            group_ids (set): Ids of the configured groups
+            changed_group_ids (set): Ids of the groups with new custom item pairs
+        """
+        store = WeightStore(self.app)
+        if website_control.weight_configuration != WebsiteControl.CUSTOM_WEIGHT:
+            store.prune(website_control.generation())
+            return
+
+        for group_id in sorted(group_ids):
+            if group_id not in changed_group_ids and store.copy(
+                previous.generation(), website_control.generation(), group_id
+            ):
+                continue
+            rows = db.session.execute(
+                db.select(CustomItemPair.item_1_id, CustomItemPair.item_2_id, CustomItemPair.weight)
+                .where(CustomItemPair.group_id == group_id)
+                .order_by(CustomItemPair.custom_item_pair_id)
+            ).all()
+            if len(rows) == 0:
+                continue
+            item_1_ids, item_2_ids, weights = zip(*rows)
+            store.write(
+                website_control.generation(),
+                group_id,
+                np.array(item_1_ids, dtype=np.int32),
+                np.array(item_2_ids, dtype=np.int32),
+                np.array(weights, dtype=np.float64),
+            )
+        store.prune(website_control.generation())
+
+    # Number of item pairs inserted and reported at a time
+    PAIR_CHUNK_SIZE = 50000
+
     def _setup_group(self, db):
         """Save the group configuration in the database.
 
+        The groups, items, item group relationships and custom item pairs are inserted with one statement per table (and
+        per chunk of item pairs) in the current transaction. The foreign keys are checked once all the rows are saved.
+
         Args:
             db (SQLAlchemy): Database connection
+
+        Raises:
+            RuntimeError: A saved row refers to a row that doesn't exist
+
+        Returns:
+            dict: Custom item pairs of each group by group id, see _setup_custom_item_pair
         """
-        for g in WS.get_comparison_conf(WS.GROUPS, self.app):
-            group = Group(name=g[WS.GROUP_NAME], display_name=g[WS.GROUP_DISPLAY_NAME])
-            group = persist(db, group)
-            # Setup the items and their weights
-            items = self._setup_item(db, group, g)
-            self._setup_custom_item_pair(db, items, group, g)
+        groups = WS.get_comparison_conf(WS.GROUPS, self.app)
+        group_ids = db.session.scalars(
+            db.insert(Group).returning(Group.group_id, sort_by_parameter_order=True),
+            [{'name': g[WS.GROUP_NAME], 'display_name': g[WS.GROUP_DISPLAY_NAME]} for g in groups],
+        ).all()
+        self.app.logger.info(f"Saved {len(group_ids)} groups.")
+
+        # Setup the items and their weights
+        group_items = self._setup_item(db, groups)
+        self._setup_item_group(db, groups, group_ids, group_items)
+        pairs = {}
+        for group_id, group_item_ids, g in zip(group_ids, group_items, groups):
+            pairs[group_id] = self._setup_custom_item_pair(db, group_item_ids, group_id, g)
+
+        self._check_foreign_keys(db)
+        return pairs
+
+    def _check_foreign_keys(self, db):
+        """Check that the rows saved in the current transaction only refer to existing rows.
 
-    def _setup_custom_item_pair(self, db, items, group, g):
+        Args:
+            db (SQLAlchemy): Database connection
+
+        Raises:
+            RuntimeError: A saved row refers to a row that doesn't exist
+        """
+        violations = db.session.execute(text('PRAGMA foreign_key_check')).all()
+        if len(violations) > 0:
+            raise RuntimeError(f"The website configuration produced {len(violations)} invalid references: {violations}")
+
+    def _setup_custom_item_pair(self, db, item_ids, group_id, g):
         """Save the custom item's weight configuration when defined manually using the Website configuration file.
 
         If the web configuration type was "equal", this section will be ignored.
 
         Args:
             db (SQLAlchemy): Database connection
-            items (array(Item)): Group items store in the database.
-            group (Group): Group store in the database.
+            item_ids (dict): Ids of the group items by item name
+            group_id (int): Id of the group stored in the database.
             g (json): Group configuration being saved.
+
+        Returns:
+            tuple: Lists of the first item ids, second item ids and weights of the pairs, or None for equal weights
         """
         weight_conf = WS.get_comparison_conf(WS.GROUP_WEIGHT_CONFIGURATION, self.app)
         # Ignore this section when defining equally weighted items
-        if weight_conf == WebsiteControl.EQUAL_WEIGHT:
-            return
+        if weight_conf != WebsiteControl.CUSTOM_WEIGHT:
+            return None
 
         # Save the custom weights configuration
-        if weight_conf == WebsiteControl.CUSTOM_WEIGHT:
-            weights = g[WS.GROUP_ITEMS_WEIGHT]
+        item_1_ids, item_2_ids, weights = self._get_custom_weights(item_ids, g)
+        self._insert_custom_item_pairs(db, group_id, g, item_1_ids, item_2_ids, weights)
+        return item_1_ids, item_2_ids, weights
 
-            items_dict = {}
-            for i in items:
-                items_dict[i.name] = int(i.item_id)
+    def _get_custom_weights(self, item_ids, g):
+        """Get the custom item pairs of a group, defined in the website configuration or in a weight file.
 
-            for w in weights:
-                c = CustomItemPair()
-                c.item_1_id = items_dict[w["item_1"]]
-                c.item_2_id = items_dict[w["item_2"]]
-                c.group_id = group.group_id
-                c.weight = w["weight"]
-                db.session.add(c)
+        Args:
+            item_ids (dict): Ids of the group items by item name
+            g (json): Group configuration being saved.
+
+        Returns:
+            tuple: Lists of the first item ids, second item ids and weights of the pairs
+        """
+        if WS.GROUP_ITEMS_WEIGHT_FILE in g:
+            items_name = [i[WS.ITEM_NAME] for i in g[WS.GROUP_ITEMS]]
+            first, second, weights = load_weight_file(WS.get_weight_file_location(g, self.app), items_name)
+            ids = np.array([item_ids[name] for name in items_name], dtype=np.int64)
+            return ids[first].tolist(), ids[second].tolist(), weights.tolist()
 
-        return
+        weights = g[WS.GROUP_ITEMS_WEIGHT]
+        return (
+            [item_ids[w["item_1"]] for w in weights],
+            [item_ids[w["item_2"]] for w in weights],
+            [w["weight"] for w in weights],
+        )
 
-    def _setup_item(self, db, group, g):
-        """Save the item configuration in the database.
+    def _insert_custom_item_pairs(self, db, group_id, g, item_1_ids, item_2_ids, weights):
+        """Insert custom item pairs of a group in chunks, reporting the progress.
+
+        The pairs are inserted through the database driver. Processing each of the hundreds of thousands of rows of a
+        large group with SQLAlchemy takes much longer than the insert itself. All the pairs share the creation date.
 
         Args:
             db (SQLAlchemy): Database connection
-            group (SQLAlchemy): Inserted group object.
-            g (Json): Group configuration object on the global website configuration.
-        """
-        # Insert each of the items related to the groups
-        items = []
-        for i in g[WS.GROUP_ITEMS]:
-            # Verify if the item already exists in the database
-            query = db.select(Item).where(
-                Item.name == i[WS.ITEM_NAME],
-                Item.display_name == i[WS.ITEM_DISPLAY_NAME],
-                Item.image_path == i[WS.ITEM_IMAGE_NAME],
+            group_id (int): Id of the group stored in the database.
+            g (json): Group configuration being saved.
+            item_1_ids (list): First item id of each pair
+            item_2_ids (list): Second item id of each pair
+            weights (list): Weight of each pair
+        """
+        table = CustomItemPair.__table__
+        dialect = db.engine.dialect
+        created = table.c.created.type.dialect_impl(dialect).bind_processor(dialect)(datetime.now())
+        statement = f'INSERT INTO {table.name} (group_id, item_1_id, item_2_id, weight, created) VALUES (?, ?, ?, ?, ?)'
+        connection = db.session.connection()
+        for start in range(0, len(weights), self.PAIR_CHUNK_SIZE):
+            end = start + self.PAIR_CHUNK_SIZE
+            rows = zip(
+                repeat(group_id), item_1_ids[start:end], item_2_ids[start:end], weights[start:end], repeat(created)
+            )
+            connection.exec_driver_sql(statement, list(rows))
+            self.app.logger.info(
+                f"Saved {min(end, len(weights))} of {len(weights)} item pairs of group {g[WS.GROUP_NAME]}."
             )
-            item = db.session.scalars(query).first()
-
-            # Insert the item in the database if it doesn't exists
-            if item is None:
-                if WS.ITEM_ID in i:
-                    item = Item(
-                        item_id=i[WS.ITEM_ID],
-                        name=i[WS.ITEM_NAME],
-                        display_name=i[WS.ITEM_DISPLAY_NAME],
-                        image_path=i[WS.ITEM_IMAGE_NAME],
-                    )
-                else:
-                    # this uses the implicit auto increment
-                    item = Item(
-                        name=i[WS.ITEM_NAME], display_name=i[WS.ITEM_DISPLAY_NAME], image_path=i[WS.ITEM_IMAGE_NAME]
-                    )
-                persist(db, item)
-            else:
-                self.app.logger.info("Reusing item {} information.".format(item.name))
-            self._setup_item_group(db, item, group)
 
-            items.append(item)
-        return items
+    def _setup_item(self, db, groups, saved=None):
+        """Save the item configuration in the database.
 
-    def _setup_item_group(self, db, item, group):
-        """Relate the item to the correspondent group in the database.
+        An item configured in several groups with the same name, display name and image is saved once.
 
         Args:
-            db (SQLAlchemy): Database connection.
-            item (SQLAlchemy): Inserted item object.
-            group (SQLAlchemy): Inserted group object.
+            db (SQLAlchemy): Database connection
+            groups (list): Group configuration objects on the global website configuration.
+            saved (dict, optional): Ids of the items already in the database by name, display name and image. Defaults
+                                    to None.
+
+        Returns:
+            list: Ids of the items of each group by item name, in the configured order
         """
-        item_id = item.item_id
-        group_id = group.group_id
+        saved = {} if saved is None else saved
+        # Find the distinct items, in the order they are configured
+        items = {}
+        for g in groups:
+            for i in g[WS.GROUP_ITEMS]:
+                key = (i[WS.ITEM_NAME], i[WS.ITEM_DISPLAY_NAME], i[WS.ITEM_IMAGE_NAME])
+                if key in saved:
+                    continue
+                if key in items:
+                    self.app.logger.info("Reusing item {} information.".format(i[WS.ITEM_NAME]))
+                else:
+                    items[key] = {
+                        # None uses the implicit auto increment
+                        'item_id': i.get(WS.ITEM_ID),
+                        'name': i[WS.ITEM_NAME],
+                        'display_name': i[WS.ITEM_DISPLAY_NAME],
+                        'image_path': i[WS.ITEM_IMAGE_NAME],
+                    }
+
+        # The rows are inserted in order so the auto incremented ids are the same as inserting the items one by one
+        item_ids = []
+        if len(items) > 0:
+            item_ids = db.session.scalars(
+                db.insert(Item).returning(Item.item_id, sort_by_parameter_order=True), list(items.values())
+            ).all()
+        self.app.logger.info(f"Saved {len(item_ids)} items.")
+        ids = {**saved, **dict(zip(items, item_ids))}
+
+        group_items = []
+        for g in groups:
+            group_items.append(
+                {
+                    i[WS.ITEM_NAME]: ids[(i[WS.ITEM_NAME], i[WS.ITEM_DISPLAY_NAME], i[WS.ITEM_IMAGE_NAME])]
+                    for i in g[WS.GROUP_ITEMS]
+                }
+            )
+        return group_items
 
-        # Verify if the item was already related to the group
-        query = db.select(ItemGroup).where(ItemGroup.item_id == item_id, ItemGroup.group_id == group_id)
-        item_group = db.session.scalars(query).first()
+    def _setup_item_group(self, db, groups, group_ids, group_items, saved=frozenset()):
+        """Relate the items to the correspondent groups in the database.
 
-        # Relate the item to the group if the relationship hasn't been created yet.
-        if item_group is None:
-            item_group = ItemGroup(item_id=item_id, group_id=group_id)
-            persist(db, item_group)
-        else:
-            self.app.logger.info("Reusing Item {} relationship with group {}.".format(item.name, group.name))
+        Args:
+            db (SQLAlchemy): Database connection.
+            groups (list): Group configuration objects on the global website configuration.
+            group_ids (list): Ids of the inserted groups.
+            group_items (list): Ids of the items of each group by item name.
+            saved (set, optional): Item id and group id of the relationships already in the database. Defaults to an
+                                   empty set.
+        """
+        item_groups = {}
+        for g, group_id, item_ids in zip(groups, group_ids, group_items):
+            for i in g[WS.GROUP_ITEMS]:
+                key = (item_ids[i[WS.ITEM_NAME]], group_id)
+                # Relate the item to the group if the relationship hasn't been created yet.
+                if key in saved:
+                    continue
+                if key in item_groups:
+                    self.app.logger.info(
+                        "Reusing Item {} relationship with group {}.".format(i[WS.ITEM_NAME], g[WS.GROUP_NAME])
+                    )
+                else:
+                    item_groups[key] = {'item_id': key[0], 'group_id': group_id}
+        if len(item_groups) > 0:
+            db.session.execute(db.insert(ItemGroup), list(item_groups.values()))
+        self.app.logger.info(f"Saved {len(item_groups)} item group relationships.")
 
     def _setup_user(self, db):
         """Save the user configuration in the database.
@@ -208,4 +536,31 @@ class Setup:
         hist = WebsiteControl()
         hist.weight_configuration = WS.get_comparison_conf(WS.GROUP_WEIGHT_CONFIGURATION, self.app)
         hist.configuration_file = self.app.config[WS.CONFIGURATION_LOCATION]
+        hist.validation_fingerprint = self.validation_fingerprint
         db.session.add(hist)
+        return hist
+
+    def _setup_weight_store(self, website_control, pairs):
+        """Save the custom item pairs of each group to the weight store.
+
+        Files from previous setups are removed. Nothing is written when the items are equally weighted.
+
+        Args:
+            website_control (WebsiteControl): Control record of this setup
+            pairs (dict): Custom item pairs of each group by group id, see _setup_custom_item_pair
+        """
+        store = WeightStore(self.app)
+        store.clear()
+        if website_control.weight_configuration != WebsiteControl.CUSTOM_WEIGHT:
+            return
+
+        for group_id, (item_1_ids, item_2_ids, weights) in pairs.items():
+            if len(weights) == 0:
+                continue
+            store.write(
+                website_control.generation(),
+                group_id,
+                np.array(item_1_ids, dtype=np.int32),
+                np.array(item_2_ids, dtype=np.int32),
+                np.array(weights, dtype=np.float64),
+            )
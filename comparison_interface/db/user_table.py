@@ -0,0 +1,44 @@
+"""Reflected user table, including the user fields of the website configuration."""
+
+from sqlalchemy import MetaData
+
+from .connection import db
+
+
+class UserTable:
+    """Keep the reflected user table and its insert statement.
+
+    The user table holds a column for each user field of the website configuration, so the table is reflected from the
+    database instead of being declared by the User model. The columns only change when the setup command is executed,
+    so each worker reflects the table once and again when the application generation (see IntegrityWatcher.generation)
+    changes. The insert statement is always the same object so SQLAlchemy compiles it only once.
+    """
+
+    def __init__(self, generation, table) -> None:
+        """Initialise the user table.
+
+        Args:
+            generation (tuple): Application generation the table was reflected for
+            table (sqlalchemy.Table): Reflected user table
+        """
+        self.generation = generation
+        self.table = table
+        self.insert = table.insert()
+
+    @classmethod
+    def get(cls, app):
+        """Get the user table of the application, reflecting it if required.
+
+        Args:
+            app (Flask app): Website main application
+
+        Returns:
+            UserTable: The user table of the current application generation
+        """
+        generation = app.integrity_watcher.generation
+        user_table = app.user_table
+        if user_table is None or user_table.generation != generation:
+            db_meta = MetaData()
+            db_meta.reflect(bind=db.engines[None], only=["user"])
+            user_table = app.user_table = cls(generation, db_meta.tables["user"])
+        return user_table
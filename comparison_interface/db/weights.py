@@ -0,0 +1,137 @@
+"""Binary copy of the custom item pair weights."""
+
+import os
+import shutil
+
+import numpy as np
+
+from ..sampling import AliasTable
+
+# One record per custom item pair, including the alias table built from the pair weights
+PAIR_DTYPE = np.dtype(
+    [
+        ('item_1_id', '<i4'),
+        ('item_2_id', '<i4'),
+        ('weight', '<f8'),
+        ('prob', '<f8'),
+        ('alias', '<i4'),
+    ]
+)
+
+
+class WeightStore:
+    """Store the custom item pairs of each group in a binary file written by the setup command.
+
+    Workers memory map the files instead of loading the pairs from the database. The mapped pages are read only and
+    backed by the file, so they are shared by every worker process and don't count towards the memory of each one.
+    The files of each setup are kept in their own folder, named after the application generation.
+    """
+
+    FOLDER = 'weights'
+
+    def __init__(self, app) -> None:
+        """Initialise the store with the Flask app."""
+        self.app = app
+        self.location = os.path.join(app.instance_path, self.FOLDER)
+
+    def clear(self):
+        """Remove the files written by previous setups."""
+        if os.path.exists(self.location):
+            shutil.rmtree(self.location)
+
+    def prune(self, generation):
+        """Remove the files of every generation but one.
+
+        Workers still using a removed generation load the pairs from the database until they see the new generation.
+
+        Args:
+            generation (tuple): Application generation whose files are kept
+        """
+        if not os.path.exists(self.location):
+            return
+        keep = os.path.basename(self._generation_folder(generation))
+        for folder in os.listdir(self.location):
+            if folder != keep:
+                shutil.rmtree(os.path.join(self.location, folder), ignore_errors=True)
+
+    def copy(self, from_generation, to_generation, group_id):
+        """Reuse the file of a group written for another generation.
+
+        Args:
+            from_generation (tuple): Application generation the file was written for
+            to_generation (tuple): Application generation the file is copied to
+            group_id (int): Group id
+
+        Returns:
+            boolean: True if the file was copied, False if the group had no file
+        """
+        source = self._group_file(from_generation, group_id)
+        if not os.path.exists(source):
+            return False
+        os.makedirs(self._generation_folder(to_generation), exist_ok=True)
+        # The files are never modified once written, so both generations can share the same data
+        path = self._group_file(to_generation, group_id)
+        temporary = path + '.tmp'
+        try:
+            os.link(source, temporary)
+        except OSError:
+            shutil.copyfile(source, temporary)
+        os.replace(temporary, path)
+        return True
+
+    def write(self, generation, group_id, item_1_ids, item_2_ids, weights):
+        """Write the custom item pairs of a group.
+
+        Args:
+            generation (tuple): Application generation the pairs belong to
+            group_id (int): Group id
+            item_1_ids (array like): First item id of each pair
+            item_2_ids (array like): Second item id of each pair
+            weights (array like): Weight of each pair
+        """
+        table = AliasTable(weights)
+        pairs = np.empty(len(table), dtype=PAIR_DTYPE)
+        pairs['item_1_id'] = item_1_ids
+        pairs['item_2_id'] = item_2_ids
+        pairs['weight'] = weights
+        pairs['prob'] = table.prob
+        pairs['alias'] = table.alias
+
+        folder = self._generation_folder(generation)
+        os.makedirs(folder, exist_ok=True)
+        # Write to a temporary file first so workers never map a partially written file
+        path = self._group_file(generation, group_id)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            np.save(f, pairs)
+        os.replace(temporary, path)
+
+    def read(self, generation, group_id):
+        """Memory map the custom item pairs of a group.
+
+        Args:
+            generation (tuple): Application generation the pairs belong to
+            group_id (int): Group id
+
+        Returns:
+            numpy.memmap: Read only pairs (see PAIR_DTYPE) or None if the group file doesn't exist
+        """
+        if generation is None:
+            return None
+        path = self._group_file(generation, group_id)
+        if not os.path.exists(path):
+            return None
+        pairs = np.load(path, mmap_mode='r')
+        if pairs.dtype != PAIR_DTYPE:
+            self.app.logger.warning(f"Ignoring the weight file {path} written with an unexpected format.")
+            return None
+        return pairs
+
+    def _generation_folder(self, generation):
+        """Get the folder holding the files of an application generation."""
+        website_control_id, setup_exec_date = generation
+        return os.path.join(self.location, f"{website_control_id}-{setup_exec_date:%Y%m%d%H%M%S%f}")
+
+    def _group_file(self, generation, group_id):
+        """Get the path of the file holding the pairs of a group."""
+        return os.path.join(self._generation_folder(generation), f"group-{int(group_id)}.npy")
@@ -0,0 +1,180 @@
+"""Group commit of the comparisons submitted by the rank page."""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from .connection import db
+from .counters import JudgementCounters
+from .models import Comparison, User
+
+
+def threads_enabled():
+    """Check whether background threads run in this server.
+
+    uWSGI doesn't run the threads started by the application unless the enable-threads option is set or several
+    threads are used per worker. Every other server runs them.
+
+    Returns:
+        boolean: True if background threads run
+    """
+    try:
+        import uwsgi
+    except ModuleNotFoundError:
+        return True
+    return 'enable-threads' in uwsgi.opt or int(uwsgi.opt.get('threads', 1)) > 1
+
+
+class _PendingComparison:
+    """A comparison waiting to be written, with the means to tell the submitting request about the outcome."""
+
+    def __init__(self, values) -> None:
+        self.values = values
+        self.comparison_id = None
+        self.error = None
+        self.done = threading.Event()
+        # Changed under the writer's claim lock, a claimed comparison is being written and a cancelled one never is
+        self.claimed = False
+        self.cancelled = False
+
+
+class JudgementWriter:
+    """Write the new comparisons of many requests in a single transaction.
+
+    Each request hands its comparison to a background thread and waits. The thread collects the comparisons submitted
+    during a short interval and writes them, together with the users' judgement counters, in one transaction. Every
+    request is only released once the transaction holding its comparison has been committed, so a request is never
+    acknowledged for a comparison that could still be lost by the database (see the SQLite synchronous setting).
+
+    If a batch can't be written, each comparison of the batch is written in its own transaction so a single invalid
+    comparison doesn't make the other requests fail. A request whose comparison is still queued after TIMEOUT seconds
+    fails and its comparison is dropped, so repeating the request doesn't save the comparison twice.
+    """
+
+    # Seconds a request waits for the writer to start writing its comparison
+    TIMEOUT = 30
+
+    def __init__(self, app, interval, max_batch=500) -> None:
+        """Initialise the writer.
+
+        Args:
+            app (Flask app): Website main application
+            interval (float): Milliseconds the writer waits for more comparisons after the first one of a batch
+            max_batch (int, optional): Maximum number of comparisons per transaction. Defaults to 500.
+        """
+        self._app = app
+        self._interval = interval / 1000
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        # The thread is started on first use in each process, server workers can be forked after the app is created
+        self._pid = None
+
+    def submit(self, user_id, item_1_id, item_2_id, state, selected_item_id):
+        """Write a new comparison and wait until it is committed.
+
+        Args:
+            user_id (int): User id
+            item_1_id (int): First item id
+            item_2_id (int): Second item id
+            state (string): Comparison state
+            selected_item_id (int): Selected item id or None
+
+        Raises:
+            RuntimeError: The comparison couldn't be written
+
+        Returns:
+            int: Id of the new comparison
+        """
+        self._start()
+        pending = _PendingComparison(
+            {
+                'user_id': user_id,
+                'item_1_id': item_1_id,
+                'item_2_id': item_2_id,
+                'state': state,
+                'selected_item_id': selected_item_id,
+            }
+        )
+        self._queue.put(pending)
+        if not pending.done.wait(self.TIMEOUT):
+            with self._claim_lock:
+                if not pending.claimed:
+                    # The comparison is never written, so the request can safely be repeated
+                    pending.cancelled = True
+                    raise RuntimeError("The comparison was not saved in time.")
+            # The transaction holding the comparison has started, wait for its outcome
+            pending.done.wait()
+        if pending.error is not None:
+            raise RuntimeError(str(pending.error))
+        return pending.comparison_id
+
+    def _start(self):
+        """Start the writer thread of the current process if it isn't running."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid != pid:
+                threading.Thread(target=self._run, name='judgement-writer', daemon=True).start()
+                self._pid = pid
+
+    def _run(self):
+        """Write the submitted comparisons in batches."""
+        with self._app.app_context():
+            engine = db.engine
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._interval
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._claim_lock:
+                batch = [pending for pending in batch if not pending.cancelled]
+                for pending in batch:
+                    pending.claimed = True
+            if len(batch) == 0:
+                continue
+
+            try:
+                self._write(engine, batch)
+            except Exception:
+                for pending in batch:
+                    try:
+                        self._write(engine, [pending])
+                    except Exception as e:
+                        pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+    def _write(self, engine, batch):
+        """Write a batch of comparisons and the users' counters in one transaction."""
+        with engine.begin() as connection:
+            comparison_ids = connection.scalars(
+                db.insert(Comparison).returning(Comparison.comparison_id, sort_by_parameter_order=True),
+                [pending.values for pending in batch],
+            ).all()
+            compared = Counter()
+            skipped = Counter()
+            for pending in batch:
+                user_compared, user_skipped = JudgementCounters.changes(None, pending.values['state'])
+                compared[pending.values['user_id']] += user_compared
+                skipped[pending.values['user_id']] += user_skipped
+            for user_id in compared.keys() | skipped.keys():
+                connection.execute(
+                    db.update(User)
+                    .where(User.user_id == user_id)
+                    .values(
+                        compared_count=User.compared_count + compared[user_id],
+                        skipped_count=User.skipped_count + skipped[user_id],
+                    )
+                )
+        for pending, comparison_id in zip(batch, comparison_ids):
+            pending.comparison_id = comparison_id
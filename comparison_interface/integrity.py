@@ -0,0 +1,159 @@
+"""Monitor the health of the running website."""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.connection import db
+from comparison_interface.db.journal import JudgementJournal
+from comparison_interface.db.models import WebsiteControl
+
+
+class IntegrityWatcher:
+    """Keep an in memory flag stating whether the application is in a healthy state.
+
+    The application is healthy once the setup command has been executed and the website configuration file has not been
+    modified afterwards. The check needs a database query and a file system call so it is run at most once per check
+    interval by each worker. Requests in between only read the cached flag. An interval of 0 checks on every request.
+    """
+
+    NOT_INITIALISED = "Application not yet initialised. Please read the README.md file for instructions."
+    UNHEALTHY = "Application unhealthy state. Please contact the website administrator."
+
+    def __init__(self, app, interval, on_new_generation=None) -> None:
+        """Initialise the watcher.
+
+        Args:
+            app (Flask app): Website main application
+            interval (float): Minimum number of seconds between two checks
+            on_new_generation (callable, optional): Function called with the app when a check finds a different
+                                                    generation than the previous one. Defaults to None.
+        """
+        self._app = app
+        self._on_new_generation = on_new_generation
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self.interval = interval
+        self.healthy = False
+        self.error = self.NOT_INITIALISED
+        self.website_control = None
+        # Generation of the last check that found the application set up
+        self._last_generation = None
+        self._first_check = True
+
+    @property
+    def generation(self):
+        """Get the generation (see WebsiteControl.generation) of the last healthy or unhealthy check.
+
+        Returns:
+            tuple: Website control id and setup execution date, or None if the state hasn't been checked yet
+        """
+        website_control = self.website_control
+        if website_control is None:
+            return None
+        return website_control.generation()
+
+    def validate(self):
+        """Raise an error if the application is not in a healthy state.
+
+        The state is checked again when the check interval has elapsed since the last check.
+
+        Raises:
+            RuntimeError: The application hasn't been set up or the configuration file was modified after the setup.
+        """
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.interval:
+            with self._lock:
+                # another thread may have run the check while this one was waiting
+                if self._checked_at is None or time.monotonic() - self._checked_at >= self.interval:
+                    self.check()
+
+        if not self.healthy:
+            raise RuntimeError(self.error)
+
+    def check(self):
+        """Check the application state and update the health flag.
+
+        Returns:
+            boolean: True if the application is healthy, False if not
+        """
+        app = self._app
+        self._checked_at = time.monotonic()
+        # Use a separate application context so the row is detached from the request's database session
+        with app.app_context():
+            try:
+                # Get the application control variables
+                conf = WebsiteControl().get_conf()
+
+                # The compiled configuration is kept between checks and only rebuilt if the file changed
+                WS.set_configuration_location(app, conf.configuration_file)
+                WS.refresh(app)
+                setup_exec_date = conf.setup_exec_date.replace(tzinfo=timezone.utc)
+
+                # Get the last modification date of the configuration file (UTC)
+                modification_date = os.path.getmtime(WS.get_configuration_location(app))
+                modification_date = datetime.fromtimestamp(modification_date, tz=timezone.utc)
+            except Exception as e:
+                app.logger.critical(str(e))
+                return self._set_state(None, self.NOT_INITIALISED)
+
+        # Stop the server execution if the configuration file was modified after the setup of the application.
+        if modification_date > setup_exec_date:
+            app.logger.critical(
+                "The configuration file cannot be modified after the website has been initialised "
+                "with the setup command. The file was modified on: %s UTC. Setup executed on : %s UTC. "
+                "Please execute >Flask setup< again if you want to re-initialise the database."
+                % (modification_date.strftime("%m/%d/%Y, %H:%M:%S"), setup_exec_date.strftime("%m/%d/%Y, %H:%M:%S"))
+            )
+            return self._set_state(conf, self.UNHEALTHY)
+
+        # The comparison table gives ids to new comparisons once the journal is turned off, they could be the ids of the
+        # judgements still waiting in the journal
+        if app.judgement_journal is None:
+            waiting = self._ingest_journal()
+            if waiting > 0:
+                app.logger.critical(
+                    f"{waiting} judgements are waiting in the judgement journal, which is turned off. The website "
+                    "opens once they are ingested, please stop the website and execute >Flask ingest-journal --all<."
+                )
+                return self._set_state(conf, self.UNHEALTHY)
+
+        return self._set_state(conf, None)
+
+    def _ingest_journal(self):
+        """Ingest the judgement journal segments that are no longer written to.
+
+        Returns:
+            int: Number of judgements still waiting in the journal
+        """
+        app = self._app
+        journal = JudgementJournal(app)
+        if journal.waiting_records() == 0:
+            return 0
+        with app.app_context():
+            try:
+                journal.ingest()
+            except Exception as e:
+                app.logger.error(f"The judgement journal couldn't be ingested: {e}")
+            finally:
+                db.session.remove()
+        return journal.waiting_records()
+
+    def _set_state(self, website_control, error):
+        """Record the result of a check."""
+        self.website_control = website_control
+        self.error = error
+        self.healthy = error is None
+        # The generation found by the first check is the one the application was started with
+        first_check = self._first_check
+        self._first_check = False
+        generation = self.generation
+        if generation is None:
+            # Not set up or being set up again, the next generation found is compared with the last one
+            return self.healthy
+        previous = self._last_generation
+        self._last_generation = generation
+        if self._on_new_generation is not None and not first_check and previous != generation:
+            self._on_new_generation(self._app)
+        return self.healthy
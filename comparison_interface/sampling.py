@@ -0,0 +1,95 @@
+"""Weighted random sampling."""
+
+import numpy as np
+
+
+class AliasTable:
+    """Sample indexes with a fixed discrete distribution in constant time (Walker's alias method, Vose's variant).
+
+    The table is built once in O(n). Each draw then needs one random integer and one random float, independently of
+    the number of weights.
+    """
+
+    def __init__(self, weights) -> None:
+        """Build the alias table.
+
+        Args:
+            weights (array like): Non negative weights, they don't need to add up to 1
+
+        Raises:
+            ValueError: No weights were provided, a weight is negative or all the weights are 0
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        size = len(weights)
+        if size == 0:
+            raise ValueError("At least one weight is required to build an alias table.")
+        if (weights < 0).any() or not weights.sum() > 0:
+            raise ValueError("The weights must not be negative and at least one of them must be positive.")
+
+        # Scale the probabilities so the average column holds exactly 1
+        scaled = (weights * (size / weights.sum())).tolist()
+        prob = [1.0] * size
+        alias = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Anything left is 1 up to rounding errors, those columns keep their own index only
+
+        self.prob = np.array(prob, dtype=np.float64)
+        self.alias = np.array(alias, dtype=np.int64)
+        self.prob.flags.writeable = False
+        self.alias.flags.writeable = False
+
+    @classmethod
+    def from_arrays(cls, prob, alias):
+        """Use an alias table that was built before.
+
+        Args:
+            prob (numpy.ndarray): Probability of keeping each column
+            alias (numpy.ndarray): Alternative index of each column
+
+        Returns:
+            AliasTable: The alias table
+        """
+        table = cls.__new__(cls)
+        table.prob = prob
+        table.alias = alias
+        return table
+
+    def __len__(self):
+        """Return the number of weights in the table."""
+        return len(self.prob)
+
+    def draw(self, rng):
+        """Draw one index.
+
+        Args:
+            rng (numpy.random.Generator): Random number generator
+
+        Returns:
+            int: Index of the selected weight
+        """
+        column = int(rng.integers(len(self.prob)))
+        if rng.random() < self.prob[column]:
+            return column
+        return int(self.alias[column])
+
+    def probabilities(self):
+        """Get the distribution sampled by the table.
+
+        Returns:
+            numpy.ndarray: Probability of drawing each index
+        """
+        size = len(self.prob)
+        result = self.prob.copy()
+        np.add.at(result, self.alias, 1.0 - self.prob)
+        return result / size
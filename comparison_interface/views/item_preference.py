@@ -1,9 +1,11 @@
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.sql.expression import func
 
 from ..configuration.website import Settings as WS
+from ..db.catalog import ItemCatalog
 from ..db.connection import db
-from ..db.models import Item, ItemGroup, User, UserGroup, UserItem, WebsiteControl
+from ..db.models import UserItem, UserItemQueue, WebsiteControl
 from .request import Request
 
 
@@ -26,43 +28,112 @@ class ItemsPreference(Request):
         if not equal_weight_conf or not render_item_preference:
             return self._redirect('.rank')
 
-        # Get all items preferences not specified for the user yet.
-        query = (
-            db.select(User, UserGroup, ItemGroup, Item, UserItem)
-            .join(UserGroup, UserGroup.user_id == User.user_id, isouter=True)
-            .join(ItemGroup, ItemGroup.group_id == UserGroup.group_id, isouter=True)
-            .join(Item, ItemGroup.item_id == Item.item_id, isouter=True)
-            .join(UserItem, (UserItem.user_id == User.user_id) & (UserItem.item_id == Item.item_id), isouter=True)
-            .where(
-                User.user_id == self._session['user_id'],
-                UserGroup.group_id.in_(self._session['group_ids']),
-                ItemGroup.group_id.in_(self._session['group_ids']),
-                # WARNING: Don't change test against None to "is None". It won't work correctly.
-                UserItem.user_item_id == None,  # NoQA
-            )
-            .order_by(func.random())
-        )
-        result = db.session.execute(query).first()
+        # Get the next item of the user's queue, the queue is created on the first visit.
+        queue = db.session.get(UserItemQueue, self._session['user_id'])
+        if queue is None:
+            queue = self._create_queue()
+
+        page_size = self._get_page_size()
+        if page_size > 1:
+            return self._render_grid(queue.next_item_ids(page_size))
+
+        item_id = queue.current_item_id()
 
         # After the user had stated all items preferences
         # moves to the comparison itself.
-        if not result:
+        if item_id is None:
             return self._redirect('.rank')
 
         # Render the item preference template
-        _, _, _, item, _ = result
+        item = ItemCatalog.get(self._app).get_item(item_id)
         return self._render_template(
             'pages/item_preference.html',
             {
+                **self._get_page_text('item_preference', self._build_item_preference_text),
                 'item': item,
-                'item_selection_question': WS.get_text(WS.ITEM_SELECTION_QUESTION_LABEL, self._app),
-                'item_selection_answer_no': WS.get_text(WS.ITEM_SELECTION_NO_BUTTON_LABEL, self._app),
-                'item_selection_answer_yes': WS.get_text(WS.ITEM_SELECTION_YES_BUTTON_LABEL, self._app),
             },
         )
 
+    def _get_page_size(self):
+        """Get the number of items shown on each item preference page.
+
+        Returns:
+            int: Number of items, 1 unless a page size is set in the behaviour configuration
+        """
+        if WS.configuration_has_key(WS.BEHAVIOUR_ITEM_PREFERENCE_PAGE_SIZE, self._app):
+            return WS.get_behaviour_conf(WS.BEHAVIOUR_ITEM_PREFERENCE_PAGE_SIZE, self._app)
+        return 1
+
+    def _render_grid(self, item_ids):
+        """Render a page asking the user's preference for several items at once.
+
+        Args:
+            item_ids (numpy.ndarray): Ids of the items to show
+
+        Returns:
+            Response: The rendered page or a redirection to the rank page if there are no items left
+        """
+        if len(item_ids) == 0:
+            return self._redirect('.rank')
+
+        catalog = ItemCatalog.get(self._app)
+        return self._render_template(
+            'pages/item_preference_grid.html',
+            {
+                **self._get_page_text('item_preference_grid', self._build_item_preference_grid_text),
+                'items': [catalog.get_item(item_id) for item_id in item_ids],
+            },
+        )
+
+    def _create_queue(self):
+        """Shuffle the items of the user's groups that don't have a preference yet.
+
+        The items are shown in the order of a uniform random permutation, which is the same as picking one of the
+        remaining items at random for each page.
+
+        Returns:
+            UserItemQueue: The user's item queue, which another request may have created in the meantime
+        """
+        user_id = self._session['user_id']
+        session_group_ids = {int(group_id) for group_id in self._session['group_ids']}
+        group_ids = [group_id for group_id in self._get_user_context().group_ids if group_id in session_group_ids]
+        answered = db.session.scalars(db.select(UserItem.item_id).where(UserItem.user_id == user_id)).all()
+        item_ids = ItemCatalog.get(self._app).get_group_items(group_ids)
+        item_ids = item_ids[~np.isin(item_ids, answered)]
+
+        # Two first visits of the same user can race, the queue created first is kept and shown by both
+        query = (
+            sqlite_insert(UserItemQueue)
+            .values(user_id=user_id, item_ids=self._app.rng.permutation(item_ids).astype('<i4').tobytes(), position=0)
+            .on_conflict_do_nothing()
+        )
+        try:
+            db.session.execute(query)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            raise RuntimeError(str(e))
+        return db.session.get(UserItemQueue, user_id, populate_existing=True)
+
+    def _build_item_preference_text(self):
+        """Build the configured text of the item preference page."""
+        return {
+            'item_selection_question': WS.get_text(WS.ITEM_SELECTION_QUESTION_LABEL, self._app),
+            'item_selection_answer_no': WS.get_text(WS.ITEM_SELECTION_NO_BUTTON_LABEL, self._app),
+            'item_selection_answer_yes': WS.get_text(WS.ITEM_SELECTION_YES_BUTTON_LABEL, self._app),
+        }
+
+    def _build_item_preference_grid_text(self):
+        """Build the configured text of the item preference page showing several items."""
+        return {
+            'item_selection_instruction': WS.get_text(WS.ITEM_SELECTION_GRID_INSTRUCTION_LABEL, self._app),
+            'item_selection_continue': WS.get_text(WS.ITEM_SELECTION_GRID_CONTINUE_BUTTON_LABEL, self._app),
+        }
+
     def post(self, request):
         """Request post handler."""
+        if 'item_ids' in request.form:
+            return self._post_grid(request)
+
         response = request.form.to_dict(flat=True)
 
         known = False
@@ -72,10 +143,45 @@ class ItemsPreference(Request):
         # Save the user preference into the database
         ui = UserItem(user_id=self._session['user_id'], item_id=response['item_id'], known=known)
 
+        # Move the user's queue to the next item
+        queue = db.session.get(UserItemQueue, self._session['user_id'])
+        if queue is not None and queue.current_item_id() == int(response['item_id']):
+            queue.position = queue.position + 1
+
         try:
             db.session.add(ui)
             db.session.commit()
         except SQLAlchemyError as e:
             raise RuntimeError(str(e))
+        # Stop using the cached known items of this user in every worker
+        self._session['known_items_version'] = self._session.get('known_items_version', 0) + 1
+
+        return self._redirect('.item_selection')
+
+    def _post_grid(self, request):
+        """Save the preferences of all the items shown on a page in a single transaction.
+
+        The items that were ticked are known, the other items shown are unknown.
+        """
+        user_id = self._session['user_id']
+        item_ids = [int(item_id) for item_id in request.form.getlist('item_ids')]
+        known_item_ids = {int(item_id) for item_id in request.form.getlist('known_item_ids')}
+
+        # Only accept the items the page was showing, a page submitted twice shows the current items again
+        queue = db.session.get(UserItemQueue, user_id)
+        if queue is None or queue.next_item_ids(len(item_ids)).tolist() != item_ids:
+            return self._redirect('.item_selection')
+
+        queue.position = queue.position + len(item_ids)
+        preferences = [
+            {'user_id': user_id, 'item_id': item_id, 'known': item_id in known_item_ids} for item_id in item_ids
+        ]
+        try:
+            db.session.execute(db.insert(UserItem), preferences)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            raise RuntimeError(str(e))
+        # Stop using the cached known items of this user in every worker
+        self._session['known_items_version'] = self._session.get('known_items_version', 0) + 1
 
         return self._redirect('.item_selection')
@@ -1,11 +1,15 @@
+import time
+from dataclasses import replace
 from datetime import datetime, timezone
 
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.sql.expression import func
 
 from ..configuration.website import Settings as WS
+from ..db.catalog import ItemCatalog
 from ..db.connection import db
-from ..db.models import Comparison, CustomItemPair, Item, ItemGroup, User, UserGroup, UserItem, WebsiteControl
+from ..db.counters import JudgementCounters
+from ..db.journal import JournalRecord
+from ..db.models import Comparison, User, WebsiteControl
 from .request import Request
 
 
@@ -17,6 +21,9 @@ class Rank(Request):
     CONFIRMED = 'confirmed'
     SKIPPED = 'skipped'
 
+    # Comparison being rejudged, loaded once per request (see _find_comparison)
+    _rejudged_comparison = None
+
     def get(self, request):
         """Request get handler."""
         if not self._valid_session():
@@ -72,32 +79,13 @@ class Rank(Request):
                 self._increment_cycle_count()
                 return self._redirect('.thankyou')
 
-        if allow_ties:
-            additional_screen_reader_instructions = ""
-        else:
-            additional_screen_reader_instructions = WS.get_text(WS.ADDITIONAL_RADIO_BUTTON_INSTRUCTIONS, self._app)
-
-        if allow_skip:
-            confirm_button_error_message = WS.get_text(WS.CONFIRM_BUTTON_ERROR_MESSAGE_WITH_SKIP, self._app)
-        else:
-            confirm_button_error_message = WS.get_text(WS.CONFIRM_BUTTON_ERROR_MESSAGE_WITHOUT_SKIP, self._app)
         return self._render_template(
             'pages/rank.html',
             {
+                **self._get_page_text('rank', self._build_rank_text),
                 'item_1': item_1,
                 'item_2': item_2,
-                'selected_item_label': WS.get_text(WS.RANK_ITEM_SELECTED_INDICATOR_LABEL, self._app),
-                'tied_selection_label': WS.get_text(WS.RANK_ITEM_TIED_SELECTION_INDICATOR_LABEL, self._app),
-                'skipped_selection_label': WS.get_text(WS.RANK_ITEM_SKIPPED_SELECTION_INDICATOR_LABEL, self._app),
-                'rejudge_label': WS.get_text(WS.RANK_ITEM_REJUDGE_BUTTON_LABEL, self._app),
-                'confirmed_label': WS.get_text(WS.RANK_ITEM_CONFIRMED_BUTTON_LABEL, self._app),
-                'confirm_button_error_message': confirm_button_error_message,
-                'skip_button_error_message': WS.get_text(WS.SKIP_BUTTON_ERROR_MESSAGE, self._app),
-                'skipped_label': WS.get_text(WS.RANK_ITEM_SKIPPED_BUTTON_LABEL, self._app),
-                'comparison_instruction_label': WS.get_text(WS.RANK_ITEM_INSTRUCTION_LABEL, self._app),
-                'comparison_number_label': WS.get_text(WS.RANK_ITEM_COMPARISON_EXECUTED_LABEL, self._app),
                 'comparison_number': compared,
-                'skipped_number_label': WS.get_text(WS.RANK_ITEM_SKIPPED_COMPARISON_EXECUTED_LABEL, self._app),
                 'skipped_number': skipped,
                 'rejudge_value': self.REJUDGE,
                 'confirmed_value': self.CONFIRMED,
@@ -109,11 +97,37 @@ class Rank(Request):
                 'allow_ties': str(allow_ties).lower(),
                 'allow_skip': allow_skip,
                 'allow_back': allow_back,
-                'additional_screen_reader_instructions': additional_screen_reader_instructions,
-                'item_group_selection_label': WS.get_text(WS.ITEM_SELECTION_GROUP_LABEL, self._app),
             },
         )
 
+    def _build_rank_text(self):
+        """Build the configured text of the rank page."""
+        if WS.get_behaviour_conf(WS.BEHAVIOUR_ALLOW_TIES, self._app):
+            additional_screen_reader_instructions = ""
+        else:
+            additional_screen_reader_instructions = WS.get_text(WS.ADDITIONAL_RADIO_BUTTON_INSTRUCTIONS, self._app)
+
+        if WS.get_behaviour_conf(WS.BEHAVIOUR_ALLOW_SKIP, self._app):
+            confirm_button_error_message = WS.get_text(WS.CONFIRM_BUTTON_ERROR_MESSAGE_WITH_SKIP, self._app)
+        else:
+            confirm_button_error_message = WS.get_text(WS.CONFIRM_BUTTON_ERROR_MESSAGE_WITHOUT_SKIP, self._app)
+
+        return {
+            'selected_item_label': WS.get_text(WS.RANK_ITEM_SELECTED_INDICATOR_LABEL, self._app),
+            'tied_selection_label': WS.get_text(WS.RANK_ITEM_TIED_SELECTION_INDICATOR_LABEL, self._app),
+            'skipped_selection_label': WS.get_text(WS.RANK_ITEM_SKIPPED_SELECTION_INDICATOR_LABEL, self._app),
+            'rejudge_label': WS.get_text(WS.RANK_ITEM_REJUDGE_BUTTON_LABEL, self._app),
+            'confirmed_label': WS.get_text(WS.RANK_ITEM_CONFIRMED_BUTTON_LABEL, self._app),
+            'confirm_button_error_message': confirm_button_error_message,
+            'skip_button_error_message': WS.get_text(WS.SKIP_BUTTON_ERROR_MESSAGE, self._app),
+            'skipped_label': WS.get_text(WS.RANK_ITEM_SKIPPED_BUTTON_LABEL, self._app),
+            'comparison_instruction_label': WS.get_text(WS.RANK_ITEM_INSTRUCTION_LABEL, self._app),
+            'comparison_number_label': WS.get_text(WS.RANK_ITEM_COMPARISON_EXECUTED_LABEL, self._app),
+            'skipped_number_label': WS.get_text(WS.RANK_ITEM_SKIPPED_COMPARISON_EXECUTED_LABEL, self._app),
+            'additional_screen_reader_instructions': additional_screen_reader_instructions,
+            'item_group_selection_label': WS.get_text(WS.ITEM_SELECTION_GROUP_LABEL, self._app),
+        }
+
     def post(self, request):
         """Request post handler."""
         response = request.form.to_dict(flat=True)
@@ -127,7 +141,37 @@ class Rank(Request):
             if 'comparison_id' in response and response['comparison_id'] != "":
                 comparison_id = response['comparison_id']
 
-            if comparison_id is None:
+            journal = self._app.judgement_journal
+            if comparison_id is None and journal is not None:
+                # Append the new user comparison to the journal, it is written to the database later on
+                now = time.time_ns()
+                new_comparison_id = journal.new_comparison_id()
+                journal.append(
+                    JournalRecord(
+                        new_comparison_id,
+                        self._session['user_id'],
+                        int(response['item_1_id']),
+                        int(response['item_2_id']),
+                        int(selected_item_id) if selected_item_id is not None else None,
+                        state,
+                        now,
+                        now,
+                    )
+                )
+                self._session['previous_comparison_id'] = new_comparison_id
+                self._session['comparison_ids'] = self._session['comparison_ids'] + [new_comparison_id]
+            elif comparison_id is None and self._app.judgement_writer is not None:
+                # Save the new user comparison in the next batch written by the judgement writer
+                new_comparison_id = self._app.judgement_writer.submit(
+                    self._session['user_id'],
+                    response['item_1_id'],
+                    response['item_2_id'],
+                    state,
+                    selected_item_id,
+                )
+                self._session['previous_comparison_id'] = new_comparison_id
+                self._session['comparison_ids'] = self._session['comparison_ids'] + [new_comparison_id]
+            elif comparison_id is None:
                 # Save the new user comparison in the database.
                 c = Comparison(
                     user_id=self._session['user_id'],
@@ -138,12 +182,29 @@ class Rank(Request):
                 )
                 try:
                     db.session.add(c)
+                    JudgementCounters.update(self._session['user_id'], None, state)
                     db.session.commit()
                     # Save the comparison for future possible rejudging
                     self._session['previous_comparison_id'] = c.comparison_id
                     self._session['comparison_ids'] = self._session['comparison_ids'] + [c.comparison_id]
                 except SQLAlchemyError as e:
                     raise RuntimeError(str(e))
+            elif journal is not None:
+                # Rejudge a comparison, the latest journal record holds the current state of the comparison
+                comparison = journal.find(self._session['user_id'], comparison_id)
+                if comparison is None:
+                    raise RuntimeError("Invalid comparison id provided")
+                journal.append(
+                    replace(
+                        comparison,
+                        state=state,
+                        selected_item_id=int(selected_item_id) if selected_item_id is not None else None,
+                        updated=time.time_ns(),
+                    )
+                )
+                self._session['previous_comparison_id'] = self._session['comparison_ids'][
+                    len(self._session['comparison_ids']) - 1
+                ]
             else:
                 # Rejudge an existence comparison.
                 query = db.select(Comparison).where(
@@ -154,6 +215,7 @@ class Rank(Request):
                 if comparison is None:
                     raise RuntimeError("Invalid comparison id provided")
                 try:
+                    JudgementCounters.update(self._session['user_id'], comparison.state, state)
                     comparison.selected_item_id = selected_item_id
                     comparison.state = state
                     comparison.updated = datetime.now(timezone.utc)
@@ -175,12 +237,38 @@ class Rank(Request):
         Args:
             comparison_id (int): The primary key of the comparison to retrieve
         """
-        res = (
-            db.session.query(Comparison.state, Comparison.selected_item_id)
-            .where(Comparison.comparison_id == comparison_id)
-            .first()
-        )
-        return res
+        comparison = self._find_comparison(comparison_id)
+        return comparison.state, comparison.selected_item_id
+
+    def _find_comparison(self, comparison_id):
+        """Get a comparison of the user, reading it only once per request.
+
+        Args:
+            comparison_id (int): Comparison id
+
+        Raises:
+            RuntimeError: Invalid comparison id provided
+
+        Returns:
+            Comparison | JournalRecord: The comparison, or its latest journal record if the judgement journal is used
+        """
+        comparison = self._rejudged_comparison
+        if comparison is not None and comparison.comparison_id == int(comparison_id):
+            return comparison
+
+        journal = self._app.judgement_journal
+        if journal is not None:
+            comparison = journal.find(self._session['user_id'], comparison_id)
+        else:
+            query = db.select(Comparison).where(
+                Comparison.comparison_id == comparison_id, Comparison.user_id == self._session['user_id']
+            )
+            comparison = db.session.scalars(query).first()
+
+        if comparison is None:
+            raise RuntimeError("Invalid comparison id provided")
+        self._rejudged_comparison = comparison
+        return comparison
 
     def _calculate_comparison_state(self, action: str, response: dict):
         """Get the right comparison parameters based on the user's action.
@@ -213,16 +301,19 @@ class Rank(Request):
         Returns:
             cycle_count: current cycle of the user
         """
-        user = db.session.get(User, self._session['user_id'])
-        if user is None:
+        context = self._get_user_context()
+        if context is None:
             return 0
-        return user.completed_cycles
+        return context.completed_cycles
 
     def _increment_cycle_count(self):
         """Increment the current user's cycle count."""
-        user = db.session.get(User, self._session['user_id'])
-        user.completed_cycles = user.completed_cycles + 1
+        context = self._get_user_context()
+        db.session.execute(
+            db.update(User).where(User.user_id == context.user_id).values(completed_cycles=User.completed_cycles + 1)
+        )
         db.session.commit()
+        context.completed_cycles = context.completed_cycles + 1
 
     def _get_comparison_stats(self):
         """Get summary statistics about the comparison made.
@@ -231,27 +322,16 @@ class Rank(Request):
             compared: Number of comparisons made
             skipped: Number of comparisons skipped
         """
-        compared = 0
-        skipped = 0
-
-        query = (
-            db.select(Comparison.state, func.count(Comparison.comparison_id))
-            .where(Comparison.user_id == self._session['user_id'])
-            .group_by(Comparison.state)
-        )
-        counts = db.session.execute(query).all()
+        context = self._get_user_context()
+        if context is None:
+            return 0, 0
+        journal = self._app.judgement_journal
+        if journal is None:
+            return context.compared_count, context.skipped_count
 
-        if len(counts) == 0:
-            return compared, skipped
-
-        for states in counts:
-            stateName, number = states
-            if stateName == Comparison.SELECTED or stateName == Comparison.TIED:
-                compared = compared + number
-            if stateName == Comparison.SKIPPED:
-                skipped = number
-
-        return compared, skipped
+        # Add the judgements waiting in the journal
+        compared, skipped = journal.counter_changes(context.user_id)
+        return context.compared_count + compared, context.skipped_count + skipped
 
     def _get_items_to_compare(self, comparison_id=None):
         """Get the items to compare.
@@ -301,17 +381,12 @@ class Rank(Request):
             Item: Model Item | None
         """
         # 1. Get the items related to the comparison.
-        query = db.select(Comparison).where(
-            Comparison.comparison_id == comparison_id, Comparison.user_id == self._session['user_id']
-        )
-        comparison = db.session.scalars(query).first()
+        comparison = self._find_comparison(comparison_id)
 
-        if comparison is None:
-            raise RuntimeError("Invalid comparison id provided")
-
-        # 2. Get the items information)
-        query = db.select(Item).where(Item.item_id.in_([comparison.item_1_id, comparison.item_2_id]))
-        items = db.session.scalars(query).all()
+        # 2. Get the items information from the item catalog, in the order they were originally displayed
+        catalog = ItemCatalog.get(self._app)
+        item_1 = catalog.get_item(comparison.item_1_id)
+        item_2 = catalog.get_item(comparison.item_2_id)
 
         # 3. Update the session parameters
         comparison_id_index = self._session['comparison_ids'].index(int(comparison_id))
@@ -319,10 +394,7 @@ class Rank(Request):
             self._session['previous_comparison_id'] = None
         else:
             self._session['previous_comparison_id'] = self._session['comparison_ids'][comparison_id_index - 1]
-        # return them in the order they were originally displayed
-        if items[0].item_id == comparison.item_1_id:
-            return items[0], items[1]
-        return items[1], items[0]
+        return item_1, item_2
 
     def _get_custom_items(self):
         """Get a random pair of items respecting the weights provided in config file.
@@ -331,34 +403,9 @@ class Rank(Request):
             Item: Model Item | None
             Item: Model Item | None
         """
-        # 1. Get the the custom pairs. This query assumes that just one group
-        # can be selected by the user when defining custom weights.
-        query = (
-            db.select(UserGroup, CustomItemPair)
-            .join(CustomItemPair, CustomItemPair.group_id == UserGroup.group_id, isouter=True)
-            .where(UserGroup.user_id == self._session['user_id'], UserGroup.group_id.in_(self._session['group_ids']))
-        )
-        result = db.session.execute(query).all()
-        pair_ids = []
-        pair_weights = []
-        pairs = {}
-        for _, p in result:
-            pairs[p.custom_item_pair_id] = p
-            pair_ids.append(p.custom_item_pair_id)
-            pair_weights.append(p.weight)
-        if len(pair_ids) == 0:
-            return None, None
-
-        # 2. Select the item pair to compare but respecting the custom weights
-        pair_id = self._app.rng.choice(pair_ids, 1, p=pair_weights, replace=False)
-        item_1_id = pairs[pair_id[0]].item_1_id
-        item_2_id = pairs[pair_id[0]].item_2_id
-
-        # 3. Get the items information
-        query = db.select(Item).where(Item.item_id.in_([item_1_id, item_2_id]))
-        items = db.session.scalars(query).all()
-
-        return items[0], items[1]
+        # The custom pairs of the user's groups and an alias table of their weights are kept in memory by the item
+        # catalog, so each draw takes constant time.
+        return ItemCatalog.get(self._app).draw_custom_pair(self._app.rng, self._session['group_ids'])
 
     def _get_preferred_items(self):
         """Get a random pair of items from the preferred user's item selection.
@@ -367,30 +414,12 @@ class Rank(Request):
             Item: Model Item | None
             Item: Model Item | None
         """
-        # 1. Get the user's item preferences
-        query = (
-            db.select(UserItem, Item)
-            .join(Item, Item.item_id == UserItem.item_id, isouter=True)
-            .where(UserItem.user_id == self._session['user_id'], UserItem.known == 1)
+        # The user's known items are cached until the user states a new item preference
+        version = self._session.get('known_items_version', 0)
+        known_item_ids = self._app.known_items.get(
+            self._session['user_id'], version, self._app.integrity_watcher.generation
         )
-        result = db.session.execute(query).all()
-
-        items_id = []
-        items = {}
-        for _, i in result:
-            # Insert only unique values to guarantee an equal item distribution.
-            if i.item_id not in items_id:
-                items_id.append(i.item_id)
-                items[i.item_id] = i
-
-        if len(items_id) < 2:
-            return None, None
-
-        # 2. Select randomly two items from the user's item preferences
-        selected_items_id = [None, None]
-        selected_items_id = self._app.rng.choice(items_id, 2, replace=False)
-
-        return items[selected_items_id[0]], items[selected_items_id[1]]
+        return ItemCatalog.get(self._app).draw_pair_from(self._app.rng, known_item_ids)
 
     def _get_random_items(self):
         """Get a random pair of items from the website configuration list.
@@ -399,32 +428,5 @@ class Rank(Request):
             Item: Model Item | None
             Item: Model Item | None
         """
-        # 1. Get the items related to the user's group preferences
-        query = (
-            db.select(UserGroup, ItemGroup, Item)
-            .join(ItemGroup, ItemGroup.group_id == UserGroup.group_id, isouter=True)
-            .join(Item, ItemGroup.item_id == Item.item_id, isouter=True)
-            .where(
-                UserGroup.user_id == self._session['user_id'],
-                UserGroup.group_id.in_(self._session['group_ids']),
-                ItemGroup.group_id.in_(self._session['group_ids']),
-            )
-        )
-        result = db.session.execute(query).all()
-
-        items_id = []
-        items = {}
-        for _, _, i in result:
-            # Insert only unique values to guarantee an equal item distribution.
-            if i.item_id not in items_id:
-                items_id.append(i.item_id)
-                items[i.item_id] = i
-
-        if len(items_id) < 2:
-            return None, None
-
-        # 2. Select randomly two items using the user's group preferences
-        selected_items_id = [None, None]
-        selected_items_id = self._app.rng.choice(items_id, 2, replace=False)
-
-        return items[selected_items_id[0]], items[selected_items_id[1]]
+        # The items of the user's groups are kept in memory by the item catalog
+        return ItemCatalog.get(self._app).draw_pair(self._app.rng, self._session['group_ids'])
@@ -1,12 +1,12 @@
 from datetime import datetime, timezone
 
 from flask import render_template
-from sqlalchemy import MetaData
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..configuration.website import Settings as WS
 from ..db.connection import db
-from ..db.models import Group, User, UserGroup, WebsiteControl
+from ..db.models import Group, UserGroup, WebsiteControl
+from ..db.user_table import UserTable
 from .request import Request
 
 
@@ -46,38 +46,24 @@ class Register(Request):
         group_ids = request.form.to_dict(flat=False)['group_ids']
 
         # Register the user in the database.
-        # Some of the user fields were dynamically added so we are using SQLAlchemy
-        # reflection functionality to insert them.
-        db_engine = db.engines[None]
-        db_meta = MetaData()
-        db_meta.reflect(bind=db_engine)
-        table = db_meta.tables["user"]
+        # Some of the user fields were dynamically added so the user table reflected from the database is used to
+        # insert them.
         dic_user_attr['created_date'] = datetime.now(timezone.utc)
         if not WS.get_behaviour_conf(WS.BEHAVIOUR_ESCAPE_ROUTE, self._app):
             dic_user_attr['completed_cycles'] = None
-        new_user_sql = table.insert().values(**dic_user_attr)
         try:
-            # Insert the user into the database
-            with db.engine.begin() as connection:
-                result = connection.execute(new_user_sql)
-            # Get last inserted id
-            id = result.lastrowid
-            query = db.select(User).where(User.user_id == id)
-            user = db.session.scalars(query).first()
-
-            # Save the user's group preferences
-            for id in group_ids:
-                ug = UserGroup()
-                ug.group_id = id
-                ug.user_id = user.user_id
-
-                db.session.add(ug)
-                db.session.commit()
+            # Insert the user and the user's group preferences in a single transaction
+            result = db.session.execute(UserTable.get(self._app).insert, dic_user_attr)
+            user_id = result.inserted_primary_key[0]
+            db.session.execute(
+                db.insert(UserGroup), [{'user_id': user_id, 'group_id': group_id} for group_id in group_ids]
+            )
+            db.session.commit()
 
             # Save reference to the inserted values in the session
-            self._session['user_id'] = user.user_id
+            self._session['user_id'] = user_id
             self._session['group_ids'] = group_ids
-            self._session['weight_conf'] = WebsiteControl().get_conf().weight_configuration
+            self._session['weight_conf'] = self._get_website_control().weight_configuration
             self._session['previous_comparison_id'] = None
             self._session['comparison_ids'] = []
         except SQLAlchemyError as e:
@@ -105,7 +91,7 @@ class Register(Request):
         """
         # Allow multiple item selection only if the item's weight distribution is "equal"
         multiple_selection = False
-        if WebsiteControl().get_conf().weight_configuration == WebsiteControl.EQUAL_WEIGHT:
+        if self._get_website_control().weight_configuration == WebsiteControl.EQUAL_WEIGHT:
             multiple_selection = True
 
         groups = db.session.scalars(db.select(Group)).all()
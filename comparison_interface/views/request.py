@@ -1,6 +1,50 @@
-from flask import redirect, render_template, url_for
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from flask import g, redirect, render_template, url_for
 
 from ..configuration.website import Settings as WS
+from ..db.connection import db
+from ..db.models import User, UserGroup, WebsiteControl
+
+
+@dataclass
+class UserContext:
+    """The information about the logged in user needed by the views, loaded once per request."""
+
+    user_id: int
+    completed_cycles: int
+    compared_count: int
+    skipped_count: int
+    group_ids: tuple
+
+    @classmethod
+    def load(cls, user_id):
+        """Load the user row, counters, cycle and group ids with a single statement.
+
+        Args:
+            user_id (int): User id
+
+        Returns:
+            UserContext: The user context or None if the user doesn't exist
+        """
+        row = db.session.execute(
+            db.select(
+                User.user_id,
+                User.completed_cycles,
+                User.compared_count,
+                User.skipped_count,
+                db.func.group_concat(UserGroup.group_id),
+            )
+            .join(UserGroup, UserGroup.user_id == User.user_id, isouter=True)
+            .where(User.user_id == user_id)
+            .group_by(User.user_id)
+        ).first()
+        if row is None:
+            return None
+        user_id, completed_cycles, compared_count, skipped_count, group_ids = row
+        group_ids = tuple(sorted(int(group_id) for group_id in group_ids.split(','))) if group_ids else ()
+        return cls(user_id, completed_cycles, compared_count or 0, skipped_count or 0, group_ids)
 
 
 class Request:
@@ -40,12 +84,17 @@ class Request:
         Returns:
             dict: Layout configured text
         """
+        return self._get_page_text('layout', self._build_layout_text)
+
+    def _build_layout_text(self):
+        """Build the application layout configuration text."""
         render_instructions = WS.should_render(WS.BEHAVIOUR_RENDER_USER_INSTRUCTION_PAGE, self._app)
         render_ethics_agreement = WS.should_render(WS.BEHAVIOUR_RENDER_ETHICS_AGREEMENT_PAGE, self._app)
         render_site_policies = WS.should_render(WS.BEHAVIOUR_RENDER_SITE_POLICIES, self._app)
         render_site_cookies = WS.should_render(WS.BEHAVIOUR_RENDER_COOKIE_BANNER, self._app)
 
         return {
+            'language': WS.get_language(self._app),
             'website_title': WS.get_text(WS.WEBSITE_TITLE, self._app),
             'introduction_page_title': WS.get_text(WS.PAGE_TITLE_INTRODUCTION, self._app),
             'ethics_agreement_page_title': WS.get_text(WS.PAGE_TITLE_ETHICS_AGREEMENT, self._app),
@@ -63,6 +112,53 @@ class Request:
             'render_cookie_banner': render_site_cookies,
         }
 
+    def _get_page_text(self, page: str, build):
+        """Get the configured text of a page, building it once per configuration version and language.
+
+        Args:
+            page (str): Name identifying the page text
+            build (callable): Function returning the page text as a dictionary
+
+        Returns:
+            MappingProxyType: Read only page text
+        """
+        digest = WS.get_snapshot(self._app).digest
+        key = (page, digest, WS.get_language(self._app))
+        text = self._app.page_text.get(key)
+        if text is None:
+            text = MappingProxyType(build())
+            # The text built for the previous configuration versions is discarded
+            page_text = {k: v for k, v in self._app.page_text.items() if k[1] == digest}
+            page_text[key] = text
+            self._app.page_text = page_text
+        return text
+
+    def _get_user_context(self):
+        """Get the context of the logged in user, shared by all the views handling the current request.
+
+        Returns:
+            UserContext: The user context or None if the user doesn't exist
+        """
+        user_id = self._session['user_id']
+        context = g.get('user_context')
+        if context is None or context.user_id != user_id:
+            context = g.user_context = UserContext.load(user_id)
+        return context
+
+    def _get_website_control(self):
+        """Get the website control row of the current setup.
+
+        The row only changes when the setup command is executed, the integrity watcher of the worker keeps the row read
+        by its last check so it doesn't need to be queried on each request.
+
+        Returns:
+            WebsiteControl: Website Control configuration model object
+        """
+        website_control = self._app.integrity_watcher.website_control
+        if website_control is None:
+            website_control = WebsiteControl().get_conf()
+        return website_control
+
     def _valid_session(self):
         """Verify that the the user session is valid."""
         if "user_id" not in self._session or "group_ids" not in self._session:
@@ -1,8 +1,9 @@
 import os
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
 import pytest
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
 from sqlalchemy.exc import SQLAlchemyError
 
 from app import create_app
@@ -11,6 +12,7 @@ from comparison_interface.configuration.website import Settings as WS
 from comparison_interface.db.connection import db
 from comparison_interface.db.models import UserGroup, UserItem
 from comparison_interface.db.setup import Setup as DBSetup
+from comparison_interface.db.weights import WeightStore
 
 
 def execute_setup(conf_file):
@@ -34,6 +36,31 @@ def execute_setup(conf_file):
     return app
 
 
+@contextmanager
+def count_statements(app):
+    """Record the SQL statements executed by the app while the context is active."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def remove_test_database():
+    """Remove the test database file together with the write ahead log files SQLite keeps next to it."""
+    db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(f'instance/test_database.db{suffix}'):
+            os.unlink(f'instance/test_database.db{suffix}')
+
+
 @pytest.fixture()
 def equal_weight_app():
     """Set up the project for testing with equal weights."""
@@ -43,7 +70,7 @@ def equal_weight_app():
     with app.app_context():
         db.session.remove()
         db.drop_all()
-        os.unlink('instance/test_database.db')
+        remove_test_database()
 
 
 @pytest.fixture()
@@ -62,7 +89,8 @@ def custom_weight_app():
     with app.app_context():
         db.session.remove()
         db.drop_all()
-        os.unlink('instance/test_database.db')
+        remove_test_database()
+    WeightStore(app).clear()
 
 
 @pytest.fixture()
@@ -9,6 +9,7 @@ from comparison_interface.configuration.website import Settings as WS
 from comparison_interface.db.connection import db
 from comparison_interface.db.models import Comparison
 from comparison_interface.db.setup import Setup as DBSetup
+from tests_python.conftest import remove_test_database
 
 
 # custom fixtures for these tests
@@ -42,7 +43,7 @@ def equal_weight_app_api():
     with app.app_context():
         db.session.remove()
         db.drop_all()
-        os.unlink('instance/test_database.db')
+        remove_test_database()
 
 
 @pytest.fixture()
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from comparison_interface.db.connection import db
+from comparison_interface.db.migration import Migration
+from comparison_interface.db.models import Comparison, ItemGroup, UserGroup, UserItem
+
+
+def query_plan(statement):
+    """Get the details of the SQLite query plan of a statement."""
+    sql = str(statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    return " ".join(row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all())
+
+
+@pytest.mark.parametrize(
+    'statement, index',
+    [
+        (
+            db.select(Comparison.state, db.func.count(Comparison.comparison_id))
+            .where(Comparison.user_id == 1)
+            .group_by(Comparison.state),
+            '_comparison_user_id_state_idx',
+        ),
+        (
+            db.select(UserItem.item_id).where(UserItem.user_id == 1, UserItem.known == 1).distinct(),
+            '_user_item_user_id_known_item_id_idx',
+        ),
+        (db.select(UserGroup.group_id).where(UserGroup.user_id == 1), '_user_group_user_id_group_id_idx'),
+        (db.select(ItemGroup.item_id).where(ItemGroup.group_id == 1), '_item_group_group_id_item_id_idx'),
+    ],
+)
+def test_query_plans_use_covering_indexes(equal_weight_app, statement, index):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN the query plan of a query run while serving pages is requested
+    THEN the query is answered from a covering index without reading the table
+    """
+    with equal_weight_app.app_context():
+        plan = query_plan(statement)
+        assert f'USING COVERING INDEX {index}' in plan
+
+
+def test_migrate_adds_missing_tables_and_indexes(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and equal weights with a database missing a table and some indexes
+    WHEN the migrate command is run twice
+    THEN the first run creates the missing table and indexes and keeps the data, the second run changes nothing
+    """
+    with equal_weight_app.app_context():
+        items = db.session.execute(text('SELECT COUNT(*) FROM item')).scalar()
+        db.session.execute(text('DROP INDEX _comparison_user_id_state_idx'))
+        db.session.execute(text('DROP INDEX _user_item_user_id_known_item_id_idx'))
+        db.session.execute(text('DROP TABLE user_item_queue'))
+        db.session.commit()
+
+        runner = equal_weight_app.test_cli_runner()
+        result = runner.invoke(args=["migrate"])
+        assert result.exit_code == 0
+
+        inspector = inspect(db.engine)
+        assert 'user_item_queue' in inspector.get_table_names()
+        assert '_comparison_user_id_state_idx' in {i['name'] for i in inspector.get_indexes('comparison')}
+        assert '_user_item_user_id_known_item_id_idx' in {i['name'] for i in inspector.get_indexes('user_item')}
+        assert db.session.execute(text('SELECT COUNT(*) FROM item')).scalar() == items
+
+        assert Migration(equal_weight_app).exec() == []
+
+
+def test_migrate_adds_and_fills_judgement_counters(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and equal weights with a database created before the judgement counters
+        were added to the user table
+    WHEN the migrate command is run
+    THEN the counter columns are added and filled from the comparisons already made
+    """
+    with equal_weight_app.app_context():
+        db.session.execute(
+            text('INSERT INTO user (user_id, name, country, allergies, age) VALUES (1, "Tester", "England", "No", 30)')
+        )
+        for state in ['selected', 'tied', 'skipped']:
+            db.session.add(Comparison(user_id=1, item_1_id=1, item_2_id=2, state=state))
+        db.session.commit()
+        db.session.execute(text('ALTER TABLE user DROP COLUMN compared_count'))
+        db.session.execute(text('ALTER TABLE user DROP COLUMN skipped_count'))
+        db.session.commit()
+
+        result = equal_weight_app.test_cli_runner().invoke(args=["migrate"])
+        assert result.exit_code == 0
+        counters = db.session.execute(text('SELECT compared_count, skipped_count FROM user WHERE user_id = 1')).one()
+        assert tuple(counters) == (2, 1)
@@ -1,7 +1,16 @@
+import json
+import os
+
+import numpy as np
 from sqlalchemy import text
+from sqlalchemy.orm import aliased
 
+import comparison_interface
+from comparison_interface.db.catalog import ItemCatalog
 from comparison_interface.db.connection import db
-from tests_python.conftest import execute_setup
+from comparison_interface.db.models import CustomItemPair, Item, WebsiteControl
+from comparison_interface.db.weights import WeightStore
+from tests_python.conftest import execute_setup, remove_test_database
 
 
 def test_user_setup(equal_weight_app):
@@ -13,11 +22,13 @@ def test_user_setup(equal_weight_app):
     with equal_weight_app.app_context():
         sql = 'SELECT * FROM "user"'
         user_columns = db.session.execute(text(sql)).keys()
-        assert len(user_columns) == 9
+        assert len(user_columns) == 11
         assert user_columns == [
             'user_id',
             'created_date',
             'completed_cycles',
+            'compared_count',
+            'skipped_count',
             'name',
             'country',
             'allergies',
@@ -136,3 +147,85 @@ def test_setup_items_without_ids(equal_weight_app):
         items = db.session.execute(text(item_count_sql)).all()
         assert len(items) == 1
         assert items[0].name == "northern_ireland"
+
+
+def test_setup_writes_custom_weight_store(mocker, custom_weight_app):
+    """
+    GIVEN a flask app configured for testing and custom weights
+    WHEN the database is initialised
+    THEN the custom item pairs of each group are written to the weight store and the item catalog maps them instead
+        of querying the database
+    """
+    with custom_weight_app.app_context():
+        generation = WebsiteControl().get_conf().generation()
+        pairs = WeightStore(custom_weight_app).read(generation, 2)
+        assert isinstance(pairs, np.memmap)
+        rows = db.session.execute(
+            db.select(CustomItemPair.item_1_id, CustomItemPair.item_2_id, CustomItemPair.weight)
+            .where(CustomItemPair.group_id == 2)
+            .order_by(CustomItemPair.custom_item_pair_id)
+        ).all()
+        assert [tuple(p) for p in pairs[['item_1_id', 'item_2_id', 'weight']].tolist()] == [tuple(r) for r in rows]
+
+        from_database = mocker.spy(ItemCatalog, '_load_database_pairs')
+        catalog = ItemCatalog.load(generation, WeightStore(custom_weight_app))
+        item_1_ids, item_2_ids, table = catalog.get_custom_pairs([2])
+        assert from_database.call_count == 0
+        assert np.allclose(table.probabilities(), [r.weight for r in rows])
+        item_1, item_2 = catalog.draw_custom_pair(np.random.default_rng(), [2])
+        assert (item_1.item_id, item_2.item_id) in [(r.item_1_id, r.item_2_id) for r in rows]
+
+
+def test_setup_equal_weights_writes_no_weight_store(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN the database is initialised
+    THEN no weight store files are written
+    """
+    assert not os.path.exists(WeightStore(equal_weight_app).location)
+
+
+def test_setup_custom_weights_from_weight_files(tmp_path):
+    """
+    GIVEN a custom weight configuration whose groups keep their weights in a CSV file and in a weight matrix
+    WHEN the database is initialised
+    THEN the same custom item pairs are saved as for the weights defined in the configuration file
+    """
+    package_folder = os.path.dirname(comparison_interface.__file__)
+    with open(os.path.join(package_folder, '../tests_python/test_configurations/config-custom-item-weights.json')) as f:
+        config = json.load(f)
+    expected = set()
+    for group_id, g in enumerate(config['comparisonConfiguration']['groups'], 1):
+        expected.update((group_id, w['item_1'], w['item_2'], w['weight']) for w in g['weight'])
+
+    first, second = config['comparisonConfiguration']['groups']
+    (tmp_path / 'first.csv').write_text(
+        '\n'.join(['item_1,item_2,weight'] + [f"{w['item_1']},{w['item_2']},{w['weight']}" for w in first['weight']])
+    )
+    names = [i['name'] for i in second['items']]
+    matrix = np.zeros((len(names), len(names)))
+    for w in second['weight']:
+        matrix[names.index(w['item_1']), names.index(w['item_2'])] = w['weight']
+    np.save(tmp_path / 'second.npy', matrix)
+    del first['weight'], second['weight']
+    first['weightFile'] = 'first.csv'
+    second['weightFile'] = 'second.npy'
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+
+    app = execute_setup(os.path.relpath(tmp_path / 'config.json', package_folder))
+    try:
+        with app.app_context():
+            item_1 = aliased(Item)
+            item_2 = aliased(Item)
+            rows = db.session.execute(
+                db.select(CustomItemPair.group_id, item_1.name, item_2.name, CustomItemPair.weight)
+                .join(item_1, CustomItemPair.item_1_id == item_1.item_id)
+                .join(item_2, CustomItemPair.item_2_id == item_2.item_id)
+            ).all()
+            assert set(tuple(r) for r in rows) == expected
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            remove_test_database()
+        WeightStore(app).clear()
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+
+import pytest
+
+from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.catalog import ItemCatalog
+from comparison_interface.db.connection import db
+from comparison_interface.db.models import CustomItemPair, Group, Item, ItemGroup, WebsiteControl
+from comparison_interface.db.setup import Setup as DBSetup
+from comparison_interface.db.weights import WeightStore
+from comparison_interface.integrity import IntegrityWatcher
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'comparison_interface')
+CONFIGURATIONS = os.path.join(os.path.dirname(__file__), '..', 'test_configurations')
+
+
+def write_configuration(tmp_path, name, change):
+    """Write a modified copy of a test configuration and return its location relative to the package."""
+    with open(os.path.join(CONFIGURATIONS, name)) as f:
+        config = json.load(f)
+    change(config['comparisonConfiguration'])
+    path = tmp_path / name
+    path.write_text(json.dumps(config))
+    return os.path.relpath(path, PACKAGE_DIR)
+
+
+def add_group(comparison):
+    """Add a group with a new item and an item of another group, and a new pair to the first group."""
+    wales = comparison['groups'][0]['items'][0]
+    comparison['groups'][0]['weight'].append({'item_1': 'scotland', 'item_2': 'wales', 'weight': 0.4})
+    # The saved weight of an existing pair is kept
+    comparison['groups'][0]['weight'][0]['weight'] = 0.9
+    comparison['groups'].append(
+        {
+            'name': 'islands',
+            'displayName': 'Islands',
+            'items': [wales, {'name': 'skye', 'displayName': 'Skye', 'imageName': 'item_1.png'}],
+            'weight': [{'item_1': 'wales', 'item_2': 'skye', 'weight': 1}],
+        }
+    )
+
+
+def test_sync_adds_new_configuration(custom_weight_app, tmp_path):
+    """
+    GIVEN a flask app set up with custom weights
+    WHEN the database is synchronised with a configuration adding a group, an item and item pairs
+    THEN only the new rows are added, the existing ids and weights are kept and a new generation is recorded
+    """
+    app = custom_weight_app
+    with app.app_context():
+        items = dict(db.session.execute(db.select(Item.name, Item.item_id)).all())
+        previous = WebsiteControl().get_conf().generation()
+
+    WS.set_configuration_location(app, write_configuration(tmp_path, 'config-custom-item-weights.json', add_group))
+    added = DBSetup(app).sync()
+    assert added == {'groups': 1, 'items': 1, 'item_groups': 2, 'custom_item_pairs': 2}
+
+    with app.app_context():
+        saved = dict(db.session.execute(db.select(Item.name, Item.item_id)).all())
+        assert {name: saved[name] for name in items} == items
+        assert 'skye' in saved
+        assert db.session.scalar(db.select(db.func.count()).select_from(Group)) == 3
+        assert db.session.scalar(db.select(db.func.count()).select_from(ItemGroup)) == 9
+        pairs = db.session.execute(
+            db.select(
+                CustomItemPair.group_id, CustomItemPair.item_1_id, CustomItemPair.item_2_id, CustomItemPair.weight
+            )
+        ).all()
+        assert len(pairs) == 11
+        assert (1, items['wales'], items['scotland'], 0.2) in pairs
+        assert (1, items['scotland'], items['wales'], 0.4) in pairs
+
+        website_control = WebsiteControl().get_conf()
+        assert website_control.generation() != previous
+        assert website_control.configuration_file == app.config[WS.CONFIGURATION_LOCATION]
+
+    # Every group has a weight file in the new generation only
+    store = WeightStore(app)
+    assert [len(store.read(website_control.generation(), group_id)) for group_id in (1, 2, 3)] == [4, 6, 1]
+    assert store.read(previous, 1) is None
+
+    # Synchronising the same configuration again adds nothing
+    assert DBSetup(app).sync() == {'groups': 0, 'items': 0, 'item_groups': 0, 'custom_item_pairs': 0}
+
+
+def test_sync_refuses_weight_configuration_change(equal_weight_app, tmp_path):
+    """
+    GIVEN a flask app set up with equal weights
+    WHEN the database is synchronised with a custom weight configuration
+    THEN an error is raised and nothing is added
+    """
+    app = equal_weight_app
+    WS.set_configuration_location(app, write_configuration(tmp_path, 'config-custom-item-weights.json', add_group))
+    with pytest.raises(RuntimeError, match='weight configuration'):
+        DBSetup(app).sync()
+
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Group)) == 2
+        assert db.session.scalar(db.select(db.func.count()).select_from(WebsiteControl)) == 1
+
+
+def test_running_workers_load_synchronised_items(custom_weight_app, tmp_path):
+    """
+    GIVEN a flask app set up with custom weights and serving requests
+    WHEN the database is synchronised and the integrity is checked again
+    THEN the worker loads the new items and is told about the new generation
+    """
+    app = custom_weight_app
+    new_generations = []
+    app.integrity_watcher = IntegrityWatcher(app, 0, on_new_generation=new_generations.append)
+    client = app.test_client()
+    assert client.get('/register').status_code == 200
+    with app.app_context():
+        assert len(ItemCatalog.get(app).get_group_items([1, 2])) == 6
+    assert new_generations == []
+
+    WS.set_configuration_location(app, write_configuration(tmp_path, 'config-custom-item-weights.json', add_group))
+    DBSetup(app).sync()
+
+    assert client.get('/register').status_code == 200
+    assert new_generations == [app]
+    with app.app_context():
+        catalog = ItemCatalog.get(app)
+        assert len(catalog.get_group_items([3])) == 2
+        assert catalog.get_custom_pairs([3]) is not None
+
+
+def add_group_items(comparison):
+    """Add a new item and an item of the other group to the first group."""
+    comparison['groups'][0]['items'] += [
+        comparison['groups'][1]['items'][0],
+        {'name': 'cornwall', 'displayName': 'Cornwall', 'imageName': 'item_1.png'},
+    ]
+
+
+def answer_item_preferences(client):
+    """State that every item shown on the item preference page is known, returning the ids of the items shown."""
+    item_ids = []
+    response = client.get('/selection/items')
+    while response.status_code == 200:
+        item_id = int(re.search(rb'name="item_id" value="(\d+)"', response.data).group(1))
+        item_ids.append(item_id)
+        client.post('/selection/items', data={'item_id': item_id, 'action': 'agree'})
+        response = client.get('/selection/items')
+    assert response.status_code == 302
+    return item_ids
+
+
+def test_sync_extends_item_preference_queues(equal_weight_app, user_data, tmp_path):
+    """
+    GIVEN a flask app set up with equal weights and a user who stated the preference for every item of a group
+    WHEN the database is synchronised with a configuration adding items to the group
+    THEN the user is asked about the preference for each added item once
+    """
+    app = equal_weight_app
+    client = app.test_client()
+    client.post('/register', data=user_data)
+    assert sorted(answer_item_preferences(client)) == list(range(1, 10))
+
+    WS.set_configuration_location(app, write_configuration(tmp_path, 'config-equal-item-weights.json', add_group_items))
+    assert DBSetup(app).sync()['item_groups'] == 2
+    app.integrity_watcher.check()
+
+    with app.app_context():
+        items = dict(db.session.execute(db.select(Item.name, Item.item_id)).all())
+    assert sorted(answer_item_preferences(client)) == sorted([items['wales'], items['cornwall']])
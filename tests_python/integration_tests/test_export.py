@@ -1,6 +1,10 @@
 import os
 
+from comparison_interface.configuration.images import ImageValidator
+from comparison_interface.configuration.validation import Validation as ConfigValidation
 from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db.connection import db
+from comparison_interface.db.models import WebsiteControl
 
 
 def test_export_equal_weights(equal_weight_client, equal_weight_app, user_data):
@@ -15,3 +19,27 @@ def test_export_equal_weights(equal_weight_client, equal_weight_app, user_data):
     runner.invoke(args=["export"])
 
     assert os.path.exists(os.path.join(WS.get_export_location(equal_weight_app), 'database_export.zip'))
+
+
+def test_export_skips_full_validation_of_unchanged_configuration(equal_weight_app, mocker):
+    """
+    GIVEN a flask app set up from a configuration whose validation fingerprint was recorded
+    WHEN the export is requested on the command line before and after the recorded fingerprint no longer matches
+    THEN the configuration is only fully validated, including the item images, when the fingerprint doesn't match
+    """
+    with equal_weight_app.app_context():
+        website_control = WebsiteControl().get_conf()
+        website_control.validation_fingerprint = ConfigValidation(equal_weight_app).fingerprint()
+        db.session.commit()
+    images = mocker.spy(ImageValidator, 'validate')
+    runner = equal_weight_app.test_cli_runner()
+
+    runner.invoke(args=["export"])
+    assert images.call_count == 0
+    assert os.path.exists(os.path.join(WS.get_export_location(equal_weight_app), 'database_export.zip'))
+
+    with equal_weight_app.app_context():
+        WebsiteControl().get_conf().validation_fingerprint = 'modified'
+        db.session.commit()
+    runner.invoke(args=["export"])
+    assert images.call_count == 1
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+
+from comparison_interface.db.connection import db
+from comparison_interface.db.weights import WeightStore
+from comparison_interface.views.request import UserContext
+from tests_python.conftest import count_statements, execute_setup, remove_test_database
+
+EQUAL_WEIGHTS_NO_PREFERENCES = "../tests_python/test_configurations/config-equal-item-weights-2.json"
+EQUAL_WEIGHTS = "../tests_python/test_configurations/config-equal-item-weights.json"
+CUSTOM_WEIGHTS = "../tests_python/test_configurations/config-custom-item-weights.json"
+
+
+@pytest.fixture()
+def budget_app(request):
+    """Set up the project from the configuration given as parameter."""
+    app = execute_setup(request.param)
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        remove_test_database()
+    WeightStore(app).clear()
+
+
+def _judge(client):
+    """Judge the items shown on the rank page, returning the id of the new comparison."""
+    response = client.get("/rank")
+    item_1_id, item_2_id = re.findall(rb'name="item_[12]_id" value="(\d+)"', response.data)
+    client.post(
+        "/rank",
+        data={
+            'state': 'confirmed',
+            'item_1_id': item_1_id.decode(),
+            'item_2_id': item_2_id.decode(),
+            'selected_item_id': item_1_id.decode(),
+            'comparison_id': '',
+        },
+    )
+    with client.session_transaction() as session:
+        return session['previous_comparison_id']
+
+
+@pytest.mark.parametrize(
+    "budget_app, url, budget",
+    [
+        (EQUAL_WEIGHTS_NO_PREFERENCES, "/rank", 1),
+        (EQUAL_WEIGHTS_NO_PREFERENCES, "/thankyou", 1),
+        (EQUAL_WEIGHTS, "/selection/items", 1),
+        (CUSTOM_WEIGHTS, "/rank", 1),
+        # Rejudging also reads the comparison being rejudged
+        (EQUAL_WEIGHTS_NO_PREFERENCES, "/rank?comparison_id={}", 2),
+        (CUSTOM_WEIGHTS, "/rank?comparison_id={}", 2),
+    ],
+    indirect=["budget_app"],
+)
+def test_view_statement_budget(budget_app, user_data, url, budget):
+    """
+    GIVEN a flask app configured for testing and a registered user
+    WHEN the user requests a page a second time
+    THEN the page is rendered within the statement budget of the view
+    """
+    client = budget_app.test_client()
+    client.post("/register", data=user_data)
+    if '{}' in url:
+        url = url.format(_judge(client))
+    client.get(url)
+
+    with count_statements(budget_app) as statements:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert len(statements) == budget
+
+
+@pytest.mark.usefixtures('add_basic_data_equal')
+def test_user_context_load(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and basic data loaded
+    WHEN the context of an existing and a missing user are loaded
+    THEN the existing user's context holds the user's groups and the missing user has no context
+    """
+    with equal_weight_app.app_context():
+        context = UserContext.load(2)
+        assert context.user_id == 2
+        assert context.group_ids == (1,)
+        assert context.compared_count == 0
+        assert context.skipped_count == 0
+        assert UserContext.load(1000) is None
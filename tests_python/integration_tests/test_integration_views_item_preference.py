@@ -1,8 +1,13 @@
+import re
+
+import numpy as np
 import pytest
 
+from comparison_interface.db.catalog import ItemCatalog
 from comparison_interface.db.connection import db
-from comparison_interface.db.models import UserItem
-from tests_python.conftest import execute_setup
+from comparison_interface.db.models import UserItem, UserItemQueue
+from comparison_interface.db.setup import Setup as DBSetup
+from tests_python.conftest import execute_setup, remove_test_database
 
 
 def test_redirect_to_registration(equal_weight_client):
@@ -104,3 +109,179 @@ def test_redirect_to_rank_page_when_all_preferences_specified(equal_weight_clien
     assert response.status_code == 200
     assert b'Comparison Software: Items Rank' in response.data
     assert response.request.path == "/rank"
+
+
+def test_known_items_cache_updated_after_preference(equal_weight_app, equal_weight_client, user_data):
+    """
+    GIVEN a flask application configured for testing and equal weights
+    WHEN a logged in user states that items are known
+    THEN the cached known items of the user include each new item as soon as it is saved
+    """
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        for item_id in [3, 5]:
+            equal_weight_client.post("/selection/items", data={'item_id': item_id, 'action': 'agree'})
+            with equal_weight_client.session_transaction() as session:
+                user_id = session['user_id']
+                version = session['known_items_version']
+            cached = equal_weight_app.known_items.get(user_id, version, equal_weight_app.integrity_watcher.generation)
+            assert item_id in cached
+        assert list(cached) == [3, 5]
+
+
+def shown_item_ids(response):
+    """Get the ids of the items shown on a rank page."""
+    return {int(i) for i in re.findall(rb'name="item_[12]_id" value="(\d+)"', response.data)}
+
+
+def test_known_items_cache_after_new_setup(equal_weight_app, user_data):
+    """
+    GIVEN a flask application configured for testing and equal weights with the known items of a user cached
+    WHEN the database is set up again and a new user with the same user id states other items are known
+    THEN the rank page only shows the items known by the new user
+    """
+    client = equal_weight_app.test_client()
+    client.post("/register", data=user_data)
+    for item_id in [1, 2]:
+        client.post("/selection/items", data={'item_id': item_id, 'action': 'agree'})
+    assert shown_item_ids(client.get("/rank")) == {1, 2}
+
+    DBSetup(equal_weight_app).exec()
+    equal_weight_app.integrity_watcher.check()
+
+    client = equal_weight_app.test_client()
+    client.post("/register", data=user_data)
+    for item_id in [5, 8]:
+        client.post("/selection/items", data={'item_id': item_id, 'action': 'agree'})
+    with client.session_transaction() as session:
+        assert session['user_id'] == 1
+        assert session['known_items_version'] == 2
+    assert shown_item_ids(client.get("/rank")) == {5, 8}
+
+
+def test_item_preference_queue(equal_weight_client, user_data):
+    """
+    GIVEN a flask application configured for testing and equal weights
+    WHEN a logged in user states the preference for each item shown
+    THEN every item of the user's group is shown once in the order of the queue created on the first visit and the
+        user is then redirected to the rank page
+    """
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        response = equal_weight_client.get("/selection/items")
+        assert response.status_code == 200
+        with equal_weight_client.session_transaction() as session:
+            user_id = session['user_id']
+        queue = db.session.get(UserItemQueue, user_id)
+        item_ids = list(queue.get_item_ids())
+        assert sorted(item_ids) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+        for position, item_id in enumerate(item_ids):
+            db.session.expire_all()
+            queue = db.session.get(UserItemQueue, user_id)
+            assert queue.position == position
+            assert queue.current_item_id() == item_id
+            response = equal_weight_client.get("/selection/items")
+            assert f'value="{item_id}"'.encode() in response.data
+            equal_weight_client.post("/selection/items", data={'item_id': item_id, 'action': 'agree'})
+
+        response = equal_weight_client.get("/selection/items")
+        assert response.status_code == 302
+        assert b'href="/rank"' in response.data
+        assert db.session.scalar(db.select(db.func.count(UserItemQueue.user_id))) == 1
+
+
+def test_item_preference_queue_created_concurrently(equal_weight_client, user_data, monkeypatch):
+    """
+    GIVEN a flask application configured for testing and equal weights
+    WHEN another request of the same user creates the item queue while the first item preference page is being built
+    THEN the page is shown from the queue created by the other request
+    """
+    get_group_items = ItemCatalog.get_group_items
+
+    def get_group_items_during_race(catalog, group_ids):
+        # The other request commits its queue between the queue lookup and the insert of this request
+        with db.engine.begin() as connection:
+            connection.execute(
+                db.insert(UserItemQueue).values(
+                    user_id=user_id, item_ids=np.arange(9, 0, -1, dtype='<i4').tobytes(), position=0
+                )
+            )
+        return get_group_items(catalog, group_ids)
+
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        with equal_weight_client.session_transaction() as session:
+            user_id = session['user_id']
+        monkeypatch.setattr(ItemCatalog, 'get_group_items', get_group_items_during_race)
+
+        response = equal_weight_client.get("/selection/items")
+        assert response.status_code == 200
+        assert b'value="9"' in response.data
+        assert db.session.get(UserItemQueue, user_id).get_item_ids().tolist() == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+@pytest.fixture()
+def grid_client():
+    """Return a test client for an app showing four items per item preference page."""
+    app = execute_setup("../tests_python/test_configurations/config-equal-item-weights-grid.json")
+    with app.app_context():
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+        remove_test_database()
+
+
+def test_item_preference_grid(mocker, grid_client, user_data):
+    """
+    GIVEN a flask application configured for testing and equal weights showing four items per item preference page
+    WHEN a logged in user ticks some of the items of each page
+    THEN each page shows the next four items of the queue, all the preferences of a page are saved with a single
+        insert and the user is redirected to the rank page once all the items have been shown
+    """
+    with grid_client:
+        grid_client.post("/register", data=user_data)
+        with grid_client.session_transaction() as session:
+            user_id = session['user_id']
+        execute = mocker.spy(db.session, 'execute')
+        known = []
+        for page in range(3):
+            response = grid_client.get("/selection/items")
+            assert response.status_code == 200
+            queue = db.session.get(UserItemQueue, user_id)
+            item_ids = queue.next_item_ids(4).tolist()
+            assert len(item_ids) == (4 if page < 2 else 1)
+            for item_id in item_ids:
+                assert f'id="item-{item_id}"'.encode() in response.data
+            known.append(item_ids[0])
+            execute.reset_mock()
+            grid_client.post("/selection/items", data={'item_ids': item_ids, 'known_item_ids': [item_ids[0]]})
+            inserts = [c for c in execute.call_args_list if str(c.args[0]).startswith('INSERT INTO user_item')]
+            assert len(inserts) == 1
+
+        response = grid_client.get("/selection/items")
+        assert response.status_code == 302
+        assert b'href="/rank"' in response.data
+        preferences = db.session.execute(db.select(UserItem.item_id, UserItem.known).where(UserItem.user_id == user_id))
+        preferences = dict(preferences.all())
+        assert sorted(preferences) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        assert sorted(item_id for item_id, is_known in preferences.items() if is_known) == sorted(known)
+
+
+def test_item_preference_grid_resubmitted_page_ignored(grid_client, user_data):
+    """
+    GIVEN a flask application configured for testing and equal weights showing four items per item preference page
+    WHEN a page of preferences is submitted twice
+    THEN the second submission is ignored
+    """
+    with grid_client:
+        grid_client.post("/register", data=user_data)
+        grid_client.get("/selection/items")
+        with grid_client.session_transaction() as session:
+            user_id = session['user_id']
+        item_ids = db.session.get(UserItemQueue, user_id).next_item_ids(4).tolist()
+        for _ in range(2):
+            response = grid_client.post("/selection/items", data={'item_ids': item_ids})
+            assert response.status_code == 302
+        count = db.session.scalar(db.select(db.func.count(UserItem.user_item_id)).where(UserItem.user_id == user_id))
+        assert count == 4
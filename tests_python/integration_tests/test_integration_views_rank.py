@@ -4,6 +4,7 @@ from flask import session
 from comparison_interface.configuration.website import Settings as WS
 from comparison_interface.db.connection import db
 from comparison_interface.db.models import Comparison, User
+from comparison_interface.db.writer import JudgementWriter
 from comparison_interface.views import rank
 from tests_python.conftest import execute_setup
 
@@ -470,3 +471,57 @@ def test_no_previous_button_if_setting_false(user_data):
     assert response.status_code == 200
     assert b'Comparison Software: Items Rank' in response.data
     assert b'<button id="previous-button"' not in response.data
+
+
+def test_judgement_counters_follow_rejudging(equal_weight_client, equal_weight_app, user_data):
+    """
+    GIVEN a flask app configured for testing and with equal weights
+    WHEN comparisons are made, skipped and rejudged from one state to another
+    THEN the user's compared and skipped counters always match the comparisons stored and the repair command doesn't
+        change them
+    """
+    transitions = [
+        ({'state': 'skipped'}, (0, 1)),
+        ({'state': 'confirmed', 'selected_item_id': '1'}, (1, 1)),
+        ({'state': 'confirmed', 'selected_item_id': '1', 'comparison_id': '1'}, (2, 0)),
+        ({'state': 'confirmed', 'comparison_id': '1'}, (2, 0)),
+        ({'state': 'skipped', 'comparison_id': '2'}, (1, 1)),
+        ({'state': 'skipped', 'comparison_id': '2'}, (1, 1)),
+    ]
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        user_id = session['user_id']
+        for data, expected in transitions:
+            equal_weight_client.post("/rank", data={'item_1_id': '1', 'item_2_id': '2', **data})
+            db.session.expire_all()
+            user = db.session.get(User, user_id)
+            assert (user.compared_count, user.skipped_count) == expected
+
+        result = equal_weight_app.test_cli_runner().invoke(args=["repair-counters"])
+        assert result.exit_code == 0
+        db.session.expire_all()
+        user = db.session.get(User, user_id)
+        assert (user.compared_count, user.skipped_count) == (1, 1)
+
+
+def test_register_comparison_with_judgement_writer(equal_weight_client, equal_weight_app, user_data):
+    """
+    GIVEN a flask app configured for testing, with equal weights and the judgement writer enabled
+    WHEN a 'selected' ranking decision is posted to the rank url
+    THEN the comparison is saved by the writer before the user is redirected to another rank page
+    """
+    equal_weight_app.judgement_writer = JudgementWriter(equal_weight_app, interval=1)
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        response = equal_weight_client.post(
+            "/rank",
+            data={'state': 'confirmed', 'item_1_id': '1', 'item_2_id': '2', 'selected_item_id': '1'},
+        )
+        assert response.status_code == 302
+        assert session['comparison_ids'] == [session['previous_comparison_id']]
+
+        comparison = db.session.get(Comparison, session['previous_comparison_id'])
+        assert comparison.user_id == session['user_id']
+        assert comparison.state == Comparison.SELECTED
+        assert comparison.selected_item_id == 1
+        assert db.session.get(User, session['user_id']).compared_count == 1
@@ -1,6 +1,10 @@
+from flask import session
+from sqlalchemy import event
+
 from comparison_interface.db.connection import db
-from comparison_interface.db.models import User
+from comparison_interface.db.models import User, UserGroup
 from comparison_interface.views import register
+from tests_python.conftest import count_statements
 
 
 def test_page_links_all_true(equal_weight_client):
@@ -78,3 +82,64 @@ def test_register_user_with_escape_route_off(mocker, equal_weight_client, user_d
             assert user.completed_cycles is None
             assert isinstance(user.user_id, int)
             assert user.user_id == session['user_id']
+
+
+def test_layout_text_built_once(mocker, equal_weight_client):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN the registration page is displayed several times
+    THEN the layout text is only built for the first request
+    """
+    build = mocker.spy(register.Register, '_build_layout_text')
+    with equal_weight_client:
+        for _ in range(3):
+            response = equal_weight_client.get("/register")
+            assert response.status_code == 200
+    assert build.call_count == 1
+
+
+def test_register_users_in_one_transaction(equal_weight_app, user_data):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN two users register, selecting two groups
+    THEN the user table is reflected once and each user and the user's groups are saved in a single transaction
+    """
+    commits = []
+    user_tables = []
+
+    def count_commit(connection):
+        commits.append(connection)
+
+    with equal_weight_app.app_context():
+        engine = db.engine
+    event.listen(engine, "commit", count_commit)
+    try:
+        for _ in range(2):
+            client = equal_weight_app.test_client()
+            with client:
+                response = client.post("/register", data={**user_data, 'group_ids': ['1', '2']})
+                assert response.status_code == 302
+                user_id = session['user_id']
+                groups = db.session.scalars(db.select(UserGroup.group_id).where(UserGroup.user_id == user_id)).all()
+                assert sorted(groups) == [1, 2]
+            user_tables.append(equal_weight_app.user_table)
+    finally:
+        event.remove(engine, "commit", count_commit)
+    assert len(commits) == 2
+    assert user_tables[0] is user_tables[1]
+
+
+def test_registration_reads_cached_website_control(equal_weight_app, user_data):
+    """
+    GIVEN a flask app configured for testing and equal weights, whose state was checked by the integrity watcher
+    WHEN the registration page is displayed and a user registers
+    THEN the website control row is read from memory instead of the database
+    """
+    client = equal_weight_app.test_client()
+    client.get("/register")
+    with count_statements(equal_weight_app) as statements, client:
+        client.get("/register")
+        client.post("/register", data=user_data)
+        assert session['weight_conf'] == 'equal'
+    assert len(statements) > 0
+    assert not any('website_control' in statement for statement in statements)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from comparison_interface.db.connection import db
+from comparison_interface.db.setup import Setup as DBSetup
+from comparison_interface.integrity import IntegrityWatcher
+from tests_python.conftest import execute_setup, remove_test_database
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'comparison_interface')
+
+
+@pytest.fixture()
+def copied_config_app(tmp_path):
+    """Set up the project from a copy of the equal weight configuration that the tests can modify."""
+    config_path = tmp_path / 'config.json'
+    shutil.copy(
+        os.path.join(PACKAGE_DIR, '../tests_python/test_configurations/config-equal-item-weights.json'), config_path
+    )
+    os.utime(config_path, (time.time() - 60, time.time() - 60))
+    app = execute_setup(os.path.relpath(config_path, PACKAGE_DIR))
+    yield app, config_path
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        remove_test_database()
+
+
+def test_integrity_checked_once_per_interval(equal_weight_app, mocker):
+    """
+    GIVEN a flask app configured for testing with equal weights and a long integrity check interval
+    WHEN several pages are requested
+    THEN the integrity check only runs for the first request
+    """
+    equal_weight_app.integrity_watcher.interval = 3600
+    check = mocker.spy(IntegrityWatcher, 'check')
+    client = equal_weight_app.test_client()
+    for _ in range(5):
+        assert client.get('/register').status_code == 200
+    assert check.call_count == 1
+    assert equal_weight_app.integrity_watcher.healthy is True
+    assert equal_weight_app.integrity_watcher.website_control.weight_configuration == 'equal'
+
+
+def test_integrity_fails_closed_when_configuration_modified(copied_config_app):
+    """
+    GIVEN a flask app that has been set up and is serving requests
+    WHEN the configuration file is modified after the setup and the check interval has elapsed
+    THEN every request is refused
+    """
+    app, config_path = copied_config_app
+    app.integrity_watcher.interval = 3600
+    client = app.test_client()
+    assert client.get('/register').status_code == 200
+
+    os.utime(config_path, (time.time() + 60, time.time() + 60))
+    # still within the interval, the cached state is used
+    assert client.get('/register').status_code == 200
+
+    app.integrity_watcher.interval = 0
+    with pytest.raises(RuntimeError, match='unhealthy'):
+        client.get('/register')
+    assert app.integrity_watcher.healthy is False
+    # static files are not affected
+    assert client.get('/assets/css/custom-style.css').status_code == 200
+
+
+def test_new_generation_reported_after_reset(equal_weight_app):
+    """
+    GIVEN a flask app that has been set up and is serving requests
+    WHEN a check runs while the database is being set up again and the next check finds the new setup
+    THEN the watcher reports the new generation
+    """
+    app = equal_weight_app
+    new_generations = []
+    watcher = app.integrity_watcher = IntegrityWatcher(app, 0, on_new_generation=new_generations.append)
+    assert watcher.check() is True
+
+    with app.app_context():
+        db.drop_all()
+    assert watcher.check() is False
+    assert watcher.error == IntegrityWatcher.NOT_INITIALISED
+    assert watcher.generation is None
+
+    DBSetup(app).exec()
+    assert watcher.check() is True
+    assert new_generations == [app]
@@ -0,0 +1,211 @@
+import os
+import shutil
+
+import pytest
+from flask import session
+
+from comparison_interface.configuration.website import Settings as WS
+from comparison_interface.db import journal as journal_module
+from comparison_interface.db.connection import db
+from comparison_interface.db.journal import RECORD_SIZE, JournalRecord, JudgementJournal, read_segment
+from comparison_interface.db.models import Comparison, JournalSegment, User
+from comparison_interface.views import rank
+
+
+@pytest.fixture()
+def journal_app(equal_weight_app):
+    """Return the equal weight app writing the judgements to a journal."""
+    journal = JudgementJournal(equal_weight_app)
+    journal.clear()
+    equal_weight_app.judgement_journal = journal
+    yield equal_weight_app
+    journal.clear()
+
+
+def _judge(client, selected_item_id='1', comparison_id=''):
+    return client.post(
+        "/rank",
+        data={
+            'state': 'confirmed',
+            'item_1_id': '1',
+            'item_2_id': '2',
+            'selected_item_id': selected_item_id,
+            'comparison_id': comparison_id,
+        },
+    )
+
+
+def test_journal_record_round_trip(tmp_path):
+    """
+    GIVEN a journal record
+    WHEN it is packed, written to a segment file and read back
+    THEN the same record is read and a damaged record stops the reading
+    """
+    record = JournalRecord(12, 3, 1, 2, None, Comparison.TIED, 1_700_000_000_123_456_000, 1_700_000_001_000_000_000)
+    path = tmp_path / 'segment'
+    path.write_bytes(record.pack() + record.pack()[:-1] + b'x')
+
+    records, offset, complete = read_segment(path)
+    assert records == [record]
+    assert offset == RECORD_SIZE
+    assert not complete
+    assert JournalRecord.unpack(record.pack()).values()['created'].microsecond == 123456
+
+
+def test_journal_judgements_before_and_after_ingestion(journal_app, user_data):
+    """
+    GIVEN a flask app writing the judgements to a journal
+    WHEN a user makes and rejudges comparisons and the journal is ingested
+    THEN the counters and rejudging read the journal before ingestion and the comparisons are stored afterwards
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        _judge(client)
+        _judge(client, selected_item_id='')
+        first_id, second_id = session['comparison_ids']
+        user_id = session['user_id']
+        assert db.session.scalars(db.select(Comparison)).all() == []
+
+        assert rank.Rank(journal_app, session)._get_comparison_stats() == (2, 0)
+
+        # Rejudge the first comparison as tied
+        response = client.get(f"/rank?comparison_id={first_id}")
+        assert response.status_code == 200
+        response = _judge(client, selected_item_id='', comparison_id=str(first_id))
+        assert response.status_code == 302
+
+    with journal_app.app_context():
+        segments, records = journal_app.judgement_journal.ingest(include_open=True)
+        assert (segments, records) == (1, 3)
+        comparisons = db.session.scalars(db.select(Comparison).order_by(Comparison.comparison_id)).all()
+        assert [c.comparison_id for c in comparisons] == [first_id, second_id]
+        assert [c.state for c in comparisons] == [Comparison.TIED, Comparison.TIED]
+        assert comparisons[0].selected_item_id is None
+        user = db.session.get(User, user_id)
+        assert (user.compared_count, user.skipped_count) == (2, 0)
+        assert db.session.scalars(db.select(JournalSegment.record_count)).all() == [3]
+        assert os.listdir(journal_app.judgement_journal.location) == []
+
+
+def test_journal_ingestion_is_idempotent(journal_app, user_data):
+    """
+    GIVEN a flask app writing the judgements to a journal
+    WHEN the same records are ingested twice, even after the segment was recorded as ingested
+    THEN each comparison is stored once with the state of its latest record
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        _judge(client)
+        comparison_id = session['previous_comparison_id']
+        _judge(client, selected_item_id='2', comparison_id=str(comparison_id))
+
+    journal = journal_app.judgement_journal
+    (segment,) = os.listdir(journal.location)
+    copy = os.path.join(journal.location, '..', 'segment-copy')
+    shutil.copy(os.path.join(journal.location, segment), copy)
+    with journal_app.app_context():
+        assert journal.ingest(include_open=True) == (1, 2)
+        # The same records in a segment with a new name
+        shutil.move(copy, os.path.join(journal.location, '1-1' + JudgementJournal.CLOSED))
+        assert journal.ingest() == (1, 2)
+        comparison = db.session.scalars(db.select(Comparison)).one()
+        assert comparison.comparison_id == comparison_id
+        assert comparison.selected_item_id == 2
+        assert db.session.get(User, comparison.user_id).compared_count == 1
+
+
+def test_journal_ids_continue_after_database_ids(journal_app, user_data):
+    """
+    GIVEN a flask app writing the judgements to a journal and a comparison already in the database
+    WHEN a new comparison is journaled
+    THEN the new comparison gets an id after the stored comparison ids
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        db.session.add(Comparison(user_id=session['user_id'], item_1_id=1, item_2_id=2, state=Comparison.SKIPPED))
+        db.session.commit()
+        _judge(client)
+        assert session['previous_comparison_id'] == 2
+
+
+def test_journal_pending_reads_new_records_only(journal_app, user_data, mocker):
+    """
+    GIVEN a flask app writing the judgements to a journal
+    WHEN the waiting records of a user are read repeatedly while records are appended and ingested
+    THEN only the newly appended records are read and the ingested records are forgotten
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        user_id = session['user_id']
+    journal = journal_app.judgement_journal
+    records = [
+        JournalRecord(comparison_id, user_id, 1, 2, None, Comparison.SKIPPED, 10**18, 10**18 + comparison_id)
+        for comparison_id in (1, 2)
+    ]
+    reads = mocker.spy(journal_module, 'read_segment')
+
+    journal.append(records[0])
+    assert journal.pending(user_id) == {1: records[0]}
+    assert journal.pending(user_id) == {1: records[0]}
+    assert reads.call_count == 1
+
+    journal.append(records[1])
+    assert journal.pending(user_id) == {1: records[0], 2: records[1]}
+    assert reads.call_count == 2
+    assert reads.call_args.args[1] == RECORD_SIZE
+
+    with journal_app.app_context():
+        assert journal.ingest(include_open=True) == (1, 2)
+    assert journal.pending(user_id) == {}
+
+
+def test_export_ingests_journal(journal_app, user_data):
+    """
+    GIVEN a flask app writing the judgements to a journal with a closed and an open segment
+    WHEN the export is requested on the command line
+    THEN the closed segment is written to the database before the export and the open segment is reported
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        _judge(client)
+    journal = journal_app.judgement_journal
+    journal.SEGMENT_SECONDS = 0
+    with client:
+        _judge(client)
+
+    runner = journal_app.test_cli_runner()
+    runner.invoke(args=["export"])
+
+    with journal_app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Comparison)) == 1
+    assert journal.waiting_records() == 1
+    assert os.path.exists(os.path.join(WS.get_export_location(journal_app), 'database_export.zip'))
+
+
+def test_journal_ingested_before_serving_without_journal(journal_app, user_data, monkeypatch):
+    """
+    GIVEN a flask app with judgements waiting in the journal
+    WHEN the journal is turned off and the application state is checked
+    THEN the website is unhealthy while a segment may still be written to, and the segment is ingested before the
+        website opens again
+    """
+    client = journal_app.test_client()
+    with client:
+        client.post("/register", data=user_data)
+        _judge(client)
+    journal_app.judgement_journal = None
+    watcher = journal_app.integrity_watcher
+
+    assert watcher.check() is False
+    assert watcher.error == watcher.UNHEALTHY
+
+    # The segment is no longer written to after twice its maximum age
+    monkeypatch.setattr(JudgementJournal, 'SEGMENT_SECONDS', 0)
+    assert watcher.check() is True
+    with journal_app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Comparison)) == 1
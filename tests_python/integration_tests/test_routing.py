@@ -1,3 +1,6 @@
+from app import create_app
+
+
 def test_render_404(equal_weight_client):
     """
     GIVEN a flask app configured for testing with equal weights
@@ -82,3 +85,32 @@ def test_render_logout(equal_weight_client):
     # there should be no session data
     with equal_weight_client.session_transaction() as session:
         assert 'user_id' not in session
+
+
+def test_static_assets_bypass_application(tmp_path):
+    """
+    GIVEN a flask app that has not been set up yet (so every dynamic page fails the integrity check)
+    WHEN a static file is requested through the assets URL
+    THEN the file is served with long lived immutable caching without running the application hooks
+    """
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'empty.db'}"})
+    client = app.test_client()
+    response = client.get("/assets/css/custom-style.css")
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+
+def test_pages_link_versioned_assets(equal_weight_client, user_data):
+    """
+    GIVEN a flask app configured for testing with equal weights and a logged in user
+    WHEN the item preference page is rendered
+    THEN static files and item images are linked through the versioned assets URL
+    """
+    with equal_weight_client:
+        equal_weight_client.post("/register", data=user_data)
+        response = equal_weight_client.get("/selection/items")
+    assert response.status_code == 200
+    assert b'/static/' not in response.data
+    assert b'src="/assets/images/item_' in response.data
+    assert b'href="/assets/css/custom-style.css?v=' in response.data
@@ -78,3 +78,43 @@ def test_maximal_csv_processed_correctly():
         "weightConfiguration": "equal",
     }
     assert data == expected_data
+
+
+def test_csv_parsed_once_until_changed(tmp_path, mocker):
+    """
+    GIVEN a csv file that has already been processed
+    WHEN it is processed again without changes, after it changes and after the cache is invalidated
+    THEN the file is only parsed again when it changed or was invalidated
+    """
+    csv_path = tmp_path / "items.csv"
+    csv_path.write_text('Item Display Name,Image\nNorth East,item_1.png\n')
+    parse = mocker.spy(CsvProcessor, '_parse')
+
+    first = CsvProcessor().create_config_from_csv(csv_path)
+    assert CsvProcessor().create_config_from_csv(csv_path) is first
+    assert parse.call_count == 1
+
+    csv_path.write_text('Item Display Name,Image\nNorth East,item_1.png\nNorth West,item_2.png\n')
+    changed = CsvProcessor().create_config_from_csv(csv_path)
+    assert parse.call_count == 2
+    assert len(changed["groups"][0]["items"]) == 2
+
+    CsvProcessor.invalidate(csv_path)
+    CsvProcessor().create_config_from_csv(csv_path)
+    assert parse.call_count == 3
+
+
+def test_csv_large_file_single_group(tmp_path):
+    """
+    GIVEN a csv file with many rows spread over a few groups
+    WHEN the function to turn the csv file into the JSON (Dict) config is called
+    THEN every row is assigned to its group in file order
+    """
+    csv_path = tmp_path / "large.csv"
+    rows = ['Item Display Name,Image,Group Display Name']
+    rows += [f'Item {i},item_{i}.png,Group {i % 3}' for i in range(3000)]
+    csv_path.write_text('\n'.join(rows))
+    data = CsvProcessor().create_config_from_csv(csv_path)
+    assert [g["name"] for g in data["groups"]] == ["group_0", "group_1", "group_2"]
+    assert all(len(g["items"]) == 1000 for g in data["groups"])
+    assert data["groups"][1]["items"][0] == {"name": "item_1", "displayName": "Item 1", "imageName": "item_1.png"}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from comparison_interface.sampling import AliasTable
+
+
+@pytest.mark.parametrize(
+    'weights',
+    [
+        [0.1, 0.2, 0.2, 0.3, 0.1, 0.1],
+        [1, 1, 1, 1],
+        [5, 0, 1, 0, 3],
+        [1e-9, 1, 1e9],
+        [2.5],
+    ],
+)
+def test_alias_table_distribution(weights):
+    """
+    GIVEN a list of weights
+    WHEN an alias table is built from them
+    THEN the distribution encoded by the table is exactly the normalised weights
+    """
+    table = AliasTable(weights)
+    expected = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+    assert len(table) == len(weights)
+    assert np.allclose(table.probabilities(), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_alias_table_draws_match_weights():
+    """
+    GIVEN an alias table built from the weights of the custom weight test configuration
+    WHEN a large number of indexes are drawn
+    THEN the observed frequencies match the weights (chi-squared test at the 0.1% level)
+    """
+    weights = np.array([0.1, 0.2, 0.2, 0.3, 0.1, 0.1])
+    table = AliasTable(weights)
+    rng = np.random.default_rng(12345)
+    draws = 60000
+    counts = np.bincount([table.draw(rng) for _ in range(draws)], minlength=len(weights))
+    expected = weights * draws
+    chi_squared = ((counts - expected) ** 2 / expected).sum()
+    # critical value of the chi-squared distribution with 5 degrees of freedom at p = 0.001
+    assert chi_squared < 20.515
+
+
+@pytest.mark.parametrize('weights', [[], [-1, 2], [0, 0]])
+def test_alias_table_invalid_weights(weights):
+    """
+    GIVEN an empty list of weights, a negative weight or only zero weights
+    WHEN an alias table is built
+    THEN a ValueError is raised
+    """
+    with pytest.raises(ValueError):
+        AliasTable(weights)
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 from marshmallow import ValidationError
 
@@ -111,3 +113,34 @@ def test_group_configuration_with_inconsistent_item_ids():
     with pytest.raises(ValidationError):
         group_schema = Group()
         group_schema.load(test_group_schema)
+
+
+@pytest.mark.parametrize(
+    'weights, error',
+    [
+        ([('a', 'b', 0.2), ('c', 'a', 0.3), ('b', 'c', 0.5)], None),
+        ([('a', 'b', 0.5), ('b', 'c', 0.5)], "Custom weight for item pair ('a', 'c') needs to be defined."),
+        (
+            [('a', 'b', 0.2), ('b', 'a', 0.3), ('a', 'c', 0.2), ('b', 'c', 0.3)],
+            "Custom weight for item pair ('b', 'a') defined more than once.",
+        ),
+        ([('a', 'b', 0.2), ('a', 'd', 0.3), ('b', 'c', 0.5)], "d not defined as item name."),
+    ],
+)
+def test_group_configuration_custom_weights(weights, error):
+    """
+    GIVEN a group chunk of a JSON schema with custom weights for its item pairs
+    WHEN the group chunk is validated using the Group schema class
+    THEN a Validation Error is raised if a pair is missing, weighted twice or refers to an unknown item
+    """
+    test_group_schema = {
+        "name": "group1",
+        "displayName": "Group 1",
+        "items": [{"name": name, "displayName": name, "imageName": f"item_{i}.png"} for i, name in enumerate('abc', 1)],
+        "weight": [{"item_1": item_1, "item_2": item_2, "weight": weight} for item_1, item_2, weight in weights],
+    }
+    if error is None:
+        Group().load(test_group_schema)
+    else:
+        with pytest.raises(ValidationError, match=re.escape(error)):
+            Group().load(test_group_schema)
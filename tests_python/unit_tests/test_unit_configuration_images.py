@@ -0,0 +1,68 @@
+import os
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from comparison_interface.configuration import images
+from comparison_interface.configuration.images import ImageValidator
+
+
+@pytest.fixture()
+def image_folder(tmp_path, monkeypatch):
+    """Use an empty images folder holding a valid, a small and a damaged image."""
+    folder = tmp_path / 'images'
+    folder.mkdir()
+    Image.new('RGB', (300, 400)).save(folder / 'valid.png')
+    Image.new('RGB', (300, 200)).save(folder / 'small.png')
+    (folder / 'damaged.png').write_bytes((folder / 'valid.png').read_bytes()[:100])
+    monkeypatch.setattr(images, 'IMAGES_FOLDER', str(folder))
+    return folder
+
+
+@pytest.fixture()
+def validator(tmp_path):
+    return ImageValidator(Flask(__name__, instance_path=str(tmp_path / 'instance')))
+
+
+def test_image_validation_errors(image_folder, validator):
+    """
+    GIVEN item images which are valid, too small, damaged or missing
+    WHEN the images are validated
+    THEN an error is reported for every image but the valid one
+    """
+    errors = validator.validate(['valid.png', 'small.png', 'damaged.png', 'missing.png', 'valid.png'])
+    assert sorted(errors) == ['damaged.png', 'missing.png', 'small.png']
+    assert errors['small.png'] == 'All item images must be at least 300x300px'
+    assert errors['missing.png'] == 'Image missing.png not found on static/images/ folder.'
+    assert os.path.exists(validator.manifest_location)
+
+
+def test_image_validation_reuses_manifest(image_folder, validator, mocker):
+    """
+    GIVEN item images which have been validated before
+    WHEN the images are validated again after one of them has changed
+    THEN only the changed image is opened and the previous errors are still reported
+    """
+    names = ['valid.png', 'small.png', 'damaged.png']
+    first = validator.validate(names)
+    check = mocker.spy(images, 'check_image')
+
+    assert validator.validate(names) == first
+    assert check.call_count == 0
+
+    Image.new('RGB', (300, 300)).save(image_folder / 'small.png')
+    assert sorted(validator.validate(names)) == ['damaged.png']
+    assert check.call_count == 1
+
+
+def test_image_validation_in_process_pool(image_folder, validator):
+    """
+    GIVEN enough item images to check them in a process pool
+    WHEN the images are validated
+    THEN the same errors are reported as when checking them one by one
+    """
+    validator.POOL_THRESHOLD = 0
+    validator.workers = 2
+    errors = validator.validate(['valid.png', 'small.png', 'damaged.png'])
+    assert sorted(errors) == ['damaged.png', 'small.png']
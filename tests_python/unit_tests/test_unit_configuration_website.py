@@ -1,4 +1,9 @@
+import json
+import os
+
+from comparison_interface.configuration import website
 from comparison_interface.configuration.website import Settings
+from comparison_interface.views.request import Request
 
 
 def test_set_configuration_location(equal_weight_app):
@@ -81,3 +86,112 @@ def test_should_render(equal_weight_app):
     settings = Settings()
     result = settings.should_render('renderUserItemPreferencePage', equal_weight_app)
     assert result is True
+
+
+def test_configuration_snapshot_reused(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and with equal weights
+    WHEN the configuration location is set again to the same file and the file has not changed
+    THEN the compiled configuration snapshot is reused instead of reading the file again
+    """
+    snapshot = Settings.get_snapshot(equal_weight_app)
+    Settings.set_configuration_location(equal_weight_app, equal_weight_app.config[Settings.CONFIGURATION_LOCATION])
+    assert Settings.refresh(equal_weight_app) is snapshot
+    assert Settings.get_snapshot(equal_weight_app) is snapshot
+    assert snapshot.render['renderUserItemPreferencePage'] is True
+    assert snapshot.text['rankItemInstructionLabel'] == Settings.get_text('rankItemInstructionLabel', equal_weight_app)
+
+
+def test_configuration_snapshot_rebuilt_on_change(equal_weight_app, tmp_path):
+    """
+    GIVEN a flask app configured for testing with a configuration file that is then modified
+    WHEN the configuration is refreshed
+    THEN the snapshot is rebuilt only when the content of the file changed
+    """
+    source = Settings.get_snapshot(equal_weight_app).path
+    config_path = tmp_path / 'config.json'
+    with open(source) as config_file:
+        config = json.load(config_file)
+    config_path.write_text(json.dumps(config))
+    package_dir = os.path.join(os.path.dirname(website.__file__), '..')
+    Settings.set_configuration_location(equal_weight_app, os.path.relpath(config_path, package_dir))
+    snapshot = Settings.get_snapshot(equal_weight_app)
+
+    # same content with a new modification time keeps the compiled data
+    os.utime(config_path, ns=(snapshot.fingerprint[0] + 10**9, snapshot.fingerprint[0] + 10**9))
+    refreshed = Settings.refresh(equal_weight_app)
+    assert refreshed.data is snapshot.data
+    assert refreshed.fingerprint != snapshot.fingerprint
+
+    config['websiteTextConfiguration']['rankItemInstructionLabel'] = 'Changed label'
+    config_path.write_text(json.dumps(config))
+    os.utime(config_path, ns=(snapshot.fingerprint[0] + 2 * 10**9, snapshot.fingerprint[0] + 2 * 10**9))
+    refreshed = Settings.refresh(equal_weight_app)
+    assert refreshed.digest != snapshot.digest
+    assert Settings.get_text('rankItemInstructionLabel', equal_weight_app) == 'Changed label'
+
+
+def test_text_catalog_reused(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and with equal weights
+    WHEN the text catalog is requested more than once
+    THEN the same merged catalog is returned with the project text taking priority over the language text
+    """
+    with equal_weight_app.app_context():
+        catalog = Settings.get_catalog(equal_weight_app)
+        assert Settings.get_catalog(equal_weight_app) is catalog
+        project_text = Settings.get_configuration(equal_weight_app)[Settings.CONFIGURATION_WEBSITE_TEXT]
+        language_text = equal_weight_app.language_config[Settings.CONFIGURATION_WEBSITE_TEXT]
+        for label in language_text:
+            assert catalog[label] == project_text.get(label, language_text[label])
+        for label in project_text:
+            assert catalog[label] == project_text[label]
+
+
+def test_language_selected_per_user(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing with a second language loaded
+    WHEN a user requests a page with the second language as a query parameter
+    THEN the page and the following pages of the user are shown in the second language, while other users see the
+        application language
+    """
+    language_text = equal_weight_app.language_config[Settings.CONFIGURATION_WEBSITE_TEXT]
+    equal_weight_app.language_configs['xx'] = {
+        Settings.CONFIGURATION_WEBSITE_TEXT: {**language_text, 'userRegistrationFormTitleLabel': 'Inscription'}
+    }
+    client = equal_weight_app.test_client()
+
+    response = client.get('/register?lang=xx')
+    assert b'<html lang="xx">' in response.data
+    assert b'Inscription' in response.data
+    assert b'Inscription' in client.get('/register').data
+
+    response = equal_weight_app.test_client().get('/register?lang=unknown')
+    assert b'<html lang="en">' in response.data
+    assert b'Inscription' not in response.data
+
+
+def test_text_of_previous_configuration_discarded(equal_weight_app, tmp_path):
+    """
+    GIVEN a flask app configured for testing whose pages have been rendered
+    WHEN the website text is changed in the configuration and a page is rendered again
+    THEN only the text catalogs and page text of the current configuration version are kept
+    """
+    client = equal_weight_app.test_client()
+    client.get('/register')
+    with equal_weight_app.app_context():
+        snapshot = Settings.get_snapshot(equal_weight_app)
+    config_path = tmp_path / 'config.json'
+    config = json.loads(json.dumps(snapshot.data))
+    config['websiteTextConfiguration']['rankItemInstructionLabel'] = 'Changed label'
+    config_path.write_text(json.dumps(config))
+    package_dir = os.path.join(os.path.dirname(website.__file__), '..')
+    Settings.set_configuration_location(equal_weight_app, os.path.relpath(config_path, package_dir))
+
+    with equal_weight_app.test_request_context('/register'):
+        digest = Settings.get_snapshot(equal_weight_app).digest
+        assert digest != snapshot.digest
+        Settings.get_text('rankItemInstructionLabel', equal_weight_app)
+        Request(equal_weight_app, {}).get_layout_text()
+    assert {key[0] for key in Settings._catalogs} == {digest}
+    assert {key[1] for key in equal_weight_app.page_text} == {digest}
@@ -0,0 +1,92 @@
+import re
+
+import numpy as np
+import pytest
+from marshmallow import ValidationError
+
+from comparison_interface.configuration.weight_file import load_weight_file
+
+ITEMS = ['a', 'b', 'c']
+# Weight of each pair of items in the order of ITEMS
+PAIRS = {('a', 'b'): 0.2, ('a', 'c'): 0.3, ('b', 'c'): 0.5}
+
+
+def write_csv(path, rows):
+    path.write_text('\n'.join(['item_1,item_2,weight'] + [f'{i},{j},{w}' for i, j, w in rows]))
+    return str(path)
+
+
+def as_pairs(first, second, weights):
+    return {tuple(sorted((ITEMS[i], ITEMS[j]))): round(float(w), 6) for i, j, w in zip(first, second, weights)}
+
+
+def test_weight_file_formats(tmp_path):
+    """
+    GIVEN the same custom weights saved as a matrix, a named matrix, named pairs and a CSV file
+    WHEN each file is loaded
+    THEN every file gives the same weight for each pair of items
+    """
+    matrix = np.array([[0, 0.2, 0.3], [0, 0, 0.5], [0, 0, 0]])
+    np.save(tmp_path / 'weights.npy', matrix)
+    # The names are in a different order than the group items
+    np.savez(
+        tmp_path / 'named_matrix.npz',
+        names=np.array(['c', 'a', 'b']),
+        matrix=np.array([[0, 0.3, 0.5], [0, 0, 0.2], [0, 0, 0]]),
+    )
+    np.savez(
+        tmp_path / 'named_pairs.npz',
+        names=np.array(ITEMS),
+        item_1=np.array([1, 2, 1]),
+        item_2=np.array([0, 0, 2]),
+        weight=np.array([0.2, 0.3, 0.5]),
+    )
+    csv_file = write_csv(tmp_path / 'weights.csv', [('b', 'a', 0.2), ('a', 'c', 0.3), ('c', 'b', 0.5)])
+
+    for path in ['weights.npy', 'named_matrix.npz', 'named_pairs.npz', csv_file]:
+        assert as_pairs(*load_weight_file(str(tmp_path / path), ITEMS)) == PAIRS
+
+
+@pytest.mark.parametrize(
+    'rows, error',
+    [
+        ([('a', 'b', 0.5), ('b', 'c', 0.5)], "Custom weight for item pair ('a', 'c') needs to be defined."),
+        (
+            [('a', 'b', 0.2), ('b', 'a', 0.3), ('a', 'c', 0.2), ('b', 'c', 0.3)],
+            "Custom weight for item pair ('b', 'a') defined more than once.",
+        ),
+        ([('a', 'b', 0.2), ('a', 'd', 0.3), ('b', 'c', 0.5)], "d not defined as item name."),
+        ([('a', 'b', 0.2), ('a', 'c', 0.3), ('b', 'c', 0.2)], "must sum close to 1"),
+        ([('a', 'b', 1.5), ('a', 'c', -0.5), ('b', 'c', 0)], "must be between 0 and 1"),
+    ],
+)
+def test_invalid_weight_file(tmp_path, rows, error):
+    """
+    GIVEN a CSV weight file with a missing, repeated, unknown or invalid weight
+    WHEN the file is loaded
+    THEN a Validation Error describing the problem is raised
+    """
+    with pytest.raises(ValidationError, match=re.escape(error)):
+        load_weight_file(write_csv(tmp_path / 'weights.csv', rows), ITEMS)
+
+
+def test_invalid_weight_matrix(tmp_path):
+    """
+    GIVEN weight files which can't be used for a group of three items
+    WHEN the files are loaded
+    THEN a Validation Error is raised
+    """
+    np.save(tmp_path / 'small.npy', np.ones((2, 2)))
+    with pytest.raises(ValidationError, match='must have 3 rows and 3 columns'):
+        load_weight_file(str(tmp_path / 'small.npy'), ITEMS)
+
+    np.savez(tmp_path / 'unnamed.npz', matrix=np.ones((3, 3)))
+    with pytest.raises(ValidationError, match='must contain the names of the items'):
+        load_weight_file(str(tmp_path / 'unnamed.npz'), ITEMS)
+
+    (tmp_path / 'weights.json').write_text('{}')
+    with pytest.raises(ValidationError, match='must be a .npy, .npz or .csv file'):
+        load_weight_file(str(tmp_path / 'weights.json'), ITEMS)
+
+    with pytest.raises(ValidationError, match='not found'):
+        load_weight_file(str(tmp_path / 'missing.csv'), ITEMS)
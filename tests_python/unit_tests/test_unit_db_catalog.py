@@ -0,0 +1,42 @@
+from collections import Counter
+
+import numpy as np
+
+from comparison_interface.db.catalog import ItemCatalog
+
+
+def test_catalog_group_items(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN the item catalog is loaded
+    THEN the items of each group and of a union of groups are available without duplicates and the union is cached
+    """
+    with equal_weight_app.app_context():
+        catalog = ItemCatalog.get(equal_weight_app)
+        assert ItemCatalog.get(equal_weight_app) is catalog
+        assert list(catalog.get_group_items(['1'])) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        union = catalog.get_group_items([1, 2])
+        assert list(union) == sorted(set(union))
+        assert set(catalog.get_group_items([1])) <= set(union)
+        assert catalog.get_group_items([2, 1]) is union
+        assert catalog.get_item(3).item_id == 3
+
+
+def test_catalog_draw_pair_is_uniform(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing and equal weights
+    WHEN many pairs are drawn from a group
+    THEN the two items are always different and every item is drawn with roughly the same frequency
+    """
+    with equal_weight_app.app_context():
+        catalog = ItemCatalog.get(equal_weight_app)
+        rng = np.random.default_rng(1)
+        counts = Counter()
+        draws = 9000
+        for _ in range(draws):
+            item_1, item_2 = catalog.draw_pair(rng, [1])
+            assert item_1.item_id != item_2.item_id
+            counts.update([item_1.item_id, item_2.item_id])
+        assert sorted(counts) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        for count in counts.values():
+            assert abs(count - 2 * draws / 9) < 0.1 * 2 * draws / 9
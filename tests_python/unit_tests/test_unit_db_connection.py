@@ -0,0 +1,41 @@
+import pytest
+
+from app import create_app
+from comparison_interface.db.connection import db
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    """
+    GIVEN a flask app configured with a SQLite performance profile
+    WHEN a database connection is opened
+    THEN the pragmas of the profile are applied to the connection
+    """
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'pragmas.db'}",
+            "SQLITE_PRAGMAS": {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234},
+        }
+    )
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == 'wal'
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+        db.engine.dispose()
+
+
+def test_sqlite_pragmas_rejects_unknown_pragma(tmp_path):
+    """
+    GIVEN a flask app configured with a pragma outside of the supported list
+    WHEN the app is created
+    THEN a RuntimeError is raised
+    """
+    with pytest.raises(RuntimeError):
+        create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'pragmas.db'}",
+                "SQLITE_PRAGMAS": {'writable_schema': 1},
+            }
+        )
@@ -0,0 +1,133 @@
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app import create_app
+from comparison_interface.db.connection import db
+from comparison_interface.db.models import Comparison, User
+from comparison_interface.db.writer import JudgementWriter, threads_enabled
+
+
+@pytest.mark.usefixtures('add_basic_data_equal')
+def test_judgement_writer_batches_comparisons(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing, basic data loaded and a judgement writer
+    WHEN several requests submit comparisons at the same time
+    THEN every comparison is saved with its own id and the user's counters include all of them
+    """
+    writer = JudgementWriter(equal_weight_app, interval=20)
+    states = [Comparison.SELECTED, Comparison.TIED, Comparison.SKIPPED] * 4
+    comparison_ids = []
+
+    def submit(state):
+        selected_item_id = 1 if state == Comparison.SELECTED else None
+        comparison_ids.append(writer.submit(2, 1, 2, state, selected_item_id))
+
+    threads = [threading.Thread(target=submit, args=(state,)) for state in states]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with equal_weight_app.app_context():
+        saved = db.session.scalars(db.select(Comparison).where(Comparison.user_id == 2)).all()
+        assert sorted(comparison_ids) == sorted(comparison.comparison_id for comparison in saved)
+        assert sorted(comparison.state for comparison in saved) == sorted(states)
+        user = db.session.get(User, 2)
+        assert user.compared_count == 8
+        assert user.skipped_count == 4
+
+
+@pytest.mark.usefixtures('add_basic_data_equal')
+def test_judgement_writer_isolates_invalid_comparison(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing, basic data loaded and a judgement writer
+    WHEN an invalid comparison is submitted
+    THEN the request submitting it gets a RuntimeError and the comparisons of other requests are saved
+    """
+    writer = JudgementWriter(equal_weight_app, interval=20)
+    errors = []
+
+    def submit(state):
+        try:
+            writer.submit(2, 1, 2, state, None)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(state,)) for state in (Comparison.TIED, None, Comparison.TIED)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 1
+    with equal_weight_app.app_context():
+        saved = db.session.scalars(db.select(Comparison).where(Comparison.user_id == 2)).all()
+        assert [comparison.state for comparison in saved] == [Comparison.TIED, Comparison.TIED]
+        assert db.session.get(User, 2).compared_count == 2
+
+
+@pytest.mark.usefixtures('add_basic_data_equal')
+def test_judgement_writer_drops_timed_out_comparison(equal_weight_app):
+    """
+    GIVEN a flask app configured for testing, basic data loaded and a judgement writer stalled by a slow transaction
+    WHEN a comparison queued behind the transaction isn't written before the timeout
+    THEN the request submitting it gets a RuntimeError and only the comparison being written is saved
+    """
+    writer = JudgementWriter(equal_weight_app, interval=0)
+    writer.TIMEOUT = 0.1
+    started = threading.Event()
+    release = threading.Event()
+    write = writer._write
+
+    def stalled_write(engine, batch):
+        started.set()
+        release.wait()
+        return write(engine, batch)
+
+    writer._write = stalled_write
+    comparison_ids = []
+    thread = threading.Thread(target=lambda: comparison_ids.append(writer.submit(2, 1, 2, Comparison.TIED, None)))
+    thread.start()
+    assert started.wait(5)
+
+    with pytest.raises(RuntimeError, match='not saved in time'):
+        writer.submit(2, 1, 2, Comparison.SKIPPED, None)
+    release.set()
+    thread.join()
+    # The writer skips the dropped comparison and goes on writing the next ones
+    writer.TIMEOUT = 5
+    comparison_ids.append(writer.submit(2, 1, 2, Comparison.SELECTED, 1))
+
+    with equal_weight_app.app_context():
+        saved = db.session.scalars(
+            db.select(Comparison).where(Comparison.user_id == 2).order_by(Comparison.comparison_id)
+        ).all()
+        assert [comparison.comparison_id for comparison in saved] == comparison_ids
+        assert [comparison.state for comparison in saved] == [Comparison.TIED, Comparison.SELECTED]
+        assert db.session.get(User, 2).skipped_count == 0
+
+
+@pytest.mark.parametrize(
+    "options, enabled",
+    [({}, False), ({'enable-threads': True}, True), ({'threads': b'1'}, False), ({'threads': b'4'}, True)],
+)
+def test_judgement_writer_needs_uwsgi_threads(tmp_path, monkeypatch, options, enabled):
+    """
+    GIVEN a website served by uWSGI with the given options and a judgement writer interval set
+    WHEN the application is created
+    THEN the judgement writer is only used if uWSGI runs background threads
+    """
+    monkeypatch.setitem(sys.modules, 'uwsgi', SimpleNamespace(opt=options))
+    assert threads_enabled() == enabled
+
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'writer.db'}",
+            "JUDGEMENT_WRITER_INTERVAL": 5,
+        }
+    )
+    assert (app.judgement_writer is not None) == enabled
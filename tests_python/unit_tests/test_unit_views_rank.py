@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
 
+import numpy as np
 import pytest
 from numpy import random
 from sqlalchemy import MetaData, text
 from sqlalchemy.exc import SQLAlchemyError
 
 from comparison_interface.db.connection import db
+from comparison_interface.db.counters import JudgementCounters
 from comparison_interface.db.models import Comparison, Group, Item, ItemGroup, UserGroup
 from comparison_interface.views import rank
 from comparison_interface.views.register import Request
@@ -171,6 +173,7 @@ def test_get_comparison_items_normal_order(equal_weight_app):
     request._session['previous_comparison_id'] = 1
     request._session['comparison_ids'] = [1, 2]
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     items = ranker._get_comparison_items(1)
     assert items[0].item_id == 1
     assert items[1].item_id == 2
@@ -215,6 +218,7 @@ def test_get_comparison_items_different_order(equal_weight_app):
     request._session['previous_comparison_id'] = 1
     request._session['comparison_ids'] = [1, 2]
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     items = ranker._get_comparison_items(2)
     assert items[0].item_id == 4
     assert items[1].item_id == 3
@@ -261,6 +265,7 @@ def test_get_comparison_items_invalid_id(equal_weight_app):
         request._session['previous_comparison_id'] = 1
         request._session['comparison_ids'] = [1, 2]
         ranker = rank.Rank(request, request._session)
+        ranker._app = equal_weight_app
         ranker._get_comparison_items(3)
 
 
@@ -457,6 +462,8 @@ def test_comparison_stats_retrieval(equal_weight_app):
         comparison = Comparison(**comparison_data)
         db.session.add(comparison)
     db.session.commit()
+    # the comparisons were inserted directly so the user's counters need rebuilding
+    JudgementCounters.repair()
 
     request = Request(equal_weight_app, {})
     request._session['user_id'] = 1
@@ -465,6 +472,7 @@ def test_comparison_stats_retrieval(equal_weight_app):
     request._session['previous_comparison_id'] = 1
     request._session['comparison_ids'] = [1, 2]
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     counts = ranker._get_comparison_stats()
     assert counts[0] == 8
     assert counts[1] == 3
@@ -484,6 +492,7 @@ def test_comparison_stats_retrieval_no_data(equal_weight_app):
     request._session['previous_comparison_id'] = 1
     request._session['comparison_ids'] = [1, 2]
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     counts = ranker._get_comparison_stats()
     assert counts[0] == 0
     assert counts[1] == 0
@@ -494,7 +503,7 @@ def test_custom_item_retrieval(mocker, custom_weight_app):
     """
     GIVEN a flask app configured for testing and custom weights and with basic data added for user and group preference
     WHEN a user has an active session specifying a group_id and _get_custom_items is called
-    THEN the correct group ids and weightings are supplied to the random generator function and two items are returned
+    THEN the pairs and weightings of the chosen group are used by the random selection and two items are returned
     """
     request = Request(custom_weight_app, {})
     request._session['user_id'] = 1
@@ -506,10 +515,16 @@ def test_custom_item_retrieval(mocker, custom_weight_app):
     mock_rng = mocker.Mock(spec=random.Generator)
     custom_weight_app.rng = mock_rng
     ranker._app = custom_weight_app
-    mock_rng.choice.return_value = [4, 8]
-    ranker._get_custom_items()
-    # check that we feed the correct data to the random item generator
-    mock_rng.choice.assert_called_once_with([4, 5, 6, 7, 8, 9], 1, p=[0.1, 0.2, 0.2, 0.3, 0.1, 0.1], replace=False)
+    mock_rng.integers.return_value = 3
+    mock_rng.random.return_value = 0.0
+    item_1, item_2 = ranker._get_custom_items()
+    # check that the alias table is built from the weights of the chosen group
+    _, _, table = custom_weight_app.item_catalog.get_custom_pairs([2])
+    mock_rng.integers.assert_called_once_with(6)
+    assert np.allclose(table.probabilities(), [0.1, 0.2, 0.2, 0.3, 0.1, 0.1])
+    assert item_1 is not None
+    assert item_2 is not None
+    assert item_1.item_id != item_2.item_id
 
 
 @pytest.mark.usefixtures('add_basic_data_equal')
@@ -529,10 +544,20 @@ def test_preferred_item_retrieval(mocker, equal_weight_app):
     mock_rng = mocker.Mock(spec=random.Generator)
     equal_weight_app.rng = mock_rng
     ranker._app = equal_weight_app
-    mock_rng.choice.return_value = [1, 8]
-    ranker._get_preferred_items()
-    # check that we feed the correct data to the random item generator
-    mock_rng.choice.assert_called_once_with([1, 2, 3, 7, 8, 9], 2, replace=False)
+    mock_rng.integers.side_effect = [1, 4]
+    item_1, item_2 = ranker._get_preferred_items()
+    # check that the positions are drawn from the known items only
+    assert list(equal_weight_app.known_items.get(1, 0, equal_weight_app.integrity_watcher.generation)) == [
+        1,
+        2,
+        3,
+        7,
+        8,
+        9,
+    ]
+    assert mock_rng.integers.call_args_list == [mocker.call(6), mocker.call(5)]
+    assert item_1.item_id == 2
+    assert item_2.item_id == 9
 
 
 @pytest.mark.usefixtures('add_basic_data_equal')
@@ -549,6 +574,7 @@ def test_preferred_item_retrieval_not_enough_items(equal_weight_app):
     request._session['previous_comparison_id'] = None
     request._session['comparison_ids'] = []
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     items = ranker._get_preferred_items()
     # check that we get two items returned from the range
     assert len(items) == 2
@@ -576,10 +602,13 @@ def test_random_item_retrieval(mocker, equal_weight_app):
     mock_rng = mocker.Mock(spec=random.Generator)
     equal_weight_app.rng = mock_rng
     ranker._app = equal_weight_app
-    mock_rng.choice.return_value = [1, 8]
-    ranker._get_random_items()
-    # check that we feed the correct data to the random item generator
-    mock_rng.choice.assert_called_once_with([1, 2, 3, 4, 5, 6, 7, 8, 9], 2, replace=False)
+    mock_rng.integers.side_effect = [0, 7]
+    item_1, item_2 = ranker._get_random_items()
+    # check that the positions are drawn from the items of the chosen group only
+    assert list(equal_weight_app.item_catalog.get_group_items([1])) == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    assert mock_rng.integers.call_args_list == [mocker.call(9), mocker.call(8)]
+    assert item_1.item_id == 1
+    assert item_2.item_id == 9
 
 
 @pytest.mark.usefixtures('add_basic_data_equal')
@@ -649,6 +678,7 @@ def test_random_item_retrieval_only_one_item(equal_weight_app):
     request._session['previous_comparison_id'] = None
     request._session['comparison_ids'] = []
     ranker = rank.Rank(request, request._session)
+    ranker._app = equal_weight_app
     items = ranker._get_random_items()
     # check that we get two None entries because there is only 1
     assert len(items) == 2
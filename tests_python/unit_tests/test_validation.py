@@ -99,3 +99,17 @@ def test_check_config_path_incorrect_file(equal_weight_app):
     validator = Validation(equal_weight_app)
     with pytest.raises(SystemExit):
         validator.check_config_path("../tests_python/test_configurations/csv_example_1/example_1.csv")
+
+
+def test_validation_fails_for_incomplete_language(equal_weight_app):
+    """
+    GIVEN a flask application with a second language missing a label the project configuration doesn't define
+    WHEN the website configuration is validated
+    THEN the system exits
+    """
+    ConfigValidation(equal_weight_app).validate()
+    language_text = dict(equal_weight_app.language_config[WS.CONFIGURATION_WEBSITE_TEXT])
+    del language_text['pageTitleRank']
+    equal_weight_app.language_configs['xx'] = {WS.CONFIGURATION_WEBSITE_TEXT: language_text}
+    with pytest.raises(SystemExit):
+        ConfigValidation(equal_weight_app).validate()